@@ -10,18 +10,54 @@ directory = path.abspath(directory)
 sys.path.append(directory)
 
 import unigdb
-from unigdb.gdbu import CoreShell
+from unigdb.gdbu import CoreShell, EXIT_USAGE
 
 
 def parse_args():
     parser = ArgumentParser(add_help=True)
-    parser.add_argument('-ex', metavar='COMMNAND', dest='ex', help='Execute given UniGDB command')
+    parser.add_argument('-ex', metavar='COMMAND', dest='commands', action='append', default=[],
+                        type=lambda command: ('command', command),
+                        help='Execute given UniGDB command (can be repeated)')
+    parser.add_argument('-x', metavar='FILE', dest='commands', action='append',
+                        type=lambda script: ('script', script),
+                        help='Execute UniGDB commands from FILE (can be repeated)')
+    parser.add_argument('--batch', action='store_true',
+                        help='Exit after processing the commands, without prompt, banner nor history')
+    parser.add_argument('--json', action='store_true',
+                        help='Print one JSON object per command (implies --batch)')
+    parser.add_argument('--rpc', metavar='[HOST]:PORT|PATH',
+                        help='Serve emulation sessions over JSON-RPC on a TCP port or a UNIX socket, without the shell')
+    parser.add_argument('-j', '--jobs', type=int,
+                        help='Threads shared by the emulations of the --rpc sessions (default: one per session)')
     return parser.parse_args()
 
 
+def read_script(script):
+    """Command lines of a script, without blank lines and comments."""
+    with open(script) as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.startswith('#')]
+
+
 if __name__ == '__main__':
     args = parse_args()
-    shell = CoreShell()
-    if args.ex:
-        shell.onecmd_plus_hooks(args.ex)
+    if args.rpc:
+        unigdb.rpc.serve(args.rpc, args.jobs)
+        sys.exit(0)
+    batch = args.batch or args.json
+    commands = []
+    # -ex and -x run in the order they are given
+    for kind, value in args.commands:
+        if kind == 'script':
+            try:
+                commands.extend(read_script(value))
+            except OSError as e:
+                sys.stderr.write('%s\n' % e)
+                sys.exit(EXIT_USAGE)
+        else:
+            commands.append(value)
+    shell = CoreShell(batch=batch)
+    status = shell.run_commands(commands, json_output=args.json)
+    if batch:
+        sys.exit(status)
     shell.cmdloop()
@@ -0,0 +1,82 @@
+"""
+Single steps over the GDB remote protocol, on every architecture served.
+"""
+import socket
+import threading
+
+import pytest
+
+import unigdb.gdbserver
+import unigdb.gdbu
+
+ADDRESS = 0x100000
+
+# two instructions incrementing a register, its gdb register number
+CODE = {
+    'armel': (bytes.fromhex('010080e2010080e2'), 0),  # add r0, r0, #1
+    'armeb': (bytes.fromhex('e2800001e2800001'), 0),
+    'mipsel': (bytes.fromhex('0100082501000825'), 8),  # addiu $t0, $t0, 1
+    'mipseb': (bytes.fromhex('2508000125080001'), 8),
+}
+
+
+class Client(object):
+    def __init__(self, port):
+        self.sock = socket.create_connection(('127.0.0.1', port), timeout=10)
+        self.buffer = b''
+
+    def request(self, payload):
+        self.sock.sendall(b'$%s#%02x' % (payload, unigdb.gdbserver.checksum(payload)))
+        while True:
+            self.buffer = self.buffer.lstrip(b'+')
+            start, end = self.buffer.find(b'$'), self.buffer.find(b'#')
+            if start != -1 and end != -1 and len(self.buffer) >= end + 3:
+                reply, self.buffer = self.buffer[start + 1:end], self.buffer[end + 3:]
+                self.sock.sendall(b'+')
+                return reply.decode()
+            self.buffer += self.sock.recv(4096)
+
+    def register(self, regnum, endian):
+        return int.from_bytes(bytes.fromhex(self.request(b'p%x' % regnum)), endian)
+
+
+@pytest.fixture(scope='module')
+def shell():
+    # the shell can only be created once per process
+    return unigdb.gdbu.CoreShell(batch=True)
+
+
+@pytest.fixture
+def server(shell, tmp_path, request):
+    code, _ = CODE[request.param]
+    path = tmp_path / 'code.bin'
+    path.write_bytes(code)
+    for line in ['set arch %s' % request.param, 'load code binary %s %#x' % (path, ADDRESS)]:
+        shell.onecmd_plus_hooks(line)
+    sock = unigdb.gdbserver.listen('127.0.0.1:0')
+    gdbserver = unigdb.gdbserver.GdbServer(shell, sock)
+
+    def serve():
+        gdbserver.accept()
+        gdbserver.serve()
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield request.param, sock.getsockname()[1]
+    thread.join(10)
+    sock.close()
+
+
+@pytest.mark.parametrize('server', sorted(CODE), indirect=True)
+def test_step(server):
+    arch, port = server
+    regnum = CODE[arch][1]
+    endian = 'little' if arch.endswith('el') else 'big'
+    pc = 15 if arch.startswith('arm') else 37
+    client = Client(port)
+    assert client.request(b'?') == 'S05'
+    for i in range(1, 3):
+        assert client.request(b's') == 'S05'
+        assert client.register(regnum, endian) == i
+        assert client.register(pc, endian) == ADDRESS + 4 * i
+    assert client.request(b'?') == 'S05'
+    client.request(b'D')
@@ -0,0 +1,46 @@
+"""
+Importing the library entry point must stay cheap: no cmd2, no capstone and no
+command module, see unigdb/__init__.py.
+"""
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# generous, the import takes about 0.1s; this catches the shell or the commands coming back
+BUDGET = 2.0
+
+CHECK = '''
+import sys, json
+import unigdb.api
+print(json.dumps(sorted(sys.modules)))
+'''
+
+
+def import_api():
+    """Modules imported by ``import unigdb.api`` and the ``-X importtime`` cumulative times."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHECK], cwd=ROOT, env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    # import time: self [us] | cumulative | imported package
+    times = {}
+    for line in process.stderr.splitlines():
+        fields = [field.strip() for field in line.split(':', 1)[-1].split('|')]
+        if line.startswith('import time:') and fields[0].isdigit():
+            times[fields[2]] = int(fields[1]) / 1e6
+    return json.loads(process.stdout), times
+
+
+def test_import_api_is_lazy():
+    modules, _ = import_api()
+    assert 'cmd2' not in modules
+    assert 'capstone' not in modules
+    assert 'unigdb.gdbu' not in modules
+    assert [m for m in modules if m.startswith('unigdb.commands.')] == []
+
+
+def test_import_api_time():
+    _, times = import_api()
+    assert times['unigdb.api'] < BUDGET
@@ -1,39 +1,21 @@
-# import unigdb.arch
-import unigdb.color
-import unigdb.commands
-import unigdb.commands.context
-import unigdb.commands.breakpoint
-import unigdb.commands.hexdump
-import unigdb.commands.builtins
-import unigdb.commands.nexti
-# import unigdb.commands.pattern
-# import unigdb.commands.pcustom
-import unigdb.commands.registers
-import unigdb.commands.theme
-# import unigdb.commands.self
-import unigdb.disassemble
-# import unigdb.exception
-# import unigdb.functions
-# import unigdb.handlers
-import unigdb.memory
-import unigdb.proc
-import unigdb.prompt
-import unigdb.regs
-import unigdb.typeinfo
-import unigdb.ui
-import unigdb.gdbu
-import capstone
-
+"""
+Importing the package is cheap: the submodules are imported on first access
+(``unigdb.memory``), and cmd2, the shell and its commands only when the shell
+starts. Scripts driving the emulator use :mod:`unigdb.api`.
+"""
+import importlib
 
 __version__ = '0.1.2'
 version = __version__
 
 
 __all__ = [
+    'api',
     'arch',
     'chain',
     'color',
     'events',
+    'gdbserver',
     'commands',
     'hexdump',
     # 'ida',
@@ -41,11 +23,32 @@ __all__ = [
     'memory',
     'proc',
     'regs',
+    'results',
+    'rpc',
+    'snapshot',
+    'search',
+    'session',
+    'structs',
+    'stubs',
+    'syscalls',
+    'telescope',
     'typeinfo',
     'ui',
 ]
 
 
+def __getattr__(name):
+    """Import the submodule ``name`` on first access."""
+    if name.startswith('__'):
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    try:
+        return importlib.import_module('%s.%s' % (__name__, name))
+    except ModuleNotFoundError as e:
+        if e.name != '%s.%s' % (__name__, name):
+            raise
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
 # pre_commands = [
 #     'set confirm off',
 #     'set verbose off',
@@ -69,9 +72,6 @@ __all__ = [
 #     gdb.execute(line.strip())
 
 
-# handle resize event to align width and completion
-# signal.signal(signal.SIGWINCH, lambda signum, frame: gdb.execute("set width %i" % unigdb.ui.get_window_size()[1]))
-
 # More info: https://sourceware.org/bugzilla/show_bug.cgi?id=21946
 # As stated on GDB's bugzilla that makes remote target search slower.
 # After GDB gets the fix, we should disable this only for bugged GDB versions.
@@ -0,0 +1,163 @@
+"""
+Library entry point, for the scripts driving the emulator without the shell.
+
+    >>> import unigdb.api
+    >>> emu = unigdb.api.Emulator('armel')
+    >>> emu.map(0x1000, 0x1000)
+    {'address': 4096, 'size': 4096}
+    >>> emu.load(0x1000, data=bytes.fromhex('0100a0e3010080e2'))
+    {'address': 4096, 'size': 8}
+    >>> emu.run(until=0x1008)
+    {'pc': 4104, 'stop_reason': 'until'}
+    >>> emu.registers(['r0'])
+    {'r0': 2}
+
+Neither cmd2 nor the commands are imported, and capstone only on the first
+disassembly. Every emulator is a :class:`unigdb.session.Session`, thus
+independent of the others and of the shell.
+"""
+import time
+import functools
+
+from unicorn import UcError, UC_HOOK_CODE, UC_PROT_ALL, UC_PROT_READ, UC_PROT_WRITE, UC_PROT_EXEC
+
+import unigdb.arch
+import unigdb.disassemble
+import unigdb.memory
+import unigdb.session
+
+ARCHES = ['armel', 'armeb', 'mipsel', 'mipseb']
+
+PERMS = {'r': UC_PROT_READ, 'w': UC_PROT_WRITE, 'x': UC_PROT_EXEC}
+
+
+def in_session(method):
+    """Run ``method`` with the session of the emulator current, for the helpers of unigdb."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with unigdb.session.use(self.session):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class Emulator(object):
+    """An emulated target: its own engine, registers, memory and breakpoints. The methods block."""
+
+    def __init__(self, arch):
+        """
+        Arguments:
+            arch(str): one of ``ARCHES``, e.g. "armel"
+        """
+        if arch not in ARCHES:
+            raise ValueError('Invalid arch %s, valid values: %s' % (arch, ', '.join(ARCHES)))
+        self.arch = arch
+        self.session = unigdb.session.Session(arch[:-2], 'little' if arch.endswith('el') else 'big')
+        self.stop_reason = None
+
+    @property
+    def uc(self):
+        return self.session.UC
+
+    @property
+    def architecture(self):
+        return self.session.CURRENT_ARCH
+
+    def register(self, name):
+        """Unicorn constant of the register ``name``, with or without the "$"."""
+        reg = self.architecture.all_registers.get(name if name.startswith('$') else '$' + name)
+        if reg is None:
+            raise ValueError('Register %s not found' % name)
+        return reg
+
+    @in_session
+    def map(self, address, size, perms='rwx', objfile=''):
+        """Map ``size`` bytes at ``address`` with ``perms``, a subset of "rwx"."""
+        if not set(perms) <= set(PERMS):
+            raise ValueError('Invalid permissions %s' % perms)
+        unigdb.memory.map_region(address, size,
+                                 functools.reduce(lambda p, c: p | PERMS[c], perms, 0) if perms else UC_PROT_ALL,
+                                 objfile)
+        return {'address': address, 'size': size}
+
+    def load(self, address, path=None, data=b''):
+        """Write the file at ``path`` or ``data`` at ``address``, which becomes $pc."""
+        if path is not None:
+            with open(path, 'rb') as f:
+                data = f.read()
+        self.write(address, data)
+        self.uc.reg_write(self.register('$pc'), address)
+        return {'address': address, 'size': len(data)}
+
+    def read(self, address, size):
+        return bytes(self.uc.mem_read(address, size))
+
+    def write(self, address, data):
+        self.uc.mem_write(address, bytes(data))
+        # the code translated from the previous bytes would still run
+        self.uc.ctl_remove_cache(address, address + len(data))
+        return {'address': address, 'size': len(data)}
+
+    def registers(self, names=None, values=None):
+        """Set the registers of ``values`` (a dict), then return the ``names`` (all by default) ones."""
+        for name, value in (values or {}).items():
+            self.uc.reg_write(self.register(name), value)
+        names = names or list(self.architecture.all_registers)
+        regs = [self.register(name) for name in names]
+        return dict(zip(names, self.uc.reg_read_batch(regs)))
+
+    @in_session
+    def run(self, begin=None, until=None, count=0, timeout=0, breakpoints=()):
+        """
+        Emulate from ``begin`` ($pc by default) until ``until``, a breakpoint, ``count``
+        instructions or ``timeout`` milliseconds (0 means no limit).
+        """
+        pc = self.register('$pc')
+        begin = self.uc.reg_read(pc) if begin is None else begin
+        self.stop_reason = None
+        hook = None
+        if breakpoints:
+            # the first instruction runs even when a breakpoint is set on it, to resume from it
+            hook = unigdb.arch.hook_add(self.uc, UC_HOOK_CODE, self.hook_breakpoint,
+                                        {'first': True, 'breakpoints': set(breakpoints)})
+        started = time.time()
+        try:
+            unigdb.arch.emu_start(self.uc, begin, until, timeout * 1000, count)
+        except UcError as e:
+            self.stop_reason = 'error: %s' % e
+        finally:
+            if hook is not None:
+                self.uc.hook_del(hook)
+        elapsed = time.time() - started
+        address = self.uc.reg_read(pc)
+        if self.stop_reason is None:
+            if address == until:
+                self.stop_reason = 'until'
+            elif timeout and elapsed * 1000 >= timeout:
+                self.stop_reason = 'timeout'
+            elif count:
+                self.stop_reason = 'instruction budget'
+            else:
+                self.stop_reason = 'stopped'
+        return {'pc': address, 'stop_reason': self.stop_reason}
+
+    def hook_breakpoint(self, uc, address, size, state):
+        if state['first']:
+            state['first'] = False
+            return
+        if address in state['breakpoints']:
+            self.stop_reason = 'breakpoint'
+            uc.emu_stop()
+
+    def step(self, count=1):
+        return self.run(count=count)
+
+    def interrupt(self):
+        """Stop the running emulation, from another thread."""
+        self.stop_reason = 'interrupted'
+        self.uc.emu_stop()
+        return True
+
+    @in_session
+    def disassemble(self, address, count=1):
+        """List of the ``count`` :class:`unigdb.disassemble.Instruction` at ``address``."""
+        return list(unigdb.disassemble.capstone_disassemble(address, count))
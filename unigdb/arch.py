@@ -5,71 +5,76 @@ import unigdb.events
 import unigdb.typeinfo
 import unigdb.regs
 import unigdb.proc
+import unigdb.session
 
-current = 'i386'
-ptrmask = 0xfffffffff
-endian = 'little'
-ptrsize = unigdb.typeinfo.ptrsize
-fmt = '=I'
 native_endian = str(sys.byteorder)
-CURRENT_ARCH = None
-UC = None
+
+# Unicorn only checks `count` in blocks translated while a count was set,
+# so never start without one or later budgets would be ignored
+COUNT_NEVER = 1 << 62
 
 
 def update(arch, endian):
-    m = sys.modules[__name__]
-    m.current = arch
-    m.ptrsize = unigdb.typeinfo.ptrsize
-    m.ptrmask = (1 << 8 * unigdb.typeinfo.ptrsize) - 1
+    """Set the architecture of the current session, with a new engine."""
+    unigdb.session.current().set_arch(arch, endian)
 
-    m.endian = endian
 
-    m.fmt = {
-        (4, 'little'): '<I',
-        (4, 'big'): '>I',
-        (8, 'little'): '<Q',
-        (8, 'big'): '>Q',
-    }.get((m.ptrsize, m.endian))
+def create(arch, endian):
+    """Return a new ``(architecture, unicorn engine)`` pair, independent of the current ones."""
+    try:
+        architecture = unigdb.regs.arch_to_regs[arch]()
+    except KeyError:
+        raise OSError("Specified arch {:s} is not supported".format(arch))
+    uc_arch = getattr(unicorn, 'UC_ARCH_%s' % architecture.arch)
+    uc_mode = getattr(unicorn, 'UC_MODE_%s' % architecture.mode)
+    if endian == 'little':
+        uc_mode += unicorn.UC_MODE_LITTLE_ENDIAN
+    else:
+        uc_mode += unicorn.UC_MODE_BIG_ENDIAN
+    uc = unicorn.Uc(uc_arch, uc_mode)
+    # a run ends at the exits set by emu_start(), not at the `until` of Unicorn: stopping on a
+    # count or a timeout with an `until` never reached raises UC_ERR_READ_UNMAPPED on MIPS32.
+    # The exits cannot be disabled again, the engine would hang.
+    uc.ctl_exits_enabled(True)
+    uc.ctl_set_exits([])
+    return architecture, uc
 
-    # Work around Python 2.7.6 struct.pack / unicode incompatibility
-    # See https://github.com/unigdb/unigdb/pull/336 for more information.
-    m.fmt = str(m.fmt)
 
-    # Attempt to detect the qemu-user binary name
-    if m.current == 'arm' and m.endian == 'big':
-        m.qemu = 'armeb'
-    elif m.current == 'mips' and m.endian == 'little':
-        m.qemu = 'mipsel'
-    else:
-        m.qemu = m.current
-    set_arch(m.current)
+def hook_add(uc, *args):
+    """``uc.hook_add(*args)``, on an engine which may have run: the code translated before the hook
+    was added would not call it, so it is translated again."""
+    handle = uc.hook_add(*args)
+    uc.ctl_flush_tb()
+    return handle
+
+
+def emu_start(uc, begin, until=None, timeout=0, count=0):
+    """
+    Emulate from ``begin`` until ``until`` (None for no end address), ``timeout`` microseconds
+    or ``count`` instructions, 0 meaning no limit. Raises :class:`unicorn.UcError`.
+    """
+    uc.ctl_set_exits([] if until is None else [until])
+    uc.emu_start(begin, 0, timeout, count or COUNT_NEVER)
 
 
 def set_arch(arch=None, default=None):
     """Sets the current architecture."""
-    module = sys.modules[__name__]
+    session = unigdb.session.current()
     if arch:
-        try:
-            module.CURRENT_ARCH = unigdb.regs.arch_to_regs[arch]()
-            uc_arch = getattr(unicorn, 'UC_ARCH_%s' % module.CURRENT_ARCH.arch)
-            uc_mode = getattr(unicorn, 'UC_MODE_%s' % module.CURRENT_ARCH.mode)
-            if module.endian == 'little':
-                uc_mode += unicorn.UC_MODE_LITTLE_ENDIAN
-            else:
-                uc_mode += unicorn.UC_MODE_BIG_ENDIAN
-            module.UC = unicorn.Uc(uc_arch, uc_mode)
-            unigdb.proc.init = True
-            return module.CURRENT_ARCH
-        except KeyError:
-            raise OSError("Specified arch {:s} is not supported".format(arch))
+        return session.set_arch(arch, session.endian)
     try:
-        module.CURRENT_ARCH = unigdb.regs.arch_to_regs[module.current]()
+        session.CURRENT_ARCH = unigdb.regs.arch_to_regs[session.current]()
     except KeyError:
         if default:
             try:
-                module.CURRENT_ARCH = unigdb.regs.arch_to_regs[default.lower()]()
+                session.CURRENT_ARCH = unigdb.regs.arch_to_regs[default.lower()]()
             except KeyError:
                 raise OSError("CPU not supported, neither is default {:s}".format(default))
         else:
-            raise OSError("CPU type is currently not supported: {:s}".format(module.current))
-    return module.CURRENT_ARCH
+            raise OSError("CPU type is currently not supported: {:s}".format(session.current))
+    return session.CURRENT_ARCH
+
+
+# the target state lives in the current session
+unigdb.session.bind(__name__, {name: name for name in
+                               ('current', 'ptrmask', 'endian', 'ptrsize', 'fmt', 'qemu', 'CURRENT_ARCH', 'UC')})
@@ -1,23 +1,24 @@
-import unigdb.commands.breakpoint
+import unigdb.session
 
 
 def setBreakpoint(addr: int, temporary: bool):
-    unigdb.commands.breakpoint._breakpoints_[addr] = temporary
+    unigdb.session.current().breakpoints[addr] = temporary
 
 
 def hasBreakpoint(addr: int):
-    return unigdb.commands.breakpoint._breakpoints_.get(addr)
+    return unigdb.session.current().breakpoints.get(addr)
 
 
 def delBreakpoint(addr: int):
-    unigdb.commands.breakpoint._breakpoints_.pop(addr)
+    unigdb.session.current().breakpoints.pop(addr)
 
 
 def restoreBreakpoints():
-    for k in unigdb.commands.breakpoint._breakpoints_:
-        if unigdb.commands.breakpoint._breakpoints_[k] is None:
-            unigdb.commands.breakpoint._breakpoints_[k] = False
+    breakpoints = unigdb.session.current().breakpoints
+    for k in breakpoints:
+        if breakpoints[k] is None:
+            breakpoints[k] = False
 
 
 def hideBreakpoint(addr: int):
-    unigdb.commands.breakpoint._breakpoints_[addr] = None
+    unigdb.session.current().breakpoints[addr] = None
@@ -5,6 +5,19 @@ import unigdb.config
 
 LIMIT = unigdb.config.set('self.dereference_limit', 5, 'max number of pointers to dereference in a chain')
 string_limit = unigdb.config.set('self.dereference_string_limit', 30, 'max number of chars to dereference string')
+unigdb.config.set('self.dereference_kind', True, 'show the kind of region (code, stack, heap, data, mmio) after the pointers')
+
+# Printable bytes map to themselves and the others to NULL, so the first NULL of a
+# translated buffer is where its printable prefix ends.
+PRINTABLE = bytes(c if chr(c) in string.printable else 0 for c in range(256))
+
+# Theme setting of the addresses of each kind of region, the others use theme.dereference_base_address
+KIND_COLORS = {
+    'code': "theme.address_code",
+    'stack': "theme.address_stack",
+    'heap': "theme.address_heap",
+    'mmio': "theme.address_mmio",
+}
 
 
 def format(value, limit=LIMIT, code=True):
@@ -13,7 +26,8 @@ def format(value, limit=LIMIT, code=True):
     of address dereferences into string representation.
 
     Arguments:
-        value(int|list): Either the starting address to be sent to get, or the result of get (a list)
+        value(int|list): Either the starting address to be sent to get, or the result of get (a list,
+            of links or of ``(link, kind)`` tuples as returned by :func:`examine`)
         limit(int): Number of valid pointers
         code(bool): Hint that indicates the value may be an instruction
         offset(int): Offset into the address to get the next pointer
@@ -26,23 +40,26 @@ def format(value, limit=LIMIT, code=True):
     """
     limit = int(limit)
     # Get config params
-    base_address_color = unigdb.config.get("theme.dereference_base_address")
-    string_color = unigdb.config.get("theme.dereference_string")
     config_arrow_right = unigdb.config.get("theme.chain_arrow_right")
     # Allow results from get function to be passed to format
     if isinstance(value, list):
-        chain = value
+        chain = [link if isinstance(link, tuple) else (link, region_kind(link)) for link in value]
     else:
-        chain = examine_mem_value(value, limit)
+        chain = examine(value, limit)
     # Set arrow separate
     arrow_right = ' %s ' % config_arrow_right
+    show_kind = unigdb.config.get('self.dereference_kind')
     # Colorize the chain
     rest = []
-    for link in chain:
+    for link, kind in chain:
         if isinstance(link, int):
-            rest.append(Color.colorify('%#x' % link, base_address_color))
+            text = Color.themify('%#x' % link, KIND_COLORS.get(kind, "theme.dereference_base_address"))
+            if show_kind and kind is not None:
+                # the color alone does not tell data from the default
+                text += Color.grayify(' (%s)' % kind)
+            rest.append(text)
         if isinstance(link, str):
-            rest.append(Color.colorify('"{:s}"'.format(link), string_color))
+            rest.append(Color.themify('"{:s}"'.format(link), "theme.dereference_string"))
         # symbol = unigdb.symbol.get(link) or None
         # if symbol:
         #     symbol = '%#x (%s)' % (link, symbol)
@@ -50,6 +67,14 @@ def format(value, limit=LIMIT, code=True):
     return arrow_right.join(rest)
 
 
+def region_kind(value):
+    """Kind of the region ``value`` points to, ``None`` for strings and unmapped addresses."""
+    if not isinstance(value, int):
+        return None
+    page = unigdb.memory.find(value)
+    return page.kind if page else None
+
+
 def examine_mem_value(address, limit=LIMIT):
     """
     Recursively dereferences an address. For bare metal, it will stop when the address is not in any of vmmap pages to avoid redundant dereference.
@@ -61,36 +86,79 @@ def examine_mem_value(address, limit=LIMIT):
     Returns:
         A list representing pointers of each ```address``` and reference
     """
-    result = [address]
-
-    def dereference(value):
-        bits = unigdb.arch.ptrsize * 8
-        try_string = unigdb.memory.string(value)
-        if not try_string or not all(chr(s) in string.printable for s in try_string):
-            if unigdb.memory.peek(value):
-                return unigdb.memory.u32(value) if bits == 32 else unigdb.memory.u64(value)
-            return None
-        # return string
-        if len(try_string) > string_limit:
-            return try_string.decode()[:string_limit] + '...'
-        return try_string.decode()
+    return [link for link, _ in examine(address, limit)]
+
+
+def examine(address, limit=LIMIT):
+    """
+    Same as :func:`examine_mem_value`, with the kind of region of each link.
+
+    Returns:
+        A list of ``(link, kind)`` tuples, ``kind`` as in :attr:`unigdb.memory.Page.kind`
+        or ``None`` for strings and unmapped addresses. Each link costs one index lookup.
+    """
+    links = [address]
+    page = unigdb.memory.find(address)
+    result = [(address, page.kind if page else None)]
 
     for _ in range(limit):
+        # Unmapped, nothing to dereference
+        if page is None:
+            break
         # Don't follow cycles, except to stop at the second occurrence.
-        if result.count(address) >= 2:
+        if links.count(address) >= 2:
             break
-        deref = dereference(address)
+        deref = probe(address, page.end - address)
         if deref is None:
             break
         if isinstance(deref, str):
-            result.append(deref)
+            result.append((deref, None))
             break
         address = deref & unigdb.arch.ptrmask
-        result.append(address)
+        page = unigdb.memory.find(address)
+        links.append(address)
+        result.append((address, page.kind if page else None))
 
     return result
 
 
+def probe(address, size):
+    """
+    Dereference ``address`` with a few small reads, growing until the string it may hold
+    ends or gets longer than ``string_limit``. ``size`` bytes are mapped from ``address``.
+
+    Returns:
+        See :func:`interpret`
+    """
+    # Unicorn refuses reads running past the end of the region
+    data = unigdb.memory.read(address, min(size, max(unigdb.arch.ptrsize, 16)))
+    while data.translate(PRINTABLE).find(b'\x00') == -1 and len(data) <= string_limit and len(data) < size:
+        block = unigdb.memory.read(address + len(data), min(len(data), size - len(data), string_limit + 1 - len(data)))
+        if not block:
+            break
+        data += block
+    return interpret(data)
+
+
+def interpret(data):
+    """
+    Dereference the memory ``data`` read at a pointer.
+
+    Returns:
+        The string ``data`` starts with when it is printable and NULL-terminated (or longer
+        than ``string_limit``), otherwise the pointer-sized integer it starts with, or
+        ``None`` if ``data`` is too short.
+    """
+    end = data.translate(PRINTABLE).find(b'\x00')
+    if end > string_limit or (end == -1 and len(data) > string_limit):
+        return data[:string_limit].decode() + '...'
+    if end > 0 and data[end] == 0:
+        return data[:end].decode()
+    if len(data) < unigdb.arch.ptrsize:
+        return None
+    return int.from_bytes(data[:unigdb.arch.ptrsize], unigdb.arch.endian)
+
+
 def lazy_dereference(value):
     bits = unigdb.arch.ptrsize * 8
     if unigdb.memory.peek(value):
@@ -1,10 +1,27 @@
 import os
+import re
 
 import unigdb.config
 # import unigdb.memoize
 
 disable_colors = unigdb.config.set('self.disable_colors', bool(os.environ.get('UNIGDB_DISABLE_COLORS')), 'whether to color the output or not')
 
+ESCAPE = re.compile(r'\x1b\[[0-9;]*m')  # : SGR escape sequences, as produced by Color
+
+__compiled__ = {}  # : attributes -> (prefix, suffix)
+__keys__ = {}  # : config key -> (prefix, suffix)
+__functions__ = {}  # : color function config -> function
+generation = 0  # : incremented by reset(), for the caches built on top of this module
+
+
+def reset():
+    """Drop the compiled colors, after a change of the theme or of `self.disable_colors`."""
+    global generation
+    __compiled__.clear()
+    __keys__.clear()
+    __functions__.clear()
+    generation += 1
+
 
 class Color:
     """Used to colorify terminal output."""
@@ -70,41 +87,66 @@ class Color:
     def blinkify(msg):
         return Color.colorify(msg, "blink")
 
+    @staticmethod
+    def compile(attrs):
+        """Return the (prefix, suffix) pair which colors a text with the given attributes."""
+        compiled = __compiled__.get(attrs)
+        if compiled is not None:
+            return compiled
+
+        if unigdb.config.get("self.disable_colors") is True:
+            compiled = ("", "")
+        else:
+            colors = Color.colors
+            prefix = [colors[attr] for attr in attrs.split() if attr in colors]
+            suffix = []
+            if colors["highlight"] in prefix:
+                suffix.append(colors["highlight_off"])
+            if colors["underline"] in prefix:
+                suffix.append(colors["underline_off"])
+            if colors["blink"] in prefix:
+                suffix.append(colors["blink_off"])
+            suffix.append(colors["normal"])
+            compiled = ("".join(prefix), "".join(suffix))
+        __compiled__[attrs] = compiled
+        return compiled
+
     @staticmethod
     def colorify(text, attrs):
         """Color text according to the given attributes."""
-        if unigdb.config.get("self.disable_color") is True:
-            return text
-
-        colors = Color.colors
-        msg = [colors[attr] for attr in attrs.split() if attr in colors]
-        msg.append(str(text))
-        if colors["highlight"] in msg:
-            msg.append(colors["highlight_off"])
-        if colors["underline"] in msg:
-            msg.append(colors["underline_off"])
-        if colors["blink"] in msg:
-            msg.append(colors["blink_off"])
-        msg.append(colors["normal"])
-        return "".join(msg)
+        prefix, suffix = __compiled__.get(attrs) or Color.compile(attrs)
+        return prefix + str(text) + suffix
 
+    @staticmethod
+    def strip(text):
+        """Text without its color escape sequences."""
+        return ESCAPE.sub('', text)
 
-# @unigdb.memoize.reset_on_stop
-def generateColorFunctionInner(old, new):
-    def wrapper(text):
-        return new(old(text))
-    return wrapper
+    @staticmethod
+    def themify(text, key):
+        """Color text with the attributes of the config setting ``key`` (e.g. "theme.address_code")."""
+        compiled = __keys__.get(key)
+        if compiled is None:
+            compiled = __keys__[key] = Color.compile(unigdb.config.get(key) or "")
+        return compiled[0] + str(text) + compiled[1]
 
 
 def generateColorFunction(config):
-    def function(x):
-        return x
-    # check disabled_color
-    if disable_colors:
+    """Return the function coloring a text with the comma separated colors of ``config`` (e.g. "bold,red"),
+    compiled into a single string concatenation."""
+    function = __functions__.get(config)
+    if function is not None:
         return function
-    # select color wrapper
+
+    prefix, suffix = "", ""
     for color in config.split(','):
         color = color.lower().replace('-', '_')
         if hasattr(Color, '%sify' % color):
-            function = generateColorFunctionInner(function, getattr(Color, '%sify' % color))
+            # same output as applying the <color>ify functions in turn
+            inner_prefix, inner_suffix = Color.compile(color)
+            prefix, suffix = inner_prefix + prefix, suffix + inner_suffix
+
+    def function(text):
+        return prefix + str(text) + suffix
+    __functions__[config] = function
     return function
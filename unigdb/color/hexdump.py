@@ -1,38 +1,38 @@
 import unigdb.config as config
 from unigdb.color import generateColorFunction
 
-config_normal = config.set('color.hexdump_normal_color', 'normal', 'color for hexdump command (normal bytes)')
-config_printable = config.set('color.hexdump_printable_color', 'bold', 'color for hexdump command (printable characters)')
-config_zero = config.set('color.hexdump_zero_color', 'red', 'color for hexdump command (zero bytes)')
-config_special = config.set('color.hexdump_special_color', 'yellow', 'color for hexdump command (special bytes)')
-config_offset = config.set('color.hexdump_offset_color', 'normal', 'color for hexdump command (offset label)')
-config_address = config.set('color.hexdump_address_color', 'normal', 'color for hexdump command (address label)')
-config_separator = config.set('color.hexdump_separator_color', 'normal', 'color for hexdump command (group separator)')
+config.set('color.hexdump_normal_color', 'normal', 'color for hexdump command (normal bytes)')
+config.set('color.hexdump_printable_color', 'bold', 'color for hexdump command (printable characters)')
+config.set('color.hexdump_zero_color', 'red', 'color for hexdump command (zero bytes)')
+config.set('color.hexdump_special_color', 'yellow', 'color for hexdump command (special bytes)')
+config.set('color.hexdump_offset_color', 'normal', 'color for hexdump command (offset label)')
+config.set('color.hexdump_address_color', 'normal', 'color for hexdump command (address label)')
+config.set('color.hexdump_separator_color', 'normal', 'color for hexdump command (group separator)')
 
 
 def normal(x):
-    return generateColorFunction(config_normal)(x)
+    return generateColorFunction(config.get('color.hexdump_normal_color'))(x)
 
 
 def printable(x):
-    return generateColorFunction(config_printable)(x)
+    return generateColorFunction(config.get('color.hexdump_printable_color'))(x)
 
 
 def zero(x):
-    return generateColorFunction(config_zero)(x)
+    return generateColorFunction(config.get('color.hexdump_zero_color'))(x)
 
 
 def special(x):
-    return generateColorFunction(config_special)(x)
+    return generateColorFunction(config.get('color.hexdump_special_color'))(x)
 
 
 def offset(x):
-    return generateColorFunction(config_offset)(x)
+    return generateColorFunction(config.get('color.hexdump_offset_color'))(x)
 
 
 def address(x):
-    return generateColorFunction(config_address)(x)
+    return generateColorFunction(config.get('color.hexdump_address_color'))(x)
 
 
 def separator(x):
-    return generateColorFunction(config_separator)(x)
+    return generateColorFunction(config.get('color.hexdump_separator_color'))(x)
@@ -18,6 +18,8 @@ config.set('color.message_signal_color', 'bold,red', 'color of signal messages')
 
 config.set('color.message_prompt_color', 'bold,red', 'prompt color')
 
+errors = 0  # : number of error messages printed, batch mode reports failed commands with it
+
 
 def on(msg):
     return print(generateColorFunction(config.get('color.message_status_on_color'))(msg))
@@ -44,6 +46,8 @@ def warn(msg):
 
 
 def error(msg):
+    global errors
+    errors += 1
     return print(generateColorFunction(config.get('color.message_error_color'))(msg))
 
 
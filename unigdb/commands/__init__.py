@@ -1,10 +1,140 @@
+import os
 import abc
+import ast
 import sys
+import json
+import importlib
+import importlib.util
 
-from unigdb.color import Color
+from unigdb.color import Color, message
 import unigdb.config
 
 __commands__ = []
+__lazy__ = {}  # : command name -> metadata, see parse_commands(); the module is imported on first use
+
+METADATA_VERSION = 1
+METADATA_CACHE = os.path.join(unigdb.config.UNIGDB_TEMP_DIR, 'commands.json')
+
+unigdb.config.set("self.extra_plugins_dir", "", "Autoload additional UniGDB commands from external directories (';'-separated)")
+
+
+def parse_commands(path):
+    """
+    Metadata of the commands a module registers, read from its source without importing it.
+
+    Returns:
+        A list of dicts: ``class``, ``name``, ``aliases``, ``doc``, and the ``settings`` added by the
+        constructor as ``[name, value, description]``, those whose arguments are literals
+    """
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), path)
+    commands = []
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        decorators = {getattr(d, 'attr', getattr(d, 'id', None)) for d in node.decorator_list}
+        if not decorators & {'register_command', 'register_priority_command'}:
+            continue
+        command = {'class': node.name, 'name': None, 'aliases': [], 'doc': ast.get_docstring(node, clean=False) or '',
+                   'settings': []}
+        for item in node.body:
+            if isinstance(item, ast.Assign) and [getattr(t, 'id', None) for t in item.targets] in (['_cmdline_'], ['_aliases_']):
+                try:
+                    command['name' if item.targets[0].id == '_cmdline_' else 'aliases'] = ast.literal_eval(item.value)
+                except ValueError:
+                    pass
+            elif isinstance(item, ast.FunctionDef) and item.name == '__init__':
+                for call in ast.walk(item):
+                    if isinstance(call, ast.Call) and getattr(call.func, 'attr', None) == 'add_setting':
+                        try:
+                            command['settings'].append([ast.literal_eval(arg) for arg in call.args])
+                        except ValueError:
+                            # computed at import time, registered when the module is imported
+                            pass
+        if command['name']:
+            commands.append(command)
+    return commands
+
+
+def command_modules(directories=()):
+    """``(module name, path)`` of the modules of the package, then of the plugin ``directories``."""
+    package = os.path.dirname(__file__)
+    for fname in sorted(os.listdir(package)):
+        if fname.endswith('.py') and fname != '__init__.py':
+            yield '%s.%s' % (__name__, fname[:-3]), os.path.join(package, fname)
+    for directory in directories:
+        directory = os.path.realpath(os.path.expanduser(directory))
+        if not os.path.isdir(directory):
+            continue
+        for fname in sorted(os.listdir(directory)):
+            if fname.endswith('.py'):
+                yield 'unigdb_plugin_%s' % fname[:-3], os.path.join(directory, fname)
+
+
+def discover(directories=()):
+    """
+    Metadata of the commands of the package and of the plugin ``directories``, with their ``module``
+    and ``path``. It is cached on disk, a module is parsed again only when its size or mtime changed.
+    """
+    try:
+        with open(METADATA_CACHE) as f:
+            cache = json.load(f)
+        if cache.get('version') != METADATA_VERSION:
+            raise ValueError
+    except (OSError, ValueError):
+        cache = {'version': METADATA_VERSION, 'modules': {}}
+    modules, changed = {}, False
+    commands = []
+    for module, path in command_modules(directories):
+        try:
+            st = os.stat(path)
+            entry = cache['modules'].get(path)
+            if entry is None or entry['mtime'] != st.st_mtime_ns or entry['size'] != st.st_size:
+                entry = {'mtime': st.st_mtime_ns, 'size': st.st_size, 'commands': parse_commands(path)}
+                changed = True
+        except (OSError, SyntaxError, ValueError) as e:
+            message.error('{!} Error => Cannot read commands from %s: %s' % (path, e))
+            continue
+        modules[path] = entry
+        commands.extend(dict(command, module=module, path=path) for command in entry['commands'])
+    if changed or len(modules) != len(cache['modules']):
+        try:
+            os.makedirs(os.path.dirname(METADATA_CACHE), exist_ok=True)
+            with open(METADATA_CACHE + '.tmp', 'w') as f:
+                json.dump({'version': METADATA_VERSION, 'modules': modules}, f)
+            os.replace(METADATA_CACHE + '.tmp', METADATA_CACHE)
+        except OSError:
+            pass
+    return commands
+
+
+def register_lazy(metadata):
+    """Register the command of ``metadata`` and its settings, without importing its module."""
+    for setting in metadata['settings']:
+        name, value, description = (setting + [''])[:3]
+        name = '%s.%s' % (metadata['name'], name)
+        if not unigdb.config.has(name):
+            unigdb.config.set(name, value, description)
+    __lazy__[metadata['name']] = metadata
+
+
+def import_command(metadata):
+    """Import the module of the command of ``metadata``, return the class of the command."""
+    module = sys.modules.get(metadata['module'])
+    if module is None:
+        if metadata['module'].startswith(__name__ + '.'):
+            module = importlib.import_module(metadata['module'])
+        else:
+            # a plugin, outside of the package
+            spec = importlib.util.spec_from_file_location(metadata['module'], metadata['path'])
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[metadata['module']] = module
+            try:
+                spec.loader.exec_module(module)
+            except BaseException:
+                del sys.modules[metadata['module']]
+                raise
+    return getattr(module, metadata['class'])
 
 
 def register_command(cls):
@@ -65,8 +195,16 @@ class GenericCommand:
 
     def add_setting(self, name, value, description=""):
         name = '%s.%s' % (self._cmdline_, name)
+        # keep the value registered from the metadata of the command, possibly changed since
+        if unigdb.config.has(name):
+            return unigdb.config.get(name)
         return unigdb.config.set(name, value, description)
 
+    def set_setting(self, name, value):
+        key = self.__get_setting_name(name)
+        _, description = unigdb.config.get(key, get_all=True)
+        return unigdb.config.set(key, value, description)
+
     def del_setting(self, name):
         key = self.__get_setting_name(name)
         return unigdb.config.delete(key)
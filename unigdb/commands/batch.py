@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import argparse
+import multiprocessing
+import cmd2
+from unicorn import UC_HOOK_BLOCK, UC_HOOK_CODE
+
+import unigdb.arch
+import unigdb.proc
+import unigdb.regs
+import unigdb.commands
+import unigdb.snapshot
+from unigdb.color import message, Color
+from unigdb.commands import GenericCommand
+from unigdb.commands.fuzz import reach, inject, execute
+from unigdb.gdbu import parse_and_eval
+
+# State of a worker process, inherited through fork() and completed by init_worker()
+__worker__ = {}
+
+
+class Coverage(object):
+    """Collects the basic blocks and counts the instructions executed by one input."""
+
+    def __init__(self):
+        self.blocks = set()
+        self.insns = 0
+        self.hooks = [unigdb.arch.hook_add(unigdb.arch.UC, UC_HOOK_BLOCK, self.hook_block),
+                      unigdb.arch.hook_add(unigdb.arch.UC, UC_HOOK_CODE, self.hook_code)]
+
+    def hook_block(self, uc, address, size, user_data):
+        self.blocks.add(address)
+
+    def hook_code(self, uc, address, size, user_data):
+        # block sizes do not give the count: Thumb and MIPS16 mix lengths, a stop can end a block early
+        self.insns += 1
+
+    def reset(self):
+        self.blocks = set()
+        self.insns = 0
+
+    def digest(self):
+        """Order-independent hash of the executed blocks."""
+        blocks = sorted(self.blocks)
+        return '%08x' % zlib.crc32(struct.pack('<%dQ' % len(blocks), *blocks))
+
+
+def init_worker():
+    __worker__['snapshot'] = unigdb.snapshot.Snapshot()
+    __worker__['coverage'] = Coverage()
+
+
+def replay(path):
+    """Replay the input file ``path`` in a worker, returns a compact result."""
+    w = __worker__
+    with open(path, 'rb') as f:
+        data = f.read()
+    w['snapshot'].restore()
+    w['coverage'].reset()
+    inject(w['snapshot'], data, w['buffer'], w['register'], w['length_register'])
+    result = execute(w['begin'], w['stop'], w['count'], w['timeout'])
+    return {
+        'file': path,
+        'exit': result,
+        'pc': unigdb.regs.get_register('$pc'),
+        'count': w['coverage'].insns,
+        'coverage': w['coverage'].digest(),
+    }
+
+
+@unigdb.commands.register_command
+class BatchCommand(GenericCommand):
+    """Replay every file of CORPUS from START to STOP in parallel worker processes forked
+    from the current state, and stream one result per input as a JSON line."""
+
+    _cmdline_ = "batch"
+
+    def __init__(self, cls):
+        super(BatchCommand, self).__init__(cls)
+        self.add_setting("jobs", os.cpu_count() or 1, "Default number of worker processes")
+        self.add_setting("chunksize", 16, "Number of inputs sent at once to a worker")
+
+    batch_parser = cmd2.Cmd2ArgumentParser(description=Color.yellowify(__doc__), add_help=False)
+    batch_parser.add_argument('start', metavar='START', help='Address where the workers are forked')
+    batch_parser.add_argument('stop', metavar='STOP', help='Address where a replay ends')
+    batch_parser.add_argument('corpus', metavar='CORPUS', completer_method=cmd2.Cmd.path_complete,
+                              help='Directory of input files')
+    target = batch_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('-b', '--buffer', metavar='ADDR', help='Write each input at ADDR')
+    target.add_argument('-r', '--register', metavar='REG', help='Write each input into register REG')
+    batch_parser.add_argument('-l', '--length-register', metavar='REG', help='Register receiving the input length')
+    batch_parser.add_argument('-j', '--jobs', type=int, help='Number of worker processes')
+    batch_parser.add_argument('-c', '--count', type=int, default=1000000, help='Instruction budget of one replay')
+    batch_parser.add_argument('-t', '--timeout', type=int, default=1000, help='Timeout of one replay in milliseconds')
+    batch_parser.add_argument('-o', '--output', metavar='FILE', completer_method=cmd2.Cmd.path_complete,
+                              help='Write results to FILE instead of stdout')
+
+    @unigdb.proc.OnlyWhenInit
+    @cmd2.with_argparser(batch_parser)
+    def do_batch(self, args: argparse.Namespace):
+        if self.cls.is_running():
+            message.error('{!} Error => Emulation is running, use `interrupt` to stop it')
+            return None
+        if not os.path.isdir(args.corpus):
+            message.error('Directory not found: %s' % args.corpus)
+            return None
+        files = [os.path.join(args.corpus, f) for f in sorted(os.listdir(args.corpus))]
+        files = [f for f in files if os.path.isfile(f)]
+        start = parse_and_eval(args.start)
+
+        self.cls.del_hooks()
+        if not reach(start, args.count):
+            return None
+        __worker__.update({
+            'begin': int(unigdb.arch.CURRENT_ARCH.pc),
+            'stop': parse_and_eval(args.stop),
+            'buffer': parse_and_eval(args.buffer) if args.buffer else None,
+            'register': args.register,
+            'length_register': args.length_register,
+            'count': args.count,
+            'timeout': args.timeout * 1000,
+        })
+
+        jobs = args.jobs or self.get_setting("jobs")
+        out = open(args.output, 'w') if args.output else sys.stdout
+        stats = {'ok': 0, 'crash': 0, 'hang': 0}
+        started = time.time()
+        # fork() hands the prepared engine to every worker without serializing it
+        ctx = multiprocessing.get_context('fork')
+        try:
+            with ctx.Pool(jobs, initializer=init_worker) as pool:
+                for result in pool.imap_unordered(replay, files, chunksize=self.get_setting("chunksize")):
+                    stats[result['exit']] += 1
+                    out.write(json.dumps(result) + '\n')
+        except KeyboardInterrupt:
+            message.warn('Interrupted')
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+        elapsed = time.time() - started
+        message.success('{:d} inputs in {:.2f}s with {:d} workers ({:.1f} execs/s): ok: {:d}  hangs: {:d}  crashes: {:d}'.format(
+            len(files), elapsed, jobs, len(files) / elapsed if elapsed else 0.0,
+            stats['ok'], stats['hang'], stats['crash']))
+        return None
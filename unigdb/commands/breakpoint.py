@@ -1,13 +1,13 @@
 import argparse
 import cmd2
 
-from unigdb.color import Color, message
+from unigdb.color import Color
 import unigdb.commands
+import unigdb.results
+import unigdb.session
 from unigdb.commands import GenericCommand
 from unigdb.gdbu import parse_and_eval
-from unigdb.breakpoints import setBreakpoint, hasBreakpoint
-
-_breakpoints_ = {}
+from unigdb.breakpoints import setBreakpoint
 
 
 @unigdb.commands.register_command
@@ -28,9 +28,10 @@ class BreakCommand(GenericCommand):
         if args.location:
             args.location = parse_and_eval(args.location)
             setBreakpoint(args.location, temporary=False)
-            message.success('Set breakpoint to %#08x' % args.location)
+            unigdb.results.emit(unigdb.results.Breakpoint(args.location))
         else:
-            message.hint('Current breakpoints:')
-            print('Address\tTemporary')
-            for item in unigdb.commands.breakpoint._breakpoints_:
-                print('%#x\t%s' % (item, hasBreakpoint(item)))
+            unigdb.results.emit(unigdb.results.Breakpoints(unigdb.session.current().breakpoints))
+
+
+# the breakpoints are the ones of the current session
+unigdb.session.bind(__name__, {'_breakpoints_': 'breakpoints'})
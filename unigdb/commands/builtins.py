@@ -26,17 +26,10 @@ class RunCommand(GenericCommand):
         super(RunCommand, self).__init__(cls)
 
     def do_run(self, arg):
-        reg_pc = unigdb.regs.get_register('$pc')
-        unigdb.arch.UC.hook_add(UC_HOOK_CODE, self.cls.hook_code)
-        unigdb.arch.UC.hook_add(UC_HOOK_BLOCK, self.cls.hook_block)
-        unigdb.arch.UC.hook_add(UC_HOOK_INTR, self.cls.hook_intr)
-        # emulate machine code in infinite time
-        try:
-            setBreakpoint(reg_pc, temporary=True)
-            unigdb.proc.alive = True
-            unigdb.arch.UC.emu_start(begin=reg_pc, until=reg_pc + 0x10000)
-        except UcError as e:
-            message.error('{!} Error => %s' % e)
+        reg_pc = int(unigdb.arch.CURRENT_ARCH.pc)
+        # stop on the first instruction
+        setBreakpoint(reg_pc & ~1, temporary=True)
+        self.cls.emulate(reg_pc, report=False)
 
 
 @unigdb.commands.register_command
@@ -81,12 +74,33 @@ class ContinueCommand(GenericCommand):
 
     def __init__(self, cls):
         super(ContinueCommand, self).__init__(cls)
+        self.add_setting("count", 0, "Default instruction budget (0 for no limit)")
+        self.add_setting("timeout", 10000, "Default wall-clock timeout in milliseconds (0 for no limit)")
+        self.add_setting("background", False, "Give the shell back while the emulation runs")
 
     con_parser = argparse.ArgumentParser(description=Color.yellowify(__doc__), add_help=False)
-    con_parser.add_argument('n', metavar='N', nargs=argparse.OPTIONAL, help='Step N times')
+    con_parser.add_argument('-c', '--count', type=int, metavar='N', help='Stop after N instructions')
+    con_parser.add_argument('-t', '--timeout', type=int, metavar='MS', help='Stop after MS milliseconds')
+    con_parser.add_argument('-b', '--background', action='store_true', help='Run in background, stop with `interrupt`')
 
+    @unigdb.proc.OnlyWhenInit
     @cmd2.with_argparser(con_parser)
     def do_continue(self, args: argparse.Namespace):
-        pc = int(unigdb.arch.CURRENT_ARCH.pc)
-        unigdb.proc.alive = True
-        unigdb.arch.UC.emu_start(begin=pc, until=pc + 10000)
+        count = self.get_setting("count") if args.count is None else args.count
+        timeout = self.get_setting("timeout") if args.timeout is None else args.timeout
+        background = args.background or self.get_setting("background")
+        self.cls.emulate(int(unigdb.arch.CURRENT_ARCH.pc), count=count, timeout=timeout, background=background)
+
+
+@unigdb.commands.register_command
+class InterruptCommand(GenericCommand):
+    """Interrupt the emulation running in background."""
+
+    _cmdline_ = "interrupt"
+
+    def __init__(self, cls):
+        super(InterruptCommand, self).__init__(cls)
+
+    def do_interrupt(self, arg):
+        if not self.cls.interrupt():
+            message.warn('The emulation is not running')
@@ -15,11 +15,13 @@ import unigdb.ui
 import unigdb.regs
 import unigdb.hexdump
 import unigdb.chain
+import unigdb.results
 import unigdb.disassemble as disass
 
 
 context_hidden = unigdb.config.set('context.context_hidden', False, 'Hide context messages')
 config_arrow_right = unigdb.config.set('theme.chain_arrow_right', '—▸', 'right arrow of chain formatting')
+__watches__ = {}  # : address -> (size, hexdump format) shown by the memory section
 
 
 def clear_screen():
@@ -80,16 +82,18 @@ class ContextCommand(GenericCommand):
             code_addr_color = unigdb.config.get("theme.address_code")
             stack_addr_color = unigdb.config.get("theme.address_stack")
             heap_addr_color = unigdb.config.get("theme.address_heap")
+            mmio_addr_color = unigdb.config.get("theme.address_mmio")
             changed_register_color = unigdb.config.get("theme.registers_value_changed")
 
-            print("[ Legend: {} | {} | {} | {} | {} ]".format(
+            return [("legend", None, unigdb.results.Text(["[ Legend: {} | {} | {} | {} | {} | {} ]".format(
                 Color.colorify("Modified register", changed_register_color),
                 Color.colorify("Code", code_addr_color),
                 Color.colorify("Heap", heap_addr_color),
                 Color.colorify("Stack", stack_addr_color),
+                Color.colorify("MMIO", mmio_addr_color),
                 Color.colorify("String", str_color)
-            ))
-        return None
+            )]))]
+        return []
 
     context_parser = argparse.ArgumentParser(description=Color.yellowify(__doc__), add_help=False)
     context_parser.add_argument('subcommand', nargs='*', default=['legend', 'regs', 'code'])
@@ -109,6 +113,7 @@ class ContextCommand(GenericCommand):
             return None
 
         self.tty_rows, self.tty_columns = unigdb.ui.get_window_size()
+        sections = []
 
         redirect = self.get_setting("redirect")
         if redirect and os.access(redirect, os.W_OK):
@@ -122,122 +127,76 @@ class ContextCommand(GenericCommand):
                 continue
 
             try:
-                self.layout_mapping[section]()
+                sections.extend(self.layout_mapping[section]())
             except Exception as e:
                 # a MemoryError will happen when $pc is corrupted (invalid address)
                 message.error(str(e))
 
-        self.context_title("")
+        unigdb.results.emit(unigdb.results.Context(sections, self.tty_columns))
 
         if redirect and os.access(redirect, os.W_OK):
             unigdb.ui.disable_redirect_output()
         return None
 
-    def context_title(self, m):
-        line_color = unigdb.config.get("theme.context_title_line")
-        msg_color = unigdb.config.get("theme.context_title_message")
-
-        if not m:
-            print(Color.colorify(unigdb.config.HORIZONTAL_LINE * self.tty_columns, line_color))
-            return None
-
-        trail_len = len(m) + 6
-        title = ""
-        title += Color.colorify(
-            "{:{padd}<{width}} ".format(
-                "",
-                width=max(self.tty_columns - trail_len, 0),
-                padd=unigdb.config.HORIZONTAL_LINE
-            ),
-            line_color
-        )
-        title += Color.colorify(m, msg_color)
-        title += Color.colorify(" {:{padd}<4}".format("", padd=unigdb.config.HORIZONTAL_LINE),
-                                line_color)
-        print(title)
-        return None
-
     def context_regs(self):
-        self.context_title("registers")
         ignored_registers = set(self.get_setting("ignore_registers").split())
 
         if self.get_setting("show_registers_raw") is True:
             regs = set(unigdb.arch.CURRENT_ARCH.all_registers)
-            printable_registers = " ".join(list(regs - ignored_registers))
-            self.cls.onecmd_plus_hooks("registers {}".format(printable_registers))
-            return None
+            return [("regs", "registers", unigdb.results.Registers(
+                [reg for reg in unigdb.arch.CURRENT_ARCH.all_registers if reg in regs - ignored_registers]))]
 
-        unigdb.commands.registers.print_registers(
+        return [("regs", "registers", unigdb.results.Registers(
             registers=unigdb.arch.CURRENT_ARCH.all_registers,
             old_registers=self.old_registers,
             ignored_registers=ignored_registers,
             flags=unigdb.arch.CURRENT_ARCH.flags_table
-        )
-        return None
+        ))]
 
     def context_stack(self):
-        self.context_title("stack")
-
         show_raw = self.get_setting("show_stack_raw")
         nb_lines = self.get_setting("nb_lines_stack")
 
         try:
             sp = int(unigdb.arch.CURRENT_ARCH.sp)
             if show_raw is True:
-                mem = unigdb.memory.read(sp, 0x10 * nb_lines)
-                for _, line in enumerate(unigdb.hexdump.hexdump(mem, address=sp)):
-                    print(line)
+                result = unigdb.results.Hexdump(sp, unigdb.memory.read(sp, 0x10 * nb_lines))
             else:
-                for offset in range(nb_lines):
-                    print(unigdb.chain.format(sp + (offset * unigdb.arch.ptrsize)))
-                # gdb.execute("dereference {:#x} l{:d}".format(sp, nb_lines))
+                result = unigdb.results.Telescope(sp, nb_lines)
         except Exception:
             message.error("Cannot read memory from $SP (corrupted stack pointer?)")
+            result = unigdb.results.Text([])
 
-        return None
+        return [("stack", "stack", result)]
 
     def context_code(self):
         nb_insn = self.get_setting("nb_lines_code")
         nb_insn_prev = self.get_setting("nb_lines_code_prev")
-        cur_insn_color = unigdb.config.get("theme.disassemble_current_instruction")
         pc = int(unigdb.arch.CURRENT_ARCH.pc)
 
         # frame = gdb.selected_frame()
         arch_name = "{}:{}".format(unigdb.arch.CURRENT_ARCH.arch.lower(), unigdb.arch.CURRENT_ARCH.mode)
 
-        self.context_title("code:{}".format(arch_name))
-
+        instructions = []
+        branch = None
+        target_instructions = []
         try:
             instruction_iterator = disass.capstone_disassemble
             # instruction_iterator = disass.ida_disassemble if use_ida else instruction_iterator
             for insn in instruction_iterator(pc, nb_insn, nb_prev=nb_insn_prev):
-                line = []
-                is_taken = False
+                instructions.append(insn)
                 target = None
-                text = str(insn)
-
-                if insn.address < pc:
-                    line += Color.grayify("   {}".format(text))
-                elif insn.address == pc:
-                    line += Color.colorify("{:s}{:s}".format(config_arrow_right.rjust(3), text), cur_insn_color)
 
+                if insn.address == pc:
                     if unigdb.arch.CURRENT_ARCH.is_conditional_branch(insn):
-                        is_taken, reason = unigdb.arch.CURRENT_ARCH.is_branch_taken(insn)
-                        if is_taken:
+                        branch = unigdb.arch.CURRENT_ARCH.is_branch_taken(insn)
+                        if branch[0]:
                             target = insn.operands[-1].split()[0]
-                            reason = "[Reason: {:s}]".format(reason) if reason else ""
-                            line += Color.colorify("\tTAKEN {:s}".format(reason), "bold green")
-                        else:
-                            reason = "[Reason: !({:s})]".format(reason) if reason else ""
-                            line += Color.colorify("\tNOT taken {:s}".format(reason), "bold red")
                     elif unigdb.arch.CURRENT_ARCH.is_call(insn) and self.get_setting("peek_calls") is True:
                         target = insn.operands[-1].split()[0]
                     elif unigdb.arch.CURRENT_ARCH.is_ret(insn) and self.get_setting("peek_ret") is True:
                         target = int(unigdb.arch.CURRENT_ARCH.get_ra(insn))
-                else:
-                    line += "   {}".format(text)
 
-                print("".join(line))
                 if target:
                     try:
                         target = int(target, 0)
@@ -246,21 +205,20 @@ class ContextCommand(GenericCommand):
                     except ValueError:
                         # If the operand isn't an address right now we can't parse it
                         continue
-                    for i, tinsn in enumerate(instruction_iterator(target, nb_insn)):
-                        text = "   {}  {}".format(unigdb.config.DOWN_ARROW if i == 0 else " ", str(tinsn))
-                        print(text)
+                    target_instructions = list(instruction_iterator(target, nb_insn))
                     break
         # except Exception as e:
             # message.error("Cannot disassemble from $PC: %s" % e)
         except Exception:
             import traceback
             print(traceback.format_exc())
-        return None
+        return [("code", "code:{}".format(arch_name),
+                 unigdb.results.Code(pc, instructions, branch, target_instructions))]
 
     def context_args(self):
         insn = disass.get_current_instruction(int(unigdb.arch.CURRENT_ARCH.pc))
         if not unigdb.arch.CURRENT_ARCH.is_call(insn):
-            return None
+            return []
 
         self.size2type = {
             1: "BYTE",
@@ -283,10 +241,9 @@ class ContextCommand(GenericCommand):
                 # it's an address, just use as is
                 target = re.sub(r".*(0x[a-fA-F0-9]*).*", r"\1", ops)
 
-        self.print_guessed_arguments(target)
-        return None
+        return [("args", "arguments (guessed)", self.guessed_arguments(target))]
 
-    def print_guessed_arguments(self, function_name):
+    def guessed_arguments(self, function_name):
         """When no symbol, read the current basic block and look for "interesting" instructions."""
 
         def __get_current_block_start_address():
@@ -342,22 +299,17 @@ class ContextCommand(GenericCommand):
             _value = unigdb.chain.format(int(_value))
             args.append("{} = {}".format(Color.colorify(_key, arg_key_color), _value))
 
-        self.context_title("arguments (guessed)")
-        print("{} (".format(function_name))
+        lines = ["{} (".format(function_name)]
         if args:
-            print("   " + ",\n   ".join(args))
-        print(")")
-        return None
+            lines.append("   " + ",\n   ".join(args))
+        lines.append(")")
+        return unigdb.results.Text(lines)
 
     def context_memory(self):
         global __watches__
-        for address, opt in sorted(__watches__.items()):
-            self.context_title("memory:{:#x}".format(address))
-            self.cls.onecmd_plus_hooks("hexdump {fmt:s} {address:d} {size:d}".format(
-                address=address,
-                size=opt[0],
-                fmt=opt[1]
-            ))
+        return [("memory", "memory:{:#x}".format(address),
+                 unigdb.results.Hexdump(address, unigdb.memory.read(address, opt[0])))
+                for address, opt in sorted(__watches__.items())]
 
     @classmethod
     def update_registers(cls, event):
@@ -0,0 +1,162 @@
+import os
+import sys
+import lzma
+import zlib
+import argparse
+import cmd2
+from unicorn import UcError
+
+import unigdb.arch
+import unigdb.proc
+import unigdb.memory
+import unigdb.config
+import unigdb.commands
+from unigdb.color import message, Color
+from unigdb.commands import GenericCommand
+from unigdb.gdbu import parse_and_eval
+
+COMPRESSIONS = ['none', 'zlib', 'lzma']
+EXTENSIONS = {'.zz': 'zlib', '.zlib': 'zlib', '.xz': 'lzma', '.lzma': 'lzma'}
+
+
+def compression_of(path, compression=None):
+    """Compression given on the command line, or guessed from the file extension."""
+    if compression:
+        return compression
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower(), 'none')
+
+
+def decompressed_chunks(f, compression, size):
+    """Yield the content of the file ``f`` in chunks of at most ``size`` bytes, whatever the compression ratio."""
+    if compression == 'zlib':
+        d = zlib.decompressobj()
+        while not d.eof:
+            block = d.unconsumed_tail or f.read(size)
+            if not block:
+                break
+            data = d.decompress(block, size)
+            if data:
+                yield data
+    elif compression == 'lzma':
+        d = lzma.LZMADecompressor()
+        while not d.eof:
+            block = f.read(size) if d.needs_input else b''
+            if d.needs_input and not block:
+                break
+            data = d.decompress(block, size)
+            if data:
+                yield data
+    else:
+        for block in iter(lambda: f.read(size), b''):
+            yield block
+
+
+def progress(done, total):
+    if sys.stdout.isatty():
+        sys.stdout.write('\r[{:3d}%] {:#x}/{:#x} bytes'.format(done * 100 // total if total else 100, done, total))
+        sys.stdout.flush()
+
+
+def progress_end():
+    if sys.stdout.isatty():
+        sys.stdout.write('\n')
+
+
+@unigdb.commands.register_command
+class DumpCommand(GenericCommand):
+    """Save the guest memory from START to END into FILE. The range is streamed in chunks, so
+    the host memory use does not depend on its size."""
+
+    _cmdline_ = "dump"
+
+    def __init__(self, cls):
+        super(DumpCommand, self).__init__(cls)
+        self.add_setting("chunk_size", 0x100000, "Size of the chunks streamed by dump and restore")
+
+    dump_parser = cmd2.Cmd2ArgumentParser(description=Color.yellowify(__doc__), add_help=False)
+    dump_parser.add_argument('what', choices=['memory'], help='What to dump')
+    dump_parser.add_argument('file', metavar='FILE', completer_method=cmd2.Cmd.path_complete,
+                             help='Output file')
+    dump_parser.add_argument('start', metavar='START', help='First address of the range')
+    dump_parser.add_argument('end', metavar='END', help='End address of the range (excluded)')
+    dump_parser.add_argument('-z', '--compress', choices=COMPRESSIONS,
+                             help='Compression of FILE (default: from its extension, .zz or .xz)')
+
+    @unigdb.proc.OnlyWhenInit
+    @cmd2.with_argparser(dump_parser)
+    def do_dump(self, args: argparse.Namespace):
+        start = parse_and_eval(args.start)
+        end = parse_and_eval(args.end)
+        if end <= start:
+            message.error('{!} Error => END must be above START')
+            return None
+        if not unigdb.memory.is_fully_mapped(start, end - start):
+            message.error('{!} Error => %#x-%#x is not entirely mapped' % (start, end))
+            return None
+        compression = compression_of(args.file, args.compress)
+        compressor = {'zlib': zlib.compressobj, 'lzma': lzma.LZMACompressor}.get(compression)
+        compressor = compressor() if compressor else None
+        chunk = self.get_setting("chunk_size")
+        total = end - start
+
+        try:
+            with open(args.file, 'wb') as f:
+                for address in range(start, end, chunk):
+                    data = unigdb.arch.UC.mem_read(address, min(chunk, end - address))
+                    f.write(compressor.compress(data) if compressor else data)
+                    progress(address + len(data) - start, total)
+                if compressor:
+                    f.write(compressor.flush())
+        except (OSError, UcError) as e:
+            progress_end()
+            message.error('{!} Error => %s' % e)
+            return None
+        progress_end()
+        message.success('Dumped %#x bytes from %#x to %s (%s)' % (total, start, args.file, compression))
+        return None
+
+
+@unigdb.commands.register_command
+class RestoreCommand(GenericCommand):
+    """Write the content of FILE, as saved by `dump memory`, into the guest memory at ADDRESS."""
+
+    _cmdline_ = "restore"
+
+    def __init__(self, cls):
+        super(RestoreCommand, self).__init__(cls)
+
+    restore_parser = cmd2.Cmd2ArgumentParser(description=Color.yellowify(__doc__), add_help=False)
+    restore_parser.add_argument('file', metavar='FILE', completer_method=cmd2.Cmd.path_complete,
+                                help='Input file')
+    restore_parser.add_argument('address', metavar='ADDRESS', help='Address where FILE is written')
+    restore_parser.add_argument('-z', '--compress', choices=COMPRESSIONS,
+                                help='Compression of FILE (default: from its extension, .zz or .xz)')
+
+    @unigdb.proc.OnlyWhenInit
+    @cmd2.with_argparser(restore_parser)
+    def do_restore(self, args: argparse.Namespace):
+        if not os.path.isfile(args.file):
+            message.error('File not found: %s' % args.file)
+            return None
+        address = start = parse_and_eval(args.address)
+        compression = compression_of(args.file, args.compress)
+        chunk = unigdb.config.get("dump.chunk_size")
+        total = os.path.getsize(args.file)
+        if compression == 'none' and not unigdb.memory.is_fully_mapped(start, total):
+            message.error('{!} Error => %#x-%#x is not entirely mapped' % (start, start + total))
+            return None
+
+        try:
+            with open(args.file, 'rb') as f:
+                for data in decompressed_chunks(f, compression, chunk):
+                    unigdb.arch.UC.mem_write(address, data)
+                    address += len(data)
+                    # progress of the (compressed) input
+                    progress(f.tell(), total)
+        except (OSError, UcError, zlib.error, lzma.LZMAError) as e:
+            progress_end()
+            message.error('{!} Error => %s at %#x' % (e, address))
+            return None
+        progress_end()
+        message.success('Restored %#x bytes from %s to %#x' % (address - start, args.file, start))
+        return None
@@ -0,0 +1,184 @@
+import os
+import time
+import random
+import hashlib
+import argparse
+import cmd2
+from unicorn import UcError
+
+import unigdb.arch
+import unigdb.proc
+import unigdb.regs
+import unigdb.memory
+import unigdb.config
+import unigdb.commands
+import unigdb.snapshot
+from unigdb.color import message, Color
+from unigdb.commands import GenericCommand
+from unigdb.gdbu import parse_and_eval
+
+
+def load_corpus(path):
+    """Return the content of every file of the corpus directory (or the single file)."""
+    if os.path.isfile(path):
+        return [open(path, 'rb').read()]
+    corpus = []
+    for fname in sorted(os.listdir(path)):
+        fpath = os.path.join(path, fname)
+        if os.path.isfile(fpath):
+            corpus.append(open(fpath, 'rb').read())
+    return corpus
+
+
+def mutate(rnd, data, max_size):
+    """Flip, replace, insert or drop a few random bytes of ``data``."""
+    data = bytearray(data or b'\x00')
+    for _ in range(rnd.randint(1, 4)):
+        choice = rnd.randint(0, 3)
+        pos = rnd.randrange(len(data))
+        if choice == 0:
+            data[pos] ^= 1 << rnd.randint(0, 7)
+        elif choice == 1:
+            data[pos] = rnd.randint(0, 255)
+        elif choice == 2 and len(data) < max_size:
+            data.insert(pos, rnd.randint(0, 255))
+        elif len(data) > 1:
+            del data[pos]
+    return bytes(data[:max_size])
+
+
+def reach(address, count):
+    """Emulate from $pc up to ``address``, returns whether it was reached."""
+    pc = int(unigdb.arch.CURRENT_ARCH.pc)
+    if pc & ~1 == address & ~1:
+        return True
+    try:
+        unigdb.arch.emu_start(unigdb.arch.UC, pc, until=address, count=count)
+    except UcError as e:
+        message.error('{!} Error => %s' % e)
+        return False
+    if unigdb.regs.get_register('$pc') != address & ~1:
+        message.error('Start address %#x was not reached' % address)
+        return False
+    return True
+
+
+def inject(snapshot, data, buffer=None, register=None, length_register=None):
+    """Write one input at ``buffer`` or into ``register``, and its length into ``length_register``."""
+    if buffer is not None:
+        snapshot.touch(buffer, len(data))
+        unigdb.arch.UC.mem_write(buffer, data)
+    else:
+        value = int.from_bytes(data[:unigdb.arch.ptrsize], unigdb.arch.endian)
+        unigdb.regs.set_register(register, value)
+    if length_register:
+        unigdb.regs.set_register(length_register, len(data))
+
+
+def execute(begin, stop, count, timeout):
+    """Run one iteration from ``begin``, returns ``'ok'``, ``'hang'`` or ``'crash'``."""
+    try:
+        unigdb.arch.emu_start(unigdb.arch.UC, begin, until=stop, timeout=timeout, count=count)
+    except UcError:
+        return 'crash'
+    return 'ok' if unigdb.regs.get_register('$pc') == stop & ~1 else 'hang'
+
+
+@unigdb.commands.register_command
+class FuzzCommand(GenericCommand):
+    """Fuzz the code between START and STOP with inputs from CORPUS. The state is snapshotted
+    at START and only the pages dirtied by an iteration are restored before the next one."""
+
+    _cmdline_ = "fuzz"
+
+    def __init__(self, cls):
+        super(FuzzCommand, self).__init__(cls)
+        self.add_setting("crashes_dir", os.path.join(unigdb.config.UNIGDB_TEMP_DIR, "crashes"), "Directory where crashing inputs are saved")
+        self.add_setting("count", 1000000, "Default instruction budget of one iteration")
+        self.add_setting("timeout", 1000, "Default timeout of one iteration in milliseconds")
+        self.add_setting("status_interval", 2, "Seconds between two status lines")
+
+    fuzz_parser = cmd2.Cmd2ArgumentParser(description=Color.yellowify(__doc__), add_help=False)
+    fuzz_parser.add_argument('start', metavar='START', help='Address where the snapshot is taken')
+    fuzz_parser.add_argument('stop', metavar='STOP', help='Address where an iteration ends')
+    fuzz_parser.add_argument('corpus', metavar='CORPUS', completer_method=cmd2.Cmd.path_complete,
+                             help='Input file or directory of input files')
+    target = fuzz_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('-b', '--buffer', metavar='ADDR', help='Write each input at ADDR')
+    target.add_argument('-r', '--register', metavar='REG', help='Write each input into register REG')
+    fuzz_parser.add_argument('-l', '--length-register', metavar='REG', help='Register receiving the input length')
+    fuzz_parser.add_argument('-m', '--max-size', type=int, default=0x1000, help='Maximum input length')
+    fuzz_parser.add_argument('-n', '--iterations', type=int, default=0,
+                             help='Number of executions (mutating the corpus when bigger than it)')
+    fuzz_parser.add_argument('-c', '--count', type=int, help='Instruction budget of one iteration')
+    fuzz_parser.add_argument('-t', '--timeout', type=int, help='Timeout of one iteration in milliseconds')
+    fuzz_parser.add_argument('-o', '--output', metavar='DIR', help='Directory where crashing inputs are saved')
+    fuzz_parser.add_argument('-s', '--seed', type=int, help='Seed of the mutator')
+
+    @unigdb.proc.OnlyWhenInit
+    @cmd2.with_argparser(fuzz_parser)
+    def do_fuzz(self, args: argparse.Namespace):
+        if self.cls.is_running():
+            message.error('{!} Error => Emulation is running, use `interrupt` to stop it')
+            return None
+        start = parse_and_eval(args.start)
+        stop = parse_and_eval(args.stop)
+        if not os.path.exists(args.corpus):
+            message.error('File not found: %s' % args.corpus)
+            return None
+        corpus = [data[:args.max_size] for data in load_corpus(args.corpus)]
+        if not corpus:
+            message.error('Empty corpus: %s' % args.corpus)
+            return None
+        buffer = parse_and_eval(args.buffer) if args.buffer else None
+        count = args.count or self.get_setting("count")
+        timeout = (args.timeout or self.get_setting("timeout")) * 1000
+        crashes_dir = args.output or self.get_setting("crashes_dir")
+        iterations = max(args.iterations, len(corpus))
+
+        # the breakpoint hooks would run for every instruction of every iteration
+        self.cls.del_hooks()
+        if not reach(start, count):
+            return None
+        begin = int(unigdb.arch.CURRENT_ARCH.pc)
+        snapshot = unigdb.snapshot.Snapshot()
+
+        rnd = random.Random(args.seed)
+        stats = {'ok': 0, 'crash': 0, 'hang': 0}
+        crashes = set()
+        started = last_status = time.time()
+        message.hint('Fuzzing %#x-%#x with %d inputs' % (start, stop, iterations))
+        try:
+            for i in range(iterations):
+                data = corpus[i] if i < len(corpus) else mutate(rnd, rnd.choice(corpus), args.max_size)
+                snapshot.restore()
+                inject(snapshot, data, buffer, args.register, args.length_register)
+                result = execute(begin, stop, count, timeout)
+                stats[result] += 1
+                if result == 'crash':
+                    digest = hashlib.sha1(data).hexdigest()
+                    if digest not in crashes:
+                        crashes.add(digest)
+                        os.makedirs(crashes_dir, exist_ok=True)
+                        with open(os.path.join(crashes_dir, 'crash-%s' % digest[:16]), 'wb') as f:
+                            f.write(data)
+
+                now = time.time()
+                if now - last_status >= self.get_setting("status_interval"):
+                    last_status = now
+                    self.print_status(i + 1, now - started, stats, len(crashes))
+        except KeyboardInterrupt:
+            message.warn('Interrupted')
+        finally:
+            snapshot.restore()
+            snapshot.close()
+
+        self.print_status(sum(stats.values()), time.time() - started, stats, len(crashes))
+        if crashes:
+            message.success('%d unique crashes saved to %s' % (len(crashes), crashes_dir))
+        return None
+
+    @staticmethod
+    def print_status(execs, elapsed, stats, unique):
+        print('execs: {:d}  execs/s: {:.1f}  ok: {:d}  hangs: {:d}  crashes: {:d} ({:d} unique)'.format(
+            execs, execs / elapsed if elapsed else 0.0, stats['ok'], stats['hang'], stats['crash'], unique))
@@ -0,0 +1,54 @@
+import argparse
+import cmd2
+
+import unigdb.arch
+import unigdb.proc
+import unigdb.commands
+import unigdb.gdbserver
+from unigdb.color import Color, message
+from unigdb.commands import GenericCommand
+
+
+@unigdb.commands.register_command
+class GdbServerCommand(GenericCommand):
+    """Serve the emulated target over the GDB Remote Serial Protocol on [HOST]:PORT (TCP,
+    localhost by default) or on a UNIX socket PATH, e.g. `gdbserver :1234` then, in gdb-multiarch,
+    `target remote :1234`. Big endian targets need `set endian big` in gdb. The shell is given
+    back when the client detaches, or with Ctrl-C."""
+
+    _cmdline_ = "gdbserver"
+
+    def __init__(self, cls):
+        super(GdbServerCommand, self).__init__(cls)
+        self.add_setting("once", True, "Stop serving after the first client detaches")
+
+    gdbserver_parser = cmd2.Cmd2ArgumentParser(description=Color.yellowify(__doc__), add_help=False)
+    gdbserver_parser.add_argument('address', metavar='[HOST]:PORT|PATH', help='Where to listen')
+
+    @unigdb.proc.OnlyWhenInit
+    @cmd2.with_argparser(gdbserver_parser)
+    def do_gdbserver(self, args: argparse.Namespace):
+        if unigdb.arch.current not in unigdb.gdbserver.REGISTERS:
+            message.error('{!} Error => Architecture %s not supported' % unigdb.arch.current)
+            return None
+        try:
+            sock = unigdb.gdbserver.listen(args.address)
+        except (OSError, ValueError) as e:
+            message.error('{!} Error => Cannot listen on %s: %s' % (args.address, e))
+            return None
+
+        server = unigdb.gdbserver.GdbServer(self.cls, sock)
+        message.success('Listening on %s' % args.address)
+        try:
+            while True:
+                peer = server.accept()
+                message.notice('Client connected %s' % (peer,))
+                server.serve()
+                message.notice('Client disconnected')
+                if self.get_setting("once"):
+                    break
+        except KeyboardInterrupt:
+            message.warn('Interrupted')
+        finally:
+            sock.close()
+        return None
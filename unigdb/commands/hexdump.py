@@ -2,6 +2,7 @@ import cmd2
 import argparse
 
 import unigdb.commands
+import unigdb.results
 from unigdb.color import Color
 from unigdb.commands import GenericCommand
 from unigdb.gdbu import parse_and_eval
@@ -11,7 +12,7 @@ from unigdb.gdbu import parse_and_eval
 class HexDumpCommand(GenericCommand):
     '''Hexdumps data at the specified address (or at $sp)'''
     _cmdline_ = "hexdump"
-    _syntax_ = "{:s} [address|reg] [count]".format(_cmdline_)
+    _syntax_ = "{:s} [address|reg] [count] [-o FILE]".format(_cmdline_)
 
     def __init__(self, cls):
         super(HexDumpCommand, self).__init__(cls)
@@ -23,6 +24,8 @@ class HexDumpCommand(GenericCommand):
     hexdump_parser = cmd2.Cmd2ArgumentParser(description=Color.yellowify(__doc__), add_help=False)
     hexdump_parser.add_argument('address', nargs=argparse.OPTIONAL, help='Address for dump')
     hexdump_parser.add_argument('count', nargs=argparse.OPTIONAL, help='Count bytes of read')
+    hexdump_parser.add_argument('-o', '--output', metavar='FILE', completer_method=cmd2.Cmd.path_complete,
+                                help='Write the dump, without colors, to FILE')
 
     @cmd2.with_argparser(hexdump_parser)
     def do_hexdump(self, args: argparse.Namespace):
@@ -34,6 +37,9 @@ class HexDumpCommand(GenericCommand):
             address = parse_and_eval(args.address)
 
         data = unigdb.memory.read(address, count)
-        for _, line in enumerate(unigdb.hexdump.hexdump(data, address=address, width=width)):
-            print(line)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.writelines(line + '\n' for line in unigdb.hexdump.hexdump(data, address=address, width=width, color=False))
+            return None
+        unigdb.results.emit(unigdb.results.Hexdump(address, data, width))
         return None
@@ -2,6 +2,7 @@ import argparse
 import cmd2
 
 import unigdb.arch
+import unigdb.config
 from unigdb.color import Color
 import unigdb.disassemble as disass
 import unigdb.commands
@@ -36,5 +37,4 @@ class NextInstCommand(GenericCommand):
             if unigdb.arch.CURRENT_ARCH.arch == 'MIPS':
                 step_over = unigdb.arch.CURRENT_ARCH.instruction_length * 2
         setBreakpoint(pc + step_over, temporary=True)
-        unigdb.proc.alive = True
-        unigdb.arch.UC.emu_start(begin=pc, until=pc + 100)
+        self.cls.emulate(pc, timeout=unigdb.config.get('continue.timeout'), report=False)
@@ -0,0 +1,153 @@
+import os
+import sys
+import string
+import hashlib
+import argparse
+import cmd2
+
+import unigdb.arch
+import unigdb.proc
+import unigdb.memory
+import unigdb.config
+import unigdb.commands
+from unigdb.color import Color, message
+from unigdb.commands import GenericCommand
+from unigdb.gdbu import parse_and_eval
+
+__patterns__ = {}  # : (alphabet, n) -> longest pattern generated so far
+__indexes__ = {}  # : (alphabet, n) -> (indexed length, {subsequence as int: offset})
+
+
+def de_bruijn(alphabet, n, length):
+    """Return the first ``length`` bytes of the De Bruijn sequence of order ``n`` over ``alphabet``,
+    the concatenation of the Lyndon words whose length divides ``n`` (same sequence as pwntools)."""
+    k = len(alphabet)
+    table = bytes(alphabet).ljust(256, b'\x00')
+    result = bytearray()
+    word = [-1]
+    while word and len(result) < length:
+        word[-1] += 1
+        m = len(word)
+        if n % m == 0:
+            result += bytes(word).translate(table)
+        while len(word) < n:
+            word.append(word[-m])
+        while word and word[-1] == k - 1:
+            word.pop()
+    # the sequence is cyclic
+    while len(result) < length:
+        result += result[:min(k ** n, length - len(result))]
+    return bytes(result[:length])
+
+
+def get_pattern(alphabet, n, length):
+    """:func:`de_bruijn`, generated once and cached on disk for the longest length so far."""
+    key = (alphabet, n)
+    if len(__patterns__.get(key, b'')) < length:
+        cache_dir = os.path.join(unigdb.config.UNIGDB_TEMP_DIR, 'patterns')
+        path = os.path.join(cache_dir, 'debruijn-%s-%d' % (hashlib.sha1(alphabet).hexdigest()[:16], n))
+        try:
+            with open(path, 'rb') as f:
+                __patterns__[key] = f.read()
+        except OSError:
+            pass
+        if len(__patterns__.get(key, b'')) < length:
+            __patterns__[key] = de_bruijn(alphabet, n, length)
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(__patterns__[key])
+    return __patterns__[key][:length]
+
+
+def get_index(alphabet, n, length):
+    """
+    Return a dict of every subsequence of the first ``length`` bytes of the pattern, as a native
+    integer, to its offset. Indexes are built once per (alphabet, n), for the longest length so far.
+    """
+    key = (alphabet, n)
+    # past one period the subsequences repeat, the first occurrence is enough
+    length = min(length, len(alphabet) ** n + n - 1)
+    if key not in __indexes__ or __indexes__[key][0] < length:
+        pattern = get_pattern(alphabet, n, length)
+        index = {}
+        # one native integer array per alignment, so that the dict is filled at C speed
+        for start in range(n):
+            count = (len(pattern) - start) // n
+            index.update(zip(memoryview(pattern[start:start + count * n]).cast('I' if n == 4 else 'Q'),
+                             range(start, start + count * n, n)))
+        __indexes__[key] = (length, index)
+    return __indexes__[key][1]
+
+
+@unigdb.commands.register_command
+class PatternCommand(GenericCommand):
+    """Generate or search a De Bruijn cyclic pattern, every subsequence of length PERIOD of which
+    is unique. `pattern create LENGTH` prints (or writes into memory) a pattern. `pattern search VALUE`
+    finds the offset of VALUE (register, address, integer or string) in it."""
+
+    _cmdline_ = "pattern"
+
+    def __init__(self, cls):
+        super(PatternCommand, self).__init__(cls)
+        self.add_setting("length", 1024, "Default length of a cyclic pattern")
+        self.add_setting("alphabet", string.ascii_lowercase, "Characters of a cyclic pattern")
+
+    pattern_parser = cmd2.Cmd2ArgumentParser(description=Color.yellowify(__doc__), add_help=False)
+    pattern_parser.add_argument('action', choices=['create', 'search'], help='Create or search a pattern')
+    pattern_parser.add_argument('value', metavar='LENGTH|VALUE', nargs=argparse.OPTIONAL,
+                                help='Length of the pattern to create, or value to search')
+    pattern_parser.add_argument('-n', '--period', type=int, choices=[4, 8],
+                                help='Length of the unique subsequences (default: pointer size)')
+    pattern_parser.add_argument('-l', '--length', type=int, help='Length of the pattern searched')
+    pattern_parser.add_argument('-w', '--write', metavar='ADDRESS', help='Write the created pattern at ADDRESS')
+
+    @cmd2.with_argparser(pattern_parser)
+    def do_pattern(self, args: argparse.Namespace):
+        alphabet = self.get_setting("alphabet").encode()
+        n = args.period or unigdb.arch.ptrsize
+        if args.action == 'create':
+            length = parse_and_eval(args.value) if args.value else self.get_setting("length")
+            if not isinstance(length, int):
+                message.error('{!} Error => Invalid length: %s' % args.value)
+                return None
+            pattern = get_pattern(alphabet, n, length)
+            if args.write:
+                unigdb.memory.write(parse_and_eval(args.write), pattern)
+                message.success('Wrote %d bytes of pattern at %s' % (len(pattern), args.write))
+            else:
+                print(pattern.decode())
+            return None
+
+        if not args.value:
+            message.error('{!} Error => Missing VALUE to search')
+            return None
+        length = args.length or self.get_setting("length")
+        index = get_index(alphabet, n, length)
+        value = parse_and_eval(args.value)
+        if isinstance(value, str):
+            candidates = [(args.value, value.encode())]
+        else:
+            value &= unigdb.arch.ptrmask
+            candidates = [('%#x' % value, value.to_bytes(unigdb.arch.ptrsize, unigdb.arch.endian))]
+            # an address: search its content too
+            if unigdb.proc.init and unigdb.memory.is_mapped(value, n):
+                candidates.append(('content of %#x' % value, bytes(unigdb.memory.read(value, n))))
+
+        found = False
+        for name, needle in candidates:
+            offset = self.lookup(index, alphabet, n, length, needle)
+            if offset is not None:
+                found = True
+                message.success('Found %s (%r) at offset %d' % (name, needle, offset))
+        if not found:
+            message.warn('%s not found in a pattern of %d bytes' % (args.value, length))
+        return None
+
+    @staticmethod
+    def lookup(index, alphabet, n, length, needle):
+        """Offset of ``needle`` in the pattern, or ``None``."""
+        if len(needle) >= n:
+            return index.get(int.from_bytes(needle[:n], sys.byteorder))
+        # shorter than the indexed subsequences, e.g. a 32-bit register against an order 8 pattern
+        offset = get_pattern(alphabet, n, length).find(needle)
+        return None if offset == -1 else offset
@@ -0,0 +1,137 @@
+import os
+import argparse
+import cmd2
+
+import unigdb.arch
+import unigdb.proc
+import unigdb.chain
+import unigdb.memory
+import unigdb.config
+import unigdb.structs
+import unigdb.commands
+from unigdb.color import Color, message
+from unigdb.commands import GenericCommand
+from unigdb.gdbu import parse_and_eval
+
+
+@unigdb.commands.register_command
+class PCustomCommand(GenericCommand):
+    """Apply the structure STRUCT, declared in a C header of the pcustom.struct_path directory,
+    to the memory at ADDRESS. Without ADDRESS show its layout, without STRUCT list the known ones.
+    With --count, show an array of them; with --next, walk the linked list through that field."""
+
+    _cmdline_ = "pcustom"
+    _aliases_ = ["dt", ]
+
+    def __init__(self, cls):
+        super(PCustomCommand, self).__init__(cls)
+        self.add_setting("struct_path", os.path.join(unigdb.config.UNIGDB_TEMP_DIR, "structs"),
+                         "Path to store/load the structure C headers (*.h)")
+        self.add_setting("max_nodes", 1000, "Maximum number of nodes of a linked list walk")
+
+    pcustom_parser = cmd2.Cmd2ArgumentParser(description=Color.yellowify(__doc__), add_help=False)
+    pcustom_parser.add_argument('struct', metavar='STRUCT', nargs=argparse.OPTIONAL, help='Structure name')
+    pcustom_parser.add_argument('address', metavar='ADDRESS', nargs=argparse.OPTIONAL, help='Address of the structure')
+    pcustom_parser.add_argument('-n', '--count', type=int, help='Number of elements of the array (or nodes of the list)')
+    pcustom_parser.add_argument('-l', '--next', metavar='FIELD', help='Pointer field to the next node of a linked list')
+
+    @cmd2.with_argparser(pcustom_parser)
+    def do_pcustom(self, args: argparse.Namespace):
+        try:
+            structs = unigdb.structs.load(self.get_setting("struct_path"))
+        except ValueError as e:
+            message.error('{!} Error => %s' % e)
+            return None
+
+        if not args.struct:
+            self.list_structs(structs)
+            return None
+        if args.struct not in structs:
+            message.error("{!} Error => Unknown structure '%s'" % args.struct)
+            return None
+        layout = structs[args.struct][0]
+        if not args.address:
+            self.print_layout(layout)
+            return None
+        self.apply(layout, parse_and_eval(args.address), args.count, args.next)
+        return None
+
+    @unigdb.proc.OnlyWhenInit
+    def apply(self, layout, address, count, next_field):
+        if next_field:
+            try:
+                field = layout.field(next_field)
+            except KeyError:
+                message.error("{!} Error => No field '%s' in %s" % (next_field, layout.name))
+                return None
+            if field.kind != 'ptr' or field.count is not None:
+                message.error("{!} Error => Field '%s' is not a pointer" % next_field)
+                return None
+            nodes = self.walk(layout, address, field, count or self.get_setting("max_nodes"))
+        else:
+            count = count or 1
+            # the whole array at once
+            data = unigdb.memory.read(address, layout.size * count)
+            nodes = zip(range(address, address + len(data), layout.size), layout.iter_unpack(data))
+
+        shown = 0
+        for i, (node_address, values) in enumerate(nodes):
+            print(Color.colorify('[%d] struct %s @ %#x' % (i, layout.name, node_address),
+                                 unigdb.config.get('theme.table_heading')))
+            self.print_values(values, '  ')
+            shown += 1
+        if not shown:
+            message.error('Cannot read memory at %#x' % address)
+        return None
+
+    @staticmethod
+    def walk(layout, address, field, count):
+        """Yield ``(address, values)`` of the nodes of the list at ``address``, reading each page once."""
+        cache = unigdb.memory.PageCache()
+        seen = set()
+        while address and address not in seen and len(seen) < count:
+            data = cache.read(address, layout.size)
+            if len(data) < layout.size:
+                break
+            seen.add(address)
+            values = layout.unpack(data)
+            yield address, values
+            address = values[layout.fields.index(field)][1]
+
+    def print_values(self, values, indent):
+        for field, value in values:
+            line = '{:s}+{:#06x} {:<16s} {:<20s}'.format(indent, field.offset, field.name, field.type_name)
+            if field.kind == 'struct':
+                print(line)
+                for element in (value if field.count is not None else [value]):
+                    self.print_values(element, indent + '  ')
+                continue
+            print('%s: %s' % (line, self.format_value(field, value)))
+
+    @staticmethod
+    def format_value(field, value):
+        if field.kind == 'string':
+            return Color.colorify(repr(value.decode('latin-1')), unigdb.config.get('theme.dereference_string'))
+        if isinstance(value, list):
+            return '[%s]' % ', '.join(PCustomCommand.format_value(field, v) for v in value)
+        if field.kind == 'float':
+            return repr(value)
+        if field.kind == 'ptr':
+            # one region lookup, no memory read
+            return unigdb.chain.format([value])
+        return '%#x' % value if value >= 0 else '%d' % value
+
+    @staticmethod
+    def print_layout(layout):
+        print(Color.colorify('struct %s (size %#x)' % (layout.name, layout.size), unigdb.config.get('theme.table_heading')))
+        for field in layout.fields:
+            print('  +{:#06x} {:<16s} {:<20s} size {:#x}'.format(
+                field.offset, field.name, field.type_name, field.size * (field.count or 1)))
+
+    def list_structs(self, structs):
+        if not structs:
+            message.warn('No structure in %s' % self.get_setting("struct_path"))
+            return None
+        for name, (layout, path) in sorted(structs.items()):
+            print('{:<24s} size {:#06x}  {:s}'.format(name, layout.size, path))
+        return None
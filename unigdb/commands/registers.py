@@ -6,6 +6,7 @@ import unigdb.commands
 from unigdb.commands import GenericCommand
 import unigdb.arch
 import unigdb.proc
+import unigdb.results
 from unigdb.color import message
 from unigdb.color import Color
 
@@ -45,47 +46,7 @@ def print_registers(registers, ignored_registers=[], old_registers={}, flags=Fal
         old_registers(list): Old registers, needed for check if registers was changed
         flags(bool): Print flags
 
-    Returns:
-        A string representing pointers of each address and reference
+    Each register is shown as:
         REG_NAME: 0x0804a10 —▸ 0x08061000 —▸ AAAA
     '''
-    widest = max(map(len, registers))
-    changed_color = unigdb.config.get("theme.registers_value_changed")
-    regname_color = unigdb.config.get("theme.registers_register_name")
-    line = ''
-    # Print registers value
-    for reg in registers:
-        if reg in ignored_registers:
-            continue
-
-        try:
-            r = unigdb.regs.get_register(reg)
-            # if r.type.code == gdb.TYPE_CODE_VOID:
-            #     continue
-            new_value_type_flag = False
-            new_value = int(r) if r >= 0 else unigdb.arch.ptrmask + int(r) + 1
-        except Exception:
-            # If this exception is triggered, it means that the current register
-            # is corrupted. Just use the register "raw" value (not eval-ed)
-            new_value = unigdb.regs.get_register(reg)
-            new_value_type_flag = False
-        except Exception:
-            new_value = 0
-            new_value_type_flag = False
-
-        old_value = old_registers.get(reg, 0)
-        padreg = reg.ljust(widest, " ")
-        value = new_value
-        if value == old_value:
-            line += "{}: ".format(Color.colorify(padreg, regname_color))
-        else:
-            line += "{}: ".format(Color.colorify(padreg, changed_color))
-        if new_value_type_flag:
-            line += "{:s} ".format(str(value))
-        else:
-            line += unigdb.chain.format(value)
-        print(line)
-        line = ""
-    # Print Flags
-    if flags and unigdb.arch.CURRENT_ARCH.flags_table:
-        print("Flags: {:s}".format(unigdb.arch.CURRENT_ARCH.flag_register_to_human()))
+    unigdb.results.emit(unigdb.results.Registers(registers, ignored_registers, old_registers, flags))
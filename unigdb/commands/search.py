@@ -0,0 +1,93 @@
+import os
+import re
+import argparse
+import cmd2
+
+import unigdb.arch
+import unigdb.proc
+import unigdb.chain
+import unigdb.memory
+import unigdb.config
+import unigdb.search
+import unigdb.commands
+from unigdb.color import Color, message
+from unigdb.commands import GenericCommand
+from unigdb.gdbu import parse_and_eval
+
+
+@unigdb.commands.register_command
+class SearchPatternCommand(GenericCommand):
+    """Search PATTERN in all the mapped memory, or between START and END. PATTERN is an ASCII
+    string by default, or hex bytes, an UTF-16 string, a pointer value or a regular expression."""
+
+    _cmdline_ = "search"
+    _aliases_ = ["search-pattern", "grep", ]
+
+    def __init__(self, cls):
+        super(SearchPatternCommand, self).__init__(cls)
+        self.add_setting("chunk_size", 0x1000000, "Number of bytes read at once")
+        self.add_setting("regex_overlap", 0x100, "Longest regex match which is found across two chunks")
+        self.add_setting("jobs", min(os.cpu_count() or 1, 4), "Number of threads searching the chunks")
+        self.add_setting("max_results", 1000, "Maximum number of matches shown (0 for no limit)")
+
+    search_parser = cmd2.Cmd2ArgumentParser(description=Color.yellowify(__doc__), add_help=False)
+    kind = search_parser.add_mutually_exclusive_group()
+    kind.add_argument('-x', '--hex', action='store_true', help='PATTERN is hex bytes (e.g. "de ad be ef")')
+    kind.add_argument('-u', '--utf16', action='store_true', help='PATTERN is an UTF-16 string, in the current endianness')
+    kind.add_argument('-p', '--pointer', action='store_true', help='PATTERN is a pointer-sized value')
+    kind.add_argument('-e', '--regex', action='store_true', help='PATTERN is a regular expression over bytes')
+    search_parser.add_argument('-j', '--jobs', type=int, help='Number of threads')
+    search_parser.add_argument('-n', '--max-results', type=int, help='Maximum number of matches shown')
+    search_parser.add_argument('pattern', metavar='PATTERN', help='What to search')
+    search_parser.add_argument('start', metavar='START', nargs=argparse.OPTIONAL, help='First address of the range')
+    search_parser.add_argument('end', metavar='END', nargs=argparse.OPTIONAL, help='End address of the range (excluded)')
+
+    @unigdb.proc.OnlyWhenInit
+    @cmd2.with_argparser(search_parser)
+    def do_search(self, args: argparse.Namespace):
+        try:
+            needle = self.compile(args)
+        except (ValueError, re.error) as e:
+            message.error('{!} Error => Invalid pattern: %s' % e)
+            return None
+        if not needle:
+            message.error('{!} Error => Empty pattern')
+            return None
+        start = parse_and_eval(args.start) if args.start else 0
+        end = parse_and_eval(args.end) if args.end else None
+        limit = self.get_setting("max_results") if args.max_results is None else args.max_results
+
+        found = 0
+        matches = unigdb.search.search(needle, start, end,
+                                       chunk_size=self.get_setting("chunk_size"),
+                                       overlap=self.get_setting("regex_overlap") if args.regex else None,
+                                       jobs=args.jobs or self.get_setting("jobs"))
+        try:
+            for address, match in matches:
+                if limit and found >= limit:
+                    message.warn('Stopped after %d matches' % limit)
+                    break
+                found += 1
+                page = unigdb.memory.find(address)
+                print('{:s}  {:<16s} {!r}'.format(unigdb.chain.format([address]), page.objfile if page else '',
+                                                 bytes(match[:32])))
+        finally:
+            matches.close()
+        if found:
+            message.success('%d matches' % found)
+        else:
+            message.warn('Pattern not found')
+        return None
+
+    @staticmethod
+    def compile(args):
+        """Bytes or compiled regex to search."""
+        if args.hex:
+            return bytes.fromhex(args.pattern.replace('\\x', '').replace('0x', ''))
+        if args.utf16:
+            return args.pattern.encode('utf-16-le' if unigdb.arch.endian == 'little' else 'utf-16-be')
+        if args.pointer:
+            return (parse_and_eval(args.pattern) & unigdb.arch.ptrmask).to_bytes(unigdb.arch.ptrsize, unigdb.arch.endian)
+        if args.regex:
+            return re.compile(args.pattern.encode(), re.DOTALL)
+        return args.pattern.encode()
@@ -0,0 +1,48 @@
+import argparse
+import cmd2
+
+import unigdb.proc
+import unigdb.stubs
+import unigdb.commands
+from unigdb.color import Color, message
+from unigdb.commands import GenericCommand
+from unigdb.gdbu import parse_and_eval
+
+
+@unigdb.commands.register_command
+class StubCommand(GenericCommand):
+    """Replace the guest function at LOCATION with a native implementation (memcpy, memset,
+    strlen, ...). Without argument, list the stubs."""
+
+    _cmdline_ = 'stub'
+
+    def __init__(self, cls):
+        super(StubCommand, self).__init__(cls)
+
+    stub_parser = cmd2.Cmd2ArgumentParser(description=Color.yellowify(__doc__), add_help=False)
+    stub_parser.add_argument('-d', '--delete', action='store_true', help='Remove the stub at LOCATION')
+    stub_parser.add_argument('location', metavar='LOCATION', nargs=argparse.OPTIONAL, help='Address of the guest function')
+    stub_parser.add_argument('function', metavar='FUNCTION', nargs=argparse.OPTIONAL,
+                             choices=sorted(unigdb.stubs.__implementations__), help='Native implementation')
+
+    @unigdb.proc.OnlyWhenInit
+    @cmd2.with_argparser(stub_parser)
+    def do_stub(self, args: argparse.Namespace):
+        if not args.location:
+            message.hint('Current stubs:')
+            print('Address\tFunction')
+            for address, (name, _) in sorted(unigdb.stubs.stubs().items()):
+                print('%#x\t%s' % (address, name))
+            return None
+
+        address = parse_and_eval(args.location)
+        if args.delete:
+            if not unigdb.stubs.remove(address):
+                message.error('No stub at %#x' % address)
+            return None
+        if not args.function:
+            message.error('Missing FUNCTION, one of: %s' % ', '.join(sorted(unigdb.stubs.__implementations__)))
+            return None
+        unigdb.stubs.add(address, args.function)
+        message.success('Stubbed %#x with %s' % (address, args.function))
+        return None
@@ -0,0 +1,34 @@
+import argparse
+import cmd2
+
+import unigdb.arch
+import unigdb.proc
+import unigdb.results
+import unigdb.commands
+from unigdb.color import Color
+from unigdb.commands import GenericCommand
+from unigdb.gdbu import parse_and_eval
+
+
+@unigdb.commands.register_command
+class TelescopeCommand(GenericCommand):
+    """Dereference COUNT pointer-sized slots from ADDRESS ($sp by default)."""
+
+    _cmdline_ = "telescope"
+    _aliases_ = ["dereference", ]
+
+    def __init__(self, cls):
+        super(TelescopeCommand, self).__init__(cls)
+        self.add_setting("count", 10, "Default number of slots to dereference")
+
+    telescope_parser = cmd2.Cmd2ArgumentParser(description=Color.yellowify(__doc__), add_help=False)
+    telescope_parser.add_argument('address', metavar='ADDRESS', nargs=argparse.OPTIONAL, help='Address of the first slot')
+    telescope_parser.add_argument('count', metavar='COUNT', nargs=argparse.OPTIONAL, type=int, help='Number of slots')
+
+    @unigdb.proc.OnlyWhenInit
+    @cmd2.with_argparser(telescope_parser)
+    def do_telescope(self, args: argparse.Namespace):
+        address = parse_and_eval(args.address) if args.address else int(unigdb.arch.CURRENT_ARCH.sp)
+        count = args.count or self.get_setting("count")
+        unigdb.results.emit(unigdb.results.Telescope(address, count))
+        return None
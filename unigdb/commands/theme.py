@@ -2,6 +2,7 @@ import argparse
 import cmd2
 
 import unigdb.commands
+import unigdb.color
 from unigdb.commands import GenericCommand
 from unigdb.color import Color
 from unigdb.color import message
@@ -29,6 +30,7 @@ class GefThemeCommand(GenericCommand):
         self.add_setting("address_stack", "pink", "Color to use when a stack address is found")
         self.add_setting("address_heap", "green", "Color to use when a heap address is found")
         self.add_setting("address_code", "red", "Color to use when a code address is found")
+        self.add_setting("address_mmio", "blue", "Color to use when a MMIO address is found")
         self.add_setting("source_current_line", "green", "Color to use for the current code line in the source window")
         self.add_setting('chain_arrow_left', '◂—', 'left arrow of chain formatting')
         self.add_setting('chain_arrow_right', '—▸', 'right arrow of chain formatting')
@@ -59,5 +61,6 @@ class GefThemeCommand(GenericCommand):
             return None
 
         val = [x for x in args.value.split() if x in Color.colors]
-        self.add_setting(setting, " ".join(val))
+        self.set_setting(setting, " ".join(val))
+        unigdb.color.reset()
         return None
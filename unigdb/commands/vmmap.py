@@ -0,0 +1,64 @@
+import argparse
+import cmd2
+
+import unigdb.arch
+import unigdb.proc
+import unigdb.memory
+import unigdb.config
+import unigdb.commands
+from unigdb.color import Color, message
+from unigdb.commands import GenericCommand
+from unigdb.gdbu import parse_and_eval
+
+
+@unigdb.commands.register_command
+class VMMapCommand(GenericCommand):
+    """Display the mapped memory regions, or only the one containing ADDRESS. With --name,
+    name that region instead, or only its SIZE bytes from ADDRESS, which are then shown as a
+    region of their own, e.g. the stack of a flat firmware mapping. [stack], [heap], [mmio],
+    [code] and [data] also set the kind of pointers to it, by default code when executable."""
+
+    _cmdline_ = 'vmmap'
+
+    def __init__(self, cls):
+        super(VMMapCommand, self).__init__(cls)
+
+    vmmap_parser = cmd2.Cmd2ArgumentParser(description=Color.yellowify(__doc__), add_help=False)
+    vmmap_parser.add_argument('-n', '--name', metavar='NAME', help='Name the region containing ADDRESS')
+    vmmap_parser.add_argument('address', metavar='ADDRESS', nargs=argparse.OPTIONAL, help='Address to look up')
+    vmmap_parser.add_argument('size', metavar='SIZE', nargs=argparse.OPTIONAL, help='Size of the range to name')
+
+    @unigdb.proc.OnlyWhenInit
+    @cmd2.with_argparser(vmmap_parser)
+    def do_vmmap(self, args: argparse.Namespace):
+        if args.size and not args.name:
+            message.error('SIZE only applies to --name')
+            return None
+        if args.address:
+            address = parse_and_eval(args.address)
+            if args.name:
+                size = parse_and_eval(args.size) if args.size else None
+                if size is not None and size <= 0:
+                    message.error('Invalid SIZE %s' % args.size)
+                elif not unigdb.memory.name_region(address, args.name, size):
+                    message.warn('%#x is not mapped' % address if size is None else
+                                 '[%#x, %#x) is not fully mapped' % (address, address + size))
+                return None
+            page = unigdb.memory.find(address)
+            if page is None:
+                message.warn('%#x is not mapped' % address)
+                return None
+            pages = [page]
+        else:
+            if args.name:
+                message.error('Missing ADDRESS of the region to name')
+                return None
+            pages = unigdb.memory.get()
+
+        width = 2 + 2 * unigdb.arch.ptrsize
+        headers = ['Start', 'End', 'Perm', 'Size', 'Offset', 'File']
+        print(Color.colorify('{:>{w}s} {:>{w}s} {:4s} {:>8s} {:6s} {:s}'.format(*headers, w=width),
+                             unigdb.config.get('theme.table_heading')))
+        for page in pages:
+            print(str(page))
+        return None
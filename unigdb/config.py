@@ -13,6 +13,8 @@ import os
 import sys
 import tempfile
 
+import unigdb.session
+
 __config__ = {}
 __unigdb__ = None
 
@@ -32,6 +34,10 @@ def get(name, get_all=False):
     setting = module.__config__.get(name, None)
     if not setting or get_all:
         return setting
+    # values overridden by the current session, e.g. another target driven from a thread
+    overrides = unigdb.session.current().config
+    if name in overrides:
+        return overrides[name]
     return setting[0]
 
 
@@ -1,4 +1,5 @@
-import sys
+import functools
+import importlib
 import unigdb.arch
 import unigdb.memory
 
@@ -129,6 +130,16 @@ def get_next_instruction(addr):
 #         yield insn
 
 
+@functools.lru_cache()
+def get_disassembler(arch, mode, endian):
+    """Capstone disassembler, capstone being imported on the first disassembly."""
+    capstone = importlib.import_module('capstone')
+    cs = capstone.Cs(getattr(capstone, 'CS_ARCH_%s' % arch),
+                     getattr(capstone, 'CS_MODE_%s' % mode) | getattr(capstone, 'CS_MODE_%s_ENDIAN' % endian.upper()))
+    cs.detail = True
+    return cs
+
+
 def capstone_disassemble(location, count, **kwargs):
     """Disassemble `count` instructions after `addr` and `nb_prev` before
     `addr` using the Capstone-Engine disassembler, if available.
@@ -140,12 +151,7 @@ def capstone_disassemble(location, count, **kwargs):
         ops = [] + cs_insn.op_str.split(", ")
         return Instruction(cs_insn.address, loc, cs_insn.mnemonic, ops)
 
-    capstone = sys.modules["capstone"]
-    arch = getattr(capstone, 'CS_ARCH_%s' % unigdb.arch.CURRENT_ARCH.arch)
-    mode = getattr(capstone, 'CS_MODE_%s' % unigdb.arch.CURRENT_ARCH.mode)
-    mode |= getattr(capstone, 'CS_MODE_%s_ENDIAN' % unigdb.arch.endian.upper())
-    cs = capstone.Cs(arch, mode)
-    cs.detail = True
+    cs = get_disassembler(unigdb.arch.CURRENT_ARCH.arch, unigdb.arch.CURRENT_ARCH.mode, unigdb.arch.endian)
 
     page_start = unigdb.memory.page_size_align(location)
     offset = location - page_start
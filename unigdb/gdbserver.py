@@ -0,0 +1,373 @@
+"""
+GDB Remote Serial Protocol server, to debug the emulated target from a stock
+gdb (``target remote``), IDA or Ghidra.
+
+The server maps the packets onto the registers, the memory, the breakpoints
+and the emulation of a :class:`unigdb.gdbu.CoreShell`. The registers are
+described to the client with ``qXfer:features:read``, every register packet
+is served by one batched register read and every memory packet by one bulk
+read.
+"""
+import os
+import select
+import socket
+
+from unicorn import UcError
+import unicorn.arm_const as arm
+import unicorn.mips_const as mips
+
+import unigdb.arch
+import unigdb.memory
+import unigdb.regs
+import unigdb.breakpoints
+
+PACKET_SIZE = 0x4000
+
+SIGINT = 2
+SIGILL = 4
+SIGTRAP = 5
+SIGSEGV = 11
+
+# Registers of the target descriptions, as (name, bitsize, gdb register number, unicorn register
+# or None when unicorn does not have it, type, feature), in the order of the `g` packet.
+ARM_REGISTERS = [('r%d' % i, 32, i, getattr(arm, 'UC_ARM_REG_R%d' % i), 'uint32', 'org.gnu.gdb.arm.core')
+                 for i in range(13)] + [
+    ('sp', 32, 13, arm.UC_ARM_REG_SP, 'data_ptr', 'org.gnu.gdb.arm.core'),
+    ('lr', 32, 14, arm.UC_ARM_REG_LR, 'int', 'org.gnu.gdb.arm.core'),
+    ('pc', 32, 15, arm.UC_ARM_REG_PC, 'code_ptr', 'org.gnu.gdb.arm.core'),
+    ('cpsr', 32, 25, arm.UC_ARM_REG_CPSR, 'int', 'org.gnu.gdb.arm.core'),
+]
+
+MIPS_REGISTERS = [('r%d' % i, 32, i, mips.UC_MIPS_REG_0 + i, 'int', 'org.gnu.gdb.mips.cpu') for i in range(32)] + [
+    ('status', 32, 32, mips.UC_MIPS_REG_CP0_STATUS, 'int', 'org.gnu.gdb.mips.cp0'),
+    ('lo', 32, 33, mips.UC_MIPS_REG_LO, 'int', 'org.gnu.gdb.mips.cpu'),
+    ('hi', 32, 34, mips.UC_MIPS_REG_HI, 'int', 'org.gnu.gdb.mips.cpu'),
+    ('badvaddr', 32, 35, None, 'int', 'org.gnu.gdb.mips.cp0'),
+    ('cause', 32, 36, None, 'int', 'org.gnu.gdb.mips.cp0'),
+    ('pc', 32, 37, mips.UC_MIPS_REG_PC, 'int', 'org.gnu.gdb.mips.cpu'),
+] + [('f%d' % i, 32, 38 + i, None, 'ieee_single', 'org.gnu.gdb.mips.fpu') for i in range(32)] + [
+    ('fcsr', 32, 70, mips.UC_MIPS_REG_FCSR, 'int', 'org.gnu.gdb.mips.fpu'),
+    ('fir', 32, 71, mips.UC_MIPS_REG_FIR, 'int', 'org.gnu.gdb.mips.fpu'),
+]
+
+REGISTERS = {
+    'arm': ('arm', ARM_REGISTERS),
+    'mips': ('mips', MIPS_REGISTERS),
+}
+
+
+def target_description(architecture, registers):
+    """Target description XML of the registers."""
+    xml = ['<?xml version="1.0"?>', '<!DOCTYPE target SYSTEM "gdb-target.dtd">',
+           '<target version="1.0">', '<architecture>%s</architecture>' % architecture]
+    feature = None
+    for name, bitsize, regnum, _, type_, reg_feature in sorted(registers, key=lambda reg: (reg[5], reg[2])):
+        if reg_feature != feature:
+            if feature:
+                xml.append('</feature>')
+            xml.append('<feature name="%s">' % reg_feature)
+            feature = reg_feature
+        xml.append('<reg name="%s" bitsize="%d" regnum="%d" type="%s"/>' % (name, bitsize, regnum, type_))
+    xml += ['</feature>', '</target>']
+    return '\n'.join(xml)
+
+
+def checksum(data):
+    return sum(data) & 0xff
+
+
+def escape(data):
+    """Escape the bytes of a binary reply which are special in the protocol."""
+    for c in b'}#$*':
+        data = data.replace(bytes([c]), bytes([0x7d, c ^ 0x20]))
+    return data
+
+
+def unescape(data):
+    out = bytearray()
+    it = iter(data)
+    for c in it:
+        out.append(next(it) ^ 0x20 if c == 0x7d else c)
+    return bytes(out)
+
+
+def listen(address):
+    """Listening socket for ``[HOST]:PORT`` (TCP, localhost by default) or a UNIX socket path."""
+    if ':' in address:
+        host, port = address.rsplit(':', 1)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host or '127.0.0.1', int(port)))
+    else:
+        if os.path.exists(address):
+            os.unlink(address)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(address)
+    sock.listen(1)
+    return sock
+
+
+class GdbServer(object):
+    """Serves one client at a time over a listening socket."""
+
+    def __init__(self, shell, sock):
+        self.shell = shell
+        self.sock = sock
+        self.conn = None
+        self.buffer = b''
+        self.ack = True
+        # answered to `?`, e.g. a client reconnecting after the target exited
+        self.last_stop = 'S%02x' % SIGTRAP
+        self.architecture, self.registers = REGISTERS[unigdb.arch.current]
+        self.by_regnum = {reg[2]: reg for reg in self.registers}
+        self.xml = target_description(self.architecture, self.registers).encode()
+        self.handlers = {
+            '?': self.handle_stop_reason,
+            'g': self.handle_read_registers,
+            'G': self.handle_write_registers,
+            'p': self.handle_read_register,
+            'P': self.handle_write_register,
+            'm': self.handle_read_memory,
+            'M': self.handle_write_memory,
+            'X': self.handle_write_memory_binary,
+            'Z': self.handle_insert_breakpoint,
+            'z': self.handle_remove_breakpoint,
+            'c': self.handle_continue,
+            's': self.handle_step,
+            'q': self.handle_query,
+            'Q': self.handle_set,
+            'H': self.handle_ok,
+            'T': self.handle_ok,
+            'D': self.handle_detach,
+        }
+
+    # Transport
+
+    def accept(self):
+        self.conn, peer = self.sock.accept()
+        if self.conn.family == socket.AF_INET:
+            self.conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buffer = b''
+        self.ack = True
+        return peer
+
+    def recv(self):
+        data = self.conn.recv(PACKET_SIZE)
+        if not data:
+            raise EOFError
+        self.buffer += data
+
+    def read_packet(self):
+        """Next packet payload, or ``b'\\x03'`` for an interrupt."""
+        while True:
+            # skip the acks
+            self.buffer = self.buffer.lstrip(b'+-')
+            if self.buffer[:1] == b'\x03':
+                self.buffer = self.buffer[1:]
+                return b'\x03'
+            start = self.buffer.find(b'$')
+            end = self.buffer.find(b'#', start)
+            if start != -1 and end != -1 and len(self.buffer) >= end + 3:
+                payload = self.buffer[start + 1:end]
+                expected = self.buffer[end + 1:end + 3]
+                self.buffer = self.buffer[end + 3:]
+                if self.ack:
+                    valid = int(expected, 16) == checksum(payload)
+                    self.conn.sendall(b'+' if valid else b'-')
+                    if not valid:
+                        continue
+                return payload
+            self.recv()
+
+    def send(self, payload):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        self.conn.sendall(b'$%s#%02x' % (payload, checksum(payload)))
+
+    def interrupted(self):
+        """Whether the client sent an interrupt, without blocking."""
+        if select.select([self.conn], [], [], 0)[0]:
+            self.recv()
+        if b'\x03' in self.buffer:
+            self.buffer = self.buffer.replace(b'\x03', b'', 1)
+            return True
+        return False
+
+    def serve(self):
+        """Answer the packets of the connected client until it detaches or disconnects."""
+        try:
+            while True:
+                payload = self.read_packet()
+                if payload == b'\x03':
+                    continue
+                if payload[:1] == b'k':
+                    break
+                packet = payload.decode('latin-1')
+                handler = self.handlers.get(packet[:1])
+                reply = handler(packet) if handler else ''
+                self.send(reply)
+                if packet == 'QStartNoAckMode':
+                    # the reply itself is still acknowledged
+                    self.ack = False
+                if packet[:1] == 'D':
+                    break
+        except (EOFError, ConnectionError):
+            pass
+        finally:
+            self.conn.close()
+            self.conn = None
+
+    # Registers
+
+    def encode_register(self, reg, value):
+        size = reg[1] // 8
+        if value is None:
+            return 'xx' * size
+        return (value & ((1 << reg[1]) - 1)).to_bytes(size, unigdb.arch.endian).hex()
+
+    def handle_read_registers(self, packet):
+        available = [reg for reg in self.registers if reg[3] is not None]
+        values = dict(zip((reg[3] for reg in available), unigdb.arch.UC.reg_read_batch([reg[3] for reg in available])))
+        return ''.join(self.encode_register(reg, values.get(reg[3])) for reg in self.registers)
+
+    def handle_write_registers(self, packet):
+        data = bytes.fromhex(packet[1:].replace('x', '0'))
+        offset = 0
+        for reg in self.registers:
+            size = reg[1] // 8
+            if reg[3] is not None and offset + size <= len(data):
+                unigdb.arch.UC.reg_write(reg[3], int.from_bytes(data[offset:offset + size], unigdb.arch.endian))
+            offset += size
+        return 'OK'
+
+    def handle_read_register(self, packet):
+        reg = self.by_regnum.get(int(packet[1:], 16))
+        if reg is None:
+            return 'E45'
+        return self.encode_register(reg, unigdb.arch.UC.reg_read(reg[3]) if reg[3] is not None else None)
+
+    def handle_write_register(self, packet):
+        regnum, value = packet[1:].split('=')
+        reg = self.by_regnum.get(int(regnum, 16))
+        if reg is None:
+            return 'E45'
+        if reg[3] is not None:
+            unigdb.arch.UC.reg_write(reg[3], int.from_bytes(bytes.fromhex(value), unigdb.arch.endian))
+        return 'OK'
+
+    # Memory
+
+    def handle_read_memory(self, packet):
+        address, length = (int(x, 16) for x in packet[1:].split(','))
+        # a read running past the end of the memory answers its readable prefix
+        data = unigdb.memory.read_mapped(address, min(length, PACKET_SIZE // 2))
+        if length and not data:
+            return 'E14'
+        return bytes(data).hex()
+
+    def handle_write_memory(self, packet):
+        location, data = packet[1:].split(':')
+        address, _ = (int(x, 16) for x in location.split(','))
+        return self.write_memory(address, bytes.fromhex(data))
+
+    def handle_write_memory_binary(self, packet):
+        location, data = packet[1:].split(':', 1)
+        address, _ = (int(x, 16) for x in location.split(','))
+        return self.write_memory(address, unescape(data.encode('latin-1')))
+
+    def write_memory(self, address, data):
+        try:
+            unigdb.arch.UC.mem_write(address, data)
+            # the code translated from the previous bytes would still run
+            unigdb.arch.UC.ctl_remove_cache(address, address + len(data))
+        except UcError:
+            return 'E14'
+        return 'OK'
+
+    # Breakpoints, only software and hardware breakpoints (no watchpoints)
+
+    def handle_insert_breakpoint(self, packet):
+        kind, address, _ = packet[1:].split(',')
+        if kind not in ('0', '1'):
+            return ''
+        unigdb.breakpoints.setBreakpoint(int(address, 16), temporary=False)
+        return 'OK'
+
+    def handle_remove_breakpoint(self, packet):
+        kind, address, _ = packet[1:].split(',')
+        if kind not in ('0', '1'):
+            return ''
+        try:
+            unigdb.breakpoints.delBreakpoint(int(address, 16))
+        except KeyError:
+            pass
+        return 'OK'
+
+    # Execution
+
+    def resume(self, packet, count):
+        if len(packet) > 1:
+            unigdb.regs.set_register('$pc', int(packet[1:], 16))
+        emulation = self.shell.start_emulation(int(unigdb.arch.CURRENT_ARCH.pc), count=count)
+        try:
+            while emulation.is_alive():
+                emulation.join(0.05)
+                if self.interrupted():
+                    self.shell.interrupt()
+        finally:
+            # e.g. the client disconnected, the engine must not run on without a debugger
+            while emulation.is_alive():
+                self.shell.interrupt()
+                emulation.join(0.05)
+            self.shell.emulation = None
+        self.last_stop = self.stop_reply()
+        return self.last_stop
+
+    def stop_reply(self):
+        reason = self.shell.stop_reason or ''
+        if reason.startswith('exited with code'):
+            return 'W%02x' % (int(reason.split()[-1]) & 0xff)
+        if reason == 'interrupted':
+            return 'S%02x' % SIGINT
+        if reason.startswith('error'):
+            return 'S%02x' % (SIGILL if 'INSN_INVALID' in reason else SIGSEGV)
+        return 'S%02x' % SIGTRAP
+
+    def handle_continue(self, packet):
+        return self.resume(packet, 0)
+
+    def handle_step(self, packet):
+        return self.resume(packet, 1)
+
+    def handle_stop_reason(self, packet):
+        return self.last_stop
+
+    # Queries
+
+    def handle_query(self, packet):
+        if packet.startswith('qSupported'):
+            return 'PacketSize=%x;qXfer:features:read+;QStartNoAckMode+' % PACKET_SIZE
+        if packet.startswith('qXfer:features:read:target.xml:'):
+            offset, length = (int(x, 16) for x in packet.rsplit(':', 1)[1].split(','))
+            chunk = self.xml[offset:offset + length]
+            return (b'l' if offset + length >= len(self.xml) else b'm') + escape(chunk)
+        if packet == 'qAttached':
+            return '1'
+        if packet == 'qC':
+            return 'QC1'
+        if packet == 'qfThreadInfo':
+            return 'm1'
+        if packet == 'qsThreadInfo':
+            return 'l'
+        return ''
+
+    def handle_set(self, packet):
+        if packet == 'QStartNoAckMode':
+            return 'OK'
+        return ''
+
+    def handle_ok(self, packet):
+        return 'OK'
+
+    def handle_detach(self, packet):
+        return 'OK'
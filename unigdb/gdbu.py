@@ -1,8 +1,16 @@
 import cmd2
 import argparse
+from unicorn import UcError, UC_HOOK_CODE, UC_HOOK_BLOCK, UC_HOOK_INTR, UC_HOOK_INSN
+from unicorn.x86_const import UC_X86_INS_SYSCALL
 import re
 import binascii
+import io
+import json
 import sys
+import time
+import threading
+import contextlib
+import contextvars
 import functools
 import platform
 
@@ -11,7 +19,19 @@ import unigdb.prompt
 import unigdb.regs
 import unigdb.proc
 import unigdb.breakpoints
-from unigdb.color import Color
+import unigdb.results
+import unigdb.syscalls
+import unigdb.ui
+from unigdb.color import Color, message
+
+# Exit status of a batch run
+EXIT_OK = 0
+EXIT_COMMAND_ERROR = 1  # a command failed
+EXIT_USAGE = 2  # bad command line or unreadable script
+EXIT_EMULATION_ERROR = 3  # the last emulation stopped on an error (e.g. invalid memory access)
+
+# Commands allowed while an emulation runs in background, none of them touches the engine
+RUNNING_COMMANDS = {'interrupt', 'help', 'history', 'show', 'shell', 'quit', 'eof'}
 
 
 class CoreShell(cmd2.Cmd):
@@ -19,24 +39,35 @@ class CoreShell(cmd2.Cmd):
     prompt = '(gdbu) '
     print_table_count = 5
 
-    def __init__(self):
+    def __init__(self, batch=False):
         self.locals_in_py = True
         self.default_category = 'UniGDB Built-in Commands'
+        self.listing_commands = False
         super(CoreShell, self).__init__(
-            persistent_history_file='/tmp/.unigdb_history', shortcuts={},
+            persistent_history_file=None if batch else '/tmp/.unigdb_history', shortcuts={},
         )
-        # load modules
-        for cmdClass in unigdb.commands.__commands__:
-            self.register_cmd_class(cmdClass(self))
+        # register the commands from their metadata, their modules are imported on first use
+        self.register_commands()
+        # handle resize event to refresh the cached terminal size
+        unigdb.ui.handle_resize()
         self.intro = initial_message()
 
         self.aliases['q'] = 'quit'
         # Set enviroment variables
         self.mapping_size = 2 * 1024 * 1024 * 1024
         self.mapping = 0x100000
+        self.uc_hooks = []
+        self.insn_count = 0
+        self.stop_reason = None
+        self.emulation = None
+        self.emulation_time = 0
         self.add_settable(cmd2.Settable('arch', str, 'Target architecrute'))
         self.add_settable(cmd2.Settable('mapping', int, 'Memory start map address'))
         self.add_settable(cmd2.Settable('mapping_size', int, 'Memory mapping size in bytes'))
+        self.add_settable(cmd2.Settable('disable_colors', bool, 'Disable all colors in UniGDB'))
+        self.add_settable(cmd2.Settable('output_format', str, 'Output of the core commands',
+                                        choices=unigdb.results.FORMATS))
+        self.add_settable(cmd2.Settable('extra_plugins_dir', str, "Directories of additional commands (';'-separated)"))
 
         # remove unneeded commands
         del cmd2.Cmd.do_shortcuts
@@ -48,6 +79,57 @@ class CoreShell(cmd2.Cmd):
         del cmd2.Cmd.do_run_pyscript
         self.async_update_prompt(unigdb.prompt.set_prompt())
 
+    def register_commands(self):
+        """Register the commands of the package and of `self.extra_plugins_dir` not loaded yet."""
+        directories = [d for d in unigdb.config.get('self.extra_plugins_dir').split(';') if d]
+        for metadata in unigdb.commands.discover(directories):
+            name = metadata['name']
+            if name in unigdb.commands.__lazy__ or not hasattr(self, 'do_%s' % name):
+                self.register_lazy_command(metadata)
+
+    def register_lazy_command(self, metadata):
+        """Register a command, its aliases and its settings from its metadata, without importing it."""
+        name = metadata['name']
+        unigdb.commands.register_lazy(metadata)
+
+        def do_command(shell, statement):
+            if shell.load_command(name):
+                return shell.cmd_func(name)(statement)
+            return None
+        # shown by `help -v`
+        do_command.__doc__ = metadata['doc']
+        setattr(CoreShell, 'do_%s' % name, do_command)
+        for item in metadata['aliases']:
+            self.aliases[item] = name
+
+    def load_command(self, name):
+        """Import the module of the command `name` registered from its metadata, and register the command."""
+        metadata = unigdb.commands.__lazy__.pop(name, None)
+        if metadata is None:
+            return hasattr(self, 'do_%s' % name)
+        try:
+            command = unigdb.commands.import_command(metadata)(self)
+        except Exception as e:
+            message.error('{!} Error => Cannot load command %s from %s: %s' % (name, metadata['path'], e))
+            delattr(CoreShell, 'do_%s' % name)
+            return False
+        self.register_cmd_class(command)
+        return True
+
+    def cmd_func(self, command):
+        # the command is about to run or to be completed, its module is needed
+        if command in unigdb.commands.__lazy__ and not self.listing_commands:
+            self.load_command(command)
+        return super(CoreShell, self).cmd_func(command)
+
+    def _help_menu(self, verbose=False):
+        # the listing only needs the metadata of the commands
+        self.listing_commands = True
+        try:
+            return super(CoreShell, self)._help_menu(verbose)
+        finally:
+            self.listing_commands = False
+
     def register_cmd_class(self, cls):
         name = cls._cmdline_
         setattr(CoreShell, 'do_%s' % name, getattr(cls, 'do_%s' % name))
@@ -58,9 +140,68 @@ class CoreShell(cmd2.Cmd):
         for item in cls._aliases_:
             self.aliases[item] = name
 
+    def onecmd(self, statement, *, add_to_history=True):
+        if not isinstance(statement, cmd2.Statement):
+            statement = self._input_line_to_statement(statement)
+        # Unicorn is not thread safe, nothing may read or write it while it runs
+        if self.is_running() and statement.command not in RUNNING_COMMANDS:
+            message.error('{!} Error => Emulation is running, use `interrupt` to stop it')
+            return False
+        return super(CoreShell, self).onecmd(statement, add_to_history=add_to_history)
+
     def do_quit(self, arg):
         return True
 
+    def run_commands(self, commands, json_output=False):
+        """
+        Run ``commands`` without the interactive prompt.
+
+        Arguments:
+            commands(list): command lines
+            json_output(bool): print one JSON object per command instead of its output: the
+                structured results of the core commands, and the uncolored text of the others
+
+        Returns:
+            The exit status of the run, ``EXIT_OK`` when every command succeeded
+        """
+        status = EXIT_OK
+        background, doc = unigdb.config.get('continue.background', get_all=True)
+        # nobody would get the shell back while the emulation runs
+        unigdb.config.set('continue.background', False, doc)
+        if json_output:
+            self.disable_colors = True
+        try:
+            for line in commands:
+                errors = message.errors
+                self.stop_reason = None
+                output, error_output = io.StringIO(), io.StringIO()
+                stdout, self.stdout = self.stdout, output if json_output else self.stdout
+                try:
+                    with contextlib.redirect_stderr(error_output), \
+                            contextlib.redirect_stdout(output if json_output else sys.stdout), \
+                            unigdb.results.collect() if json_output else contextlib.nullcontext() as results:
+                        stop = self.onecmd_plus_hooks(line, add_to_history=False)
+                finally:
+                    self.stdout = stdout
+                # argparse and cmd2 errors go to stderr, UniGDB errors to message.error()
+                failed = bool(error_output.getvalue()) or message.errors != errors
+                # the first failure gives the exit status
+                if status == EXIT_OK and failed:
+                    status = EXIT_COMMAND_ERROR
+                elif status == EXIT_OK and self.stop_reason and self.stop_reason.startswith('error'):
+                    status = EXIT_EMULATION_ERROR
+                if json_output:
+                    print(json.dumps({'command': line, 'ok': not failed, 'stop_reason': self.stop_reason,
+                                      'results': results, 'output': output.getvalue(),
+                                      'error': error_output.getvalue()}))
+                else:
+                    sys.stderr.write(error_output.getvalue())
+                if stop:
+                    break
+        finally:
+            unigdb.config.set('continue.background', background, doc)
+        return status
+
     @property
     def arch(self) -> str:
         """Read-only property needed to support do_set when it reads arch"""
@@ -74,6 +215,8 @@ class CoreShell(cmd2.Cmd):
         if new_val in arches:
             endian = 'little' if new_val.endswith('el') else 'big'
             unigdb.arch.update(new_val[:-2], endian)
+            # hooks belong to the previous engine
+            self.uc_hooks = []
             self.do_map(None)
         else:
             self.perror('Invalid value: {}'.format(new_val))
@@ -87,6 +230,44 @@ class CoreShell(cmd2.Cmd):
             txt = txt.strip(', ')
             self.perror('Valid values: {}'.format(txt))
 
+    @property
+    def disable_colors(self) -> bool:
+        """Read-only property needed to support do_set when it reads disable_colors"""
+        return unigdb.config.get('self.disable_colors')
+
+    @disable_colors.setter
+    def disable_colors(self, new_val: bool) -> None:
+        """Setter property needed to support do_set when it updates disable_colors"""
+        _, doc = unigdb.config.get('self.disable_colors', get_all=True)
+        unigdb.config.set('self.disable_colors', new_val, doc)
+        unigdb.color.reset()
+        self.async_update_prompt(unigdb.prompt.set_prompt())
+
+    @property
+    def output_format(self) -> str:
+        """Read-only property needed to support do_set when it reads output_format"""
+        return unigdb.config.get('self.output_format')
+
+    @output_format.setter
+    def output_format(self, new_val: str) -> None:
+        """Setter property needed to support do_set when it updates output_format"""
+        if new_val not in unigdb.results.FORMATS:
+            raise ValueError('must be one of: %s' % ', '.join(unigdb.results.FORMATS))
+        _, doc = unigdb.config.get('self.output_format', get_all=True)
+        unigdb.config.set('self.output_format', new_val, doc)
+
+    @property
+    def extra_plugins_dir(self) -> str:
+        """Read-only property needed to support do_set when it reads extra_plugins_dir"""
+        return unigdb.config.get('self.extra_plugins_dir')
+
+    @extra_plugins_dir.setter
+    def extra_plugins_dir(self, new_val: str) -> None:
+        """Setter property needed to support do_set when it updates extra_plugins_dir"""
+        _, doc = unigdb.config.get('self.extra_plugins_dir', get_all=True)
+        unigdb.config.set('self.extra_plugins_dir', new_val, doc)
+        self.register_commands()
+
     set_parser = cmd2.Cmd2ArgumentParser(add_help=False)
     set_parser.add_argument('param', help='parameter to set or view',
                             choices_method=cmd2.Cmd._get_settable_completion_items)
@@ -152,14 +333,134 @@ class CoreShell(cmd2.Cmd):
         return cmd2.Cmd.do_set(self, param)
 
     def do_map(self, args):
-        unigdb.arch.UC.mem_map(self.mapping, self.mapping_size)
+        unigdb.memory.map_region(self.mapping, self.mapping_size, objfile='[mapping]')
+
+    def add_hooks(self):
+        """Install the interactive debugging hooks once per engine."""
+        if self.uc_hooks:
+            return None
+        self.uc_hooks = [
+            unigdb.arch.hook_add(unigdb.arch.UC, UC_HOOK_CODE, self.hook_code),
+            unigdb.arch.hook_add(unigdb.arch.UC, UC_HOOK_BLOCK, self.hook_block),
+            unigdb.arch.UC.hook_add(UC_HOOK_INTR, self.hook_intr),
+        ]
+        if unigdb.arch.current == 'x86-64':
+            # `syscall` does not raise an interrupt
+            self.uc_hooks.append(unigdb.arch.UC.hook_add(UC_HOOK_INSN, self.hook_syscall, None, 1, 0, UC_X86_INS_SYSCALL))
+        return None
+
+    def del_hooks(self):
+        """Remove the interactive debugging hooks, e.g. before a fuzzing campaign."""
+        for handle in self.uc_hooks:
+            unigdb.arch.UC.hook_del(handle)
+        self.uc_hooks = []
+        return None
+
+    def is_running(self):
+        return self.emulation is not None and self.emulation.is_alive()
+
+    def emulate(self, begin, count=0, timeout=0, report=True, background=False):
+        """Run the engine on a worker thread from `begin` until a breakpoint is hit, `count`
+        instructions were executed, `timeout` milliseconds elapsed (0 means no limit) or it is
+        interrupted, then show the context. In `background` the shell is given back at once."""
+        if self.is_running():
+            message.error('{!} Error => Emulation is running, use `interrupt` to stop it')
+            return None
+        emulation = self.start_emulation(begin, count, timeout)
+        if background:
+            threading.Thread(target=contextvars.copy_context().run,
+                             args=(self.emulation_watcher, emulation, report), daemon=True).start()
+            return None
+        try:
+            while emulation.is_alive():
+                emulation.join(0.1)
+        except KeyboardInterrupt:
+            # outside of cmdloop() Ctrl-C is not routed to sigint_handler()
+            self.interrupt()
+            emulation.join()
+        return self.emulation_stopped(emulation, report)
+
+    def start_emulation(self, begin, count=0, timeout=0):
+        """Start the engine on a worker thread, see :meth:`emulate`. The caller waits for
+        the returned thread to end, and sets `self.emulation` to None if it is still that thread."""
+        self.add_hooks()
+        self.insn_count = 0
+        self.stop_reason = None
+        unigdb.proc.alive = True
+        # the engine runs in the session of the caller
+        self.emulation = threading.Thread(target=contextvars.copy_context().run,
+                                          args=(self.emulation_thread, begin, count, timeout), daemon=True)
+        self.emulation.start()
+        return self.emulation
+
+    def emulation_thread(self, begin, count, timeout):
+        started = time.time()
+        try:
+            unigdb.arch.emu_start(unigdb.arch.UC, begin, timeout=timeout * 1000, count=count)
+        except UcError as e:
+            self.stop_reason = self.stop_reason or 'error: %s' % e
+        self.emulation_time = time.time() - started
+        if self.stop_reason is None:
+            if count and self.insn_count >= count:
+                self.stop_reason = 'instruction budget'
+            elif timeout and self.emulation_time * 1000 >= timeout:
+                self.stop_reason = 'timeout'
+            else:
+                self.stop_reason = 'stopped'
+
+    def emulation_watcher(self, emulation, report):
+        """Show the live instruction count in the prompt, then the context once `emulation` stopped."""
+        while emulation.is_alive():
+            emulation.join(0.5)
+            if self.terminal_lock.acquire(blocking=False):
+                try:
+                    self.async_update_prompt(unigdb.prompt.set_prompt(self.insn_count))
+                finally:
+                    self.terminal_lock.release()
+        # wait until the user is back at the prompt
+        with self.terminal_lock:
+            if self.emulation is not emulation:
+                # another emulation was started meanwhile, the state is no longer the one of this stop
+                return
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                self.emulation_stopped(emulation, report)
+            if self.use_rawinput and sys.stdin.isatty():
+                self.async_alert(output.getvalue().rstrip('\n'), unigdb.prompt.set_prompt())
+            else:
+                sys.stdout.write(output.getvalue())
+
+    def emulation_stopped(self, emulation, report):
+        if self.emulation is emulation:
+            self.emulation = None
+        self.onecmd_plus_hooks('ctx ' + unigdb.config.get('context.layout'), add_to_history=False)
+        if report:
+            message.hint('Stopped at {:#x} ({:s}) after {:d} instructions, {:.0f} IPS'.format(
+                unigdb.regs.get_register('$pc'), self.stop_reason, self.insn_count,
+                self.insn_count / self.emulation_time if self.emulation_time else 0))
+        return self.stop_reason
+
+    def interrupt(self):
+        """Stop a running emulation, it lands in the normal stop path."""
+        if not self.is_running():
+            return False
+        self.stop_reason = 'interrupted'
+        unigdb.arch.UC.emu_stop()
+        return True
+
+    def sigint_handler(self, signum, frame):
+        if self.interrupt():
+            return None
+        return super(CoreShell, self).sigint_handler(signum, frame)
 
     def hook_code(self, uc, address, size, user_data):
         has_break = unigdb.breakpoints.hasBreakpoint(address)
         unigdb.breakpoints.restoreBreakpoints()
-        if has_break is not None:
+        if has_break is None:
+            self.insn_count += 1
+        else:
             uc.emu_stop()
-            self.onecmd_plus_hooks('ctx ' + unigdb.config.get('context.layout'))
+            self.stop_reason = 'breakpoint'
             if has_break is True:
                 unigdb.breakpoints.delBreakpoint(address)
             elif has_break is False:
@@ -169,7 +470,15 @@ class CoreShell(cmd2.Cmd):
         pass
 
     def hook_intr(self, uc, except_idx, user_data):
-        pass
+        self.stop_on_syscall(uc, unigdb.syscalls.dispatch(except_idx))
+
+    def hook_syscall(self, uc, user_data):
+        self.stop_on_syscall(uc, unigdb.syscalls.dispatch_syscall())
+
+    def stop_on_syscall(self, uc, reason):
+        if reason is not None:
+            self.stop_reason = reason
+            uc.emu_stop()
 
 
 def parse_and_eval(expression):
@@ -212,7 +521,7 @@ def initial_message():
         Color.colorify("self config", "underline pink")
     )
     ver = "{:d}.{:d}".format(sys.version_info.major, sys.version_info.minor)
-    nb_cmds = len(unigdb.commands.__commands__)
+    nb_cmds = len(set(unigdb.commands.__lazy__) | {cmd._cmdline_ for cmd in unigdb.commands.__commands__})
     msg += "{:s} commands loaded using Python engine {:s}".format(
         Color.colorify(nb_cmds, "bold green"),
         Color.colorify(ver, "bold red"))
@@ -1,58 +1,77 @@
-import copy
 import string
+import operator
 
+import unigdb.color
 import unigdb.config
 import unigdb.color.hexdump as H
 
-color_scheme = None
-printable = None
+PRINTABLE = bytearray((string.ascii_letters + string.digits + string.punctuation).encode('utf-8', 'ignore'))
 
+# bytes.translate() table of the uncolored ascii column
+ASCII = bytes(c if c in PRINTABLE else ord('.') for c in range(256))
 
-def groupby(array, count, fill=None):
-    array = copy.copy(array)
-    while fill and len(array) % count:
-        array.append(fill)
-    for i in range(0, len(array), count):
-        yield array[i:i + count]
+__tables__ = {}  # : (colored, colorize ascii, color generation) -> (hex table, ascii table)
 
 
-def load_color_scheme():
-    global color_scheme, printable
+def load_color_scheme(colored=True):
+    """
+    Render every byte value once.
+
+    Returns:
+        Two 256-entry tables: the hex cell (followed by a space) and the ascii cell of each byte.
+    """
+    colorize_ascii = unigdb.config.get('hexdump.hexdump_colorize_ascii')
+    key = (colored, colorize_ascii, unigdb.color.generation)
+    if key in __tables__:
+        return __tables__[key]
+
+    def plain(x):
+        return x
+
+    normal, printable, zero, special = (H.normal, H.printable, H.zero, H.special) if colored else (plain,) * 4
+    ascii_printable, ascii_zero, ascii_special = (printable, zero, special) if colorize_ascii else (plain,) * 3
     #
     # We want to colorize the hex characters and only print out
     # printable values on the righ hand side.
     #
-    color_scheme = {i: H.normal("%02x" % i) for i in range(256)}
-    printable = {i: H.normal('.') for i in range(256)}
-    # load config
-    config_colorize_ascii = unigdb.config.get('hexdump.hexdump_colorize_ascii')
+    hexs = [normal("%02x" % i) + ' ' for i in range(256)]
+    asciis = [normal('.') for i in range(256)]
 
-    for c in bytearray((string.ascii_letters + string.digits + string.punctuation).encode('utf-8', 'ignore')):
-        color_scheme[c] = H.printable("%02x" % c)
-        printable[c] = H.printable("%s" % chr(c)) if config_colorize_ascii else "%s" % chr(c)
+    for c in PRINTABLE:
+        hexs[c] = printable("%02x" % c) + ' '
+        asciis[c] = ascii_printable(chr(c))
 
     for c in bytearray(b'\x00'):
-        color_scheme[c] = H.zero("%02x" % c)
-        printable[c] = H.zero('.') if config_colorize_ascii else '.'
+        hexs[c] = zero("%02x" % c) + ' '
+        asciis[c] = ascii_zero('.')
 
     for c in bytearray(b'\xff\x7f\x80'):
-        color_scheme[c] = H.special("%02x" % c)
-        printable[c] = H.special('.') if config_colorize_ascii else '.'
+        hexs[c] = special("%02x" % c) + ' '
+        asciis[c] = ascii_special('.')
 
-    color_scheme[-1] = '  '
-    printable[-1] = ' '
+    __tables__[key] = hexs, asciis
+    return __tables__[key]
 
 
-def hexdump(data, address=0, width=16, skip=True, offset=0):
+def hexdump(data, address=0, width=16, skip=True, offset=0, color=True):
     # load config
     config_separator = unigdb.config.get('hexdump.hexdump_ascii_block_separator')
-    if not color_scheme or not printable:
-        load_color_scheme()
-    data = list(bytearray(data))
+    hexs, asciis = load_color_scheme(color)
+    separator = H.separator('%s' % config_separator) if color else '%s' % config_separator
+    address_format = (H.address if color else str)("%#08x  ")
+    offset_format = (H.offset if color else str)("+%04x ")
+    groups = range(0, width, 4)
+    # slices of the groups of 4 bytes, the empty one ends the joined groups with a separator
+    hex_groups = operator.itemgetter(*[slice(g * 3, g * 3 + 12) for g in groups], slice(0, 0))
+    ascii_groups = operator.itemgetter(*[slice(g, g + 4) for g in groups], slice(0, 0))
+
+    view = memoryview(bytes(data))
     base = address
     last_line = None
     skipping = False
-    for i, line in enumerate(groupby(data, width, -1)):
+    for i, start in enumerate(range(0, len(view), width)):
+        line = view[start:start + width]
+        # memoryview comparison, no copy
         if skip and line == last_line:
             if not skipping:
                 skipping = True
@@ -62,36 +81,33 @@ def hexdump(data, address=0, width=16, skip=True, offset=0):
             skipping = False
             last_line = line
 
-        hexline = []
-
-        if address:
-            hexline.append(H.offset("+%04x " % ((i + offset) * width)))
-
-        hexline.append(H.address("%#08x  " % (base + (i * width))))
-
-        for group in groupby(line, 4):
-            for char in group:
-                hexline.append(color_scheme[char])
-                hexline.append(' ')
-            hexline.append(' ')
-
-        hexline.append(H.separator('%s' % config_separator))
-        for group in groupby(line, 4):
-            for char in group:
-                hexline.append(printable[char])
-            hexline.append(H.separator('%s' % config_separator))
-
-        yield(''.join(hexline))
+        hexline = [offset_format % ((i + offset) * width) if address else '', address_format % (base + start)]
+        if color:
+            hexcells = list(map(hexs.__getitem__, line))
+            asciicells = list(map(asciis.__getitem__, line))
+            if len(line) < width:
+                hexcells += ['   '] * (width - len(line))
+                asciicells += [' '] * (width - len(line))
+            hexline.extend(''.join(hexcells[g:g + 4]) + ' ' for g in groups)
+            hexline.append(separator)
+            hexline.extend(''.join(asciicells[g:g + 4]) + separator for g in groups)
+        else:
+            # whole line at once with bytes.hex() and bytes.translate()
+            text = line.tobytes().translate(ASCII).decode('latin-1').ljust(width)
+            hexline.append(' '.join(hex_groups(line.hex(' ').ljust(width * 3))))
+            hexline.append(separator)
+            hexline.append(separator.join(ascii_groups(text)))
+        yield ''.join(hexline)
 
     # skip empty footer if we printed something
-    if last_line:
+    if last_line is not None:
         return
 
     hexline = []
 
     if address:
-        hexline.append(H.offset("+%04x " % len(data)))
+        hexline.append(offset_format % len(view))
 
-    hexline.append(H.address("%#08x  " % (base + len(data))))
+    hexline.append(address_format % (base + len(view)))
 
     yield ''.join(hexline)
@@ -4,12 +4,14 @@ Reading, writing, and describing memory.
 import os
 import struct
 import re
-from unicorn import UcError
+import bisect
+from unicorn import UcError, UC_PROT_ALL, UC_PROT_READ, UC_PROT_WRITE, UC_PROT_EXEC
 
 # import unigdb.events
 import unigdb.proc
 import unigdb.typeinfo
 import unigdb.arch
+import unigdb.session
 from unigdb.color import message
 
 PAGE_SIZE = 0x1000
@@ -21,14 +23,24 @@ def number_matcher(value):
     return re.match(r'^\d+$|^0x[0-9A-Fa-f]+$', value)
 
 
+__structs__ = {}  # : (fmt, endian) -> struct.Struct
+
+
+def get_struct(fmt, endian=None):
+    """Precompiled ``struct.Struct`` of ``fmt`` in the ``endian`` byte order (current one by default)."""
+    key = (fmt, endian or unigdb.arch.endian)
+    compiled = __structs__.get(key)
+    if compiled is None:
+        compiled = __structs__[key] = struct.Struct(('<' if key[1] == 'little' else '>') + fmt)
+    return compiled
+
+
 def unpack(fmt, data):
-    e = '<' if unigdb.arch.endian == 'little' else '>'
-    return struct.unpack(e + fmt, data)[0]
+    return get_struct(fmt).unpack(data)[0]
 
 
 def pack(fmt, data):
-    e = '<' if unigdb.arch.endian == 'little' else '>'
-    return struct.pack(e + fmt, data)
+    return get_struct(fmt).pack(data)
 
 
 @unigdb.proc.OnlyWhenInit
@@ -52,6 +64,25 @@ def read(addr, count: int):
     return bytearray(result)
 
 
+def read_mapped(addr, count):
+    """
+    Read up to ``count`` bytes from ``addr``, region by region, until the first unmapped byte.
+    Unlike :func:`read`, a range running past the end of the memory gives its readable prefix.
+    """
+    data = bytearray()
+    end = addr + count
+    while addr < end:
+        page = find(addr)
+        if page is None:
+            break
+        block = read(addr, min(end, page.end) - addr)
+        if not block:
+            break
+        data += block
+        addr += len(block)
+    return data
+
+
 def readtype(gdb_type, addr):
     """readtype(gdb_type, addr) -> int
 
@@ -65,7 +96,26 @@ def readtype(gdb_type, addr):
     Returns:
         :class:`int`
     """
-    return unpack(gdb_type['fmt'], read(addr, gdb_type['size']))
+    return get_struct(gdb_type['fmt']).unpack(read(addr, gdb_type['size']))[0]
+
+
+def read_array(addr, gdb_type, count):
+    """read_array(addr, gdb_type, count) -> list
+
+    Reads ``count`` consecutive values of an integer-type with a single
+    memory read per region, up to the end of the mapped memory.
+
+    Arguments:
+        addr(int): Address of the first value
+        gdb_type(dict): GDB type of the values
+        count(int): Number of values to read
+
+    Returns:
+        A list of :class:`int`, the values that are mapped, empty if the memory cannot be read.
+    """
+    data = read_mapped(addr, gdb_type['size'] * count)
+    del data[len(data) - len(data) % gdb_type['size']:]
+    return [value for value, in get_struct(gdb_type['fmt']).iter_unpack(data)]
 
 
 @unigdb.proc.OnlyWhenInit
@@ -333,43 +383,61 @@ assert round_up(0xdeadbeef, 0x1000) == 0xdeadc000
 def find_upper_boundary(addr, max_pages=1024):
     """find_upper_boundary(addr, max_pages=1024) -> int
 
-    Brute-force search the upper boundary of a memory mapping,
-    by reading the first byte of each page, until an unmapped
-    page is found.
+    Return the end of the memory mapping containing ``addr``,
+    following adjacent mappings, at most ``max_pages`` pages away.
     """
-    addr = unigdb.memory.page_align(int(addr))
-    try:
-        for i in range(max_pages):
-            unigdb.memory.read(addr, 1)
-            # import sys
-            # sys.stdout.write(hex(addr) + '\n')
-            addr += unigdb.memory.PAGE_SIZE
-            if addr > unigdb.arch.ptrmask:
-                break
-    except gdb.MemoryError:
-        pass
-    return addr
+    addr = page_align(int(addr))
+    limit = addr + max_pages * PAGE_SIZE
+    page = find(addr)
+    while page is not None and page.end < limit:
+        addr = page.end
+        page = find(addr)
+    if page is not None:
+        addr = limit
+    return min(addr, unigdb.arch.ptrmask + 1)
 
 
 def find_lower_boundary(addr, max_pages=1024):
     """find_lower_boundary(addr, max_pages=1024) -> int
 
-    Brute-force search the lower boundary of a memory mapping,
-    by reading the first byte of each page, until an unmapped
-    page is found.
+    Return the start of the memory mapping containing ``addr``,
+    following adjacent mappings, at most ``max_pages`` pages away.
     """
-    addr = unigdb.memory.page_align(int(addr))
-    try:
-        for i in range(max_pages):
-            unigdb.memory.read(addr, 1)
-            addr -= unigdb.memory.PAGE_SIZE
-            if addr < 0:
-                break
-    except gdb.MemoryError:
-        addr += unigdb.memory.PAGE_SIZE
+    addr = page_align(int(addr))
+    limit = max(addr - max_pages * PAGE_SIZE, 0)
+    page = find(addr)
+    if page is None:
+        return addr + PAGE_SIZE
+    while page is not None and page.start > limit:
+        addr = page.start
+        page = find(addr - 1)
+    if page is not None:
+        addr = limit
     return addr
 
 
+class PageCache(object):
+    """Reads guest memory a page at a time, each page once.
+
+    Meant for short-lived bulk walks (stack slots, linked lists) where many
+    small reads hit the same pages; it does not see later writes.
+    """
+
+    def __init__(self):
+        self.pages = {}
+
+    def read(self, addr, count):
+        """Same as :func:`read`, short when the memory ends within the range."""
+        page = page_align(addr)
+        if page_align(addr + count - 1) != page:
+            # crosses a page boundary, rare enough for a direct read
+            return read_mapped(addr, count)
+        data = self.pages.get(page)
+        if data is None:
+            data = self.pages[page] = read(page, PAGE_SIZE)
+        return data[addr - page:addr - page + count]
+
+
 class Page(object):
     """
     Represents the address space and page permissions of at least
@@ -410,6 +478,13 @@ class Page(object):
     def is_stack(self):
         return self.objfile == '[stack]'
 
+    @property
+    def kind(self):
+        """One of ``'stack'``, ``'heap'``, ``'mmio'``, ``'code'`` or ``'data'``, from the name or the permissions."""
+        if self.objfile in ('[stack]', '[heap]', '[mmio]', '[code]', '[data]'):
+            return self.objfile[1:-1]
+        return 'code' if self.execute else 'data'
+
     @property
     def is_memory_mapped_file(self):
         return len(self.objfile) > 0 and self.objfile[0] != '['
@@ -443,7 +518,7 @@ class Page(object):
                         'p'])
 
     def __str__(self):
-        width = 2 + 2 * unigdb.typeinfo.ptrsize
+        width = 2 + 2 * unigdb.arch.ptrsize
         fmt_string = "%#{}x %#{}x %s %8x %-6x %s"
         fmt_string = fmt_string.format(width, width)
         return fmt_string % (self.vaddr,
@@ -469,6 +544,140 @@ class Page(object):
         return hash((self.vaddr, self.memsz, self.flags, self.offset, self.objfile))
 
 
+def uc_to_flags(perms):
+    """Convert Unicorn UC_PROT_* permissions to ELF PF_* like flags."""
+    return (4 if perms & UC_PROT_READ else 0) | (2 if perms & UC_PROT_WRITE else 0) | (1 if perms & UC_PROT_EXEC else 0)
+
+
+def regions():
+    """
+    Sorted index of the mapped regions of the current session, rebuilt after every map/unmap:
+    ``pages``, their ``starts``, and the ``mappings`` (start address -> ``(end, objfile)``, the names given
+    when mapping or by :func:`name_region`, possibly to a part of an engine region).
+    """
+    state = unigdb.session.current().cache('memory')
+    if not state:
+        state.update({'pages': [], 'starts': [], 'mappings': {}})
+        refresh()
+    return state
+
+
+def refresh():
+    """Rebuild the region index from the engine mappings, split where the named ranges start and end."""
+    state = unigdb.session.current().cache('memory')
+    names = sorted(state['mappings'].items())
+    starts = [start for start, _ in names]
+    pages = []
+    for begin, end, perms in sorted(unigdb.arch.UC.mem_regions()):
+        end += 1
+        flags = uc_to_flags(perms)
+        # the named ranges do not overlap, so their ends are sorted too
+        i = max(bisect.bisect_right(starts, begin) - 1, 0)
+        address = begin
+        for start, (stop, objfile) in names[i:]:
+            if start >= end:
+                break
+            if stop <= address:
+                continue
+            if address < start:
+                pages.append(Page(address, start - address, flags, 0))
+                address = start
+            stop = min(stop, end)
+            pages.append(Page(address, stop - address, flags, 0, objfile))
+            address = stop
+        if address < end:
+            pages.append(Page(address, end - address, flags, 0))
+    state['pages'] = pages
+    state['starts'] = [page.start for page in pages]
+
+
+def get():
+    """Return the sorted list of mapped :class:`Page`."""
+    return regions()['pages']
+
+
+def find(address):
+    """Return the :class:`Page` containing ``address`` or ``None``, in O(log n)."""
+    state = regions()
+    pages = state['pages']
+    i = bisect.bisect_right(state['starts'], address) - 1
+    if i >= 0 and address < pages[i].end:
+        return pages[i]
+    return None
+
+
+def is_mapped(address, size=1):
+    """Whether any byte of [address, address + size) is mapped."""
+    state = regions()
+    pages = state['pages']
+    i = bisect.bisect_right(state['starts'], address + size - 1) - 1
+    return i >= 0 and pages[i].end > address
+
+
+def mapped_size(address, size):
+    """Number of bytes mapped from ``address`` on, up to ``size``, possibly over adjacent regions."""
+    start, end = address, address + size
+    while address < end:
+        page = find(address)
+        if page is None:
+            break
+        address = page.end
+    return min(address, end) - start
+
+
+def is_fully_mapped(address, size):
+    """Whether every byte of [address, address + size) is mapped, possibly over adjacent regions."""
+    return mapped_size(address, size) == size
+
+
+def map_region(address, size, perms=UC_PROT_ALL, objfile=''):
+    """Map ``size`` bytes at ``address`` and record the mapping name or source file."""
+    unigdb.arch.UC.mem_map(address, size, perms)
+    set_name(address, address + size, objfile)
+    refresh()
+
+
+def set_name(start, end, objfile):
+    """Name [start, end) in the index, over the previous names of the range; an empty name removes them."""
+    mappings = regions()['mappings']
+    for begin, (stop, name) in list(mappings.items()):
+        if begin < end and start < stop:
+            del mappings[begin]
+            if begin < start:
+                mappings[begin] = (start, name)
+            if end < stop:
+                mappings[end] = (stop, name)
+    if objfile:
+        mappings[start] = (end, objfile)
+
+
+def name_region(address, objfile, size=None):
+    """
+    Name the region containing ``address`` (e.g. ``[stack]``, ``[mmio]`` or a file), or only the
+    ``size`` bytes from ``address``, page aligned, which become a region of their own in the index,
+    e.g. the stack of a flat firmware mapping. The engine mapping is left as is: splitting it
+    copies the whole region.
+    """
+    page = find(address)
+    if page is None:
+        return False
+    if size is None:
+        start, end = page.start, page.end
+    else:
+        start, end = page_align(address), page_size_align(address + size)
+        if not is_fully_mapped(start, end - start):
+            return False
+    set_name(start, end, objfile)
+    refresh()
+    return True
+
+
+def unmap_region(address, size):
+    unigdb.arch.UC.mem_unmap(address, size)
+    set_name(address, address + size, '')
+    refresh()
+
+
 # @unigdb.events.start
 def update_min_addr():
     global MMAP_MIN_ADDR
@@ -1,11 +1,10 @@
 import functools
 import sys
 
+import unigdb.session
 from unigdb.color import message
 
 module = sys.modules[__name__]
-alive = False
-init = False
 
 
 def OnlyWhenRunning(func):
@@ -26,3 +25,7 @@ def OnlyWhenInit(func):
             message.error('{!} Error => Unicorn engine not initialized')
 
     return wrapper
+
+
+# `alive` and `init` are the ones of the current session
+unigdb.session.bind(__name__, {'alive': 'alive', 'init': 'init'})
@@ -6,11 +6,16 @@ UNIGDB_PROMPT_ON = "\001\033[1;32m\002{0:s}\001\033[0m\002".format(UNIGDB_PROMPT
 UNIGDB_PROMPT_OFF = "\001\033[1;31m\002{0:s}\001\033[0m\002".format(UNIGDB_PROMPT)
 
 
-def set_prompt():
-    """unigdb custom prompt function."""
+UNIGDB_PROMPT_RUNNING = "unigdb[{:d}]\u27a4  "
+
+
+def set_prompt(insn_count=None):
+    """unigdb custom prompt function, `insn_count` is shown while the emulation runs."""
+    if insn_count is not None:
+        return UNIGDB_PROMPT_RUNNING.format(insn_count)
     if unigdb.config.get("self.readline_compat") is True:
         return UNIGDB_PROMPT
-    if unigdb.config.get("self.disable_color") is True:
+    if unigdb.config.get("self.disable_colors") is True:
         return UNIGDB_PROMPT
     # if unigdb.proc.alive:
     #     return UNIGDB_PROMPT_ON
@@ -121,6 +121,8 @@ class Architecture(object):
         pass
 
     special_registers = []
+    syscall_parameters = []
+    link_register = None  # : return address register, None when it is pushed on the stack
 
     @property
     def pc(self):
@@ -184,7 +186,9 @@ class ARM(Architecture):
         5: "thumb"
     }
     function_parameters = ["$r0", "$r1", "$r2", "$r3"]
+    link_register = "$lr"
     syscall_register = "$r7"
+    syscall_parameters = ["$r0", "$r1", "$r2", "$r3", "$r4", "$r5", "$r6"]
     syscall_instructions = ["swi 0x0", "swi NR"]
 
     def is_thumb(self):
@@ -350,7 +354,9 @@ class AARCH64(ARM):
         6: "fast"
     }
     function_parameters = ["$x0", "$x1", "$x2", "$x3", "$x4", "$x5", "$x6", "$x7"]
+    link_register = "$x30"
     syscall_register = "$x8"
+    syscall_parameters = ["$x0", "$x1", "$x2", "$x3", "$x4", "$x5"]
     syscall_instructions = ["svc $x0"]
 
     def is_call(self, insn):
@@ -444,6 +450,7 @@ class X86(Architecture):
         21: "identification",
     }
     syscall_register = "$eax"
+    syscall_parameters = ["$ebx", "$ecx", "$edx", "$esi", "$edi", "$ebp"]
     syscall_instructions = ["sysenter", "int 0x80"]
 
     def flag_register_to_human(self, val=None):
@@ -556,6 +563,7 @@ class X86_64(X86):
     return_register = "$rax"
     function_parameters = ["$rdi", "$rsi", "$rdx", "$rcx", "$r8", "$r9"]
     syscall_register = "$rax"
+    syscall_parameters = ["$rdi", "$rsi", "$rdx", "$r10", "$r8", "$r9"]
     syscall_instructions = ["syscall"]
     # We don't want to inherit x86's stack based param getter
     get_ith_parameter = Architecture.get_ith_parameter
@@ -882,7 +890,10 @@ class MIPS(Architecture):
     flag_register = "$fcsr"
     flags_table = {}
     function_parameters = ["$a0", "$a1", "$a2", "$a3"]
+    link_register = "$ra"
     syscall_register = "$v0"
+    # o32 passes the 5th and following arguments on the stack
+    syscall_parameters = ["$a0", "$a1", "$a2", "$a3"]
     syscall_instructions = ["syscall"]
 
     def flag_register_to_human(self, val=None):
@@ -0,0 +1,290 @@
+"""
+Structured results of the core commands.
+
+A command builds result objects and hands them to :func:`emit`, which renders
+them as text, or serializes them as JSON lines when `self.output_format` is
+"json". Both outputs come from the same object, so machine consumers skip the
+colorization and the formatting entirely.
+"""
+import abc
+import json
+import contextlib
+
+import unigdb.arch
+import unigdb.chain
+import unigdb.config
+import unigdb.hexdump
+import unigdb.regs
+import unigdb.telescope
+import unigdb.ui
+from unigdb.color import Color, generateColorFunction
+
+FORMATS = ['text', 'json']
+
+output_format = unigdb.config.set('self.output_format', 'text', 'Output of the core commands: text or json (one object per line)')
+
+__collector__ = None  # : list receiving the results as dicts, see collect()
+
+
+def emit(result):
+    """Output ``result``, in the current output format."""
+    if __collector__ is not None:
+        __collector__.append(result.as_dict())
+    elif unigdb.config.get('self.output_format') == 'json':
+        print(json.dumps(result.as_dict()))
+    else:
+        for line in result.render():
+            print(line)
+
+
+@contextlib.contextmanager
+def collect():
+    """Gather the results emitted in the block, as dicts, into the list it yields."""
+    global __collector__
+    previous, __collector__ = __collector__, []
+    try:
+        yield __collector__
+    finally:
+        __collector__ = previous
+
+
+def chain_as_list(chain):
+    """JSON form of a list of ``(link, kind)`` tuples as returned by :func:`unigdb.chain.examine`."""
+    return [{'value': link, 'kind': kind if isinstance(link, int) else 'string'} for link, kind in chain]
+
+
+class Result(metaclass=abc.ABCMeta):
+    """Output of a command."""
+
+    type = None
+
+    @abc.abstractmethod
+    def as_dict(self):
+        """Serializable form of the result, plain text without colors."""
+
+    @abc.abstractmethod
+    def render(self):
+        """Yield the lines of the text form of the result."""
+
+
+class Text(Result):
+    """Lines of text, for the output not converted to structured results yet."""
+
+    type = 'text'
+
+    def __init__(self, lines):
+        self.lines = list(lines)
+
+    def as_dict(self):
+        return {'type': self.type, 'lines': [Color.strip(line) for line in self.lines]}
+
+    def render(self):
+        return iter(self.lines)
+
+
+class Registers(Result):
+    """Values of registers, dereferenced."""
+
+    type = 'registers'
+
+    def __init__(self, registers, ignored_registers=(), old_registers={}, flags=False):
+        """
+        Arguments:
+            registers(list): names of the registers
+            ignored_registers(list): registers not shown
+            old_registers(dict): previous values, the others are shown as changed
+            flags(bool): also show the flag register
+        """
+        self.registers = []
+        for reg in registers:
+            if reg in ignored_registers:
+                continue
+            value = unigdb.regs.get_register(reg) or 0
+            if value < 0:
+                value += unigdb.arch.ptrmask + 1
+            changed = value != old_registers.get(reg, 0)
+            self.registers.append((reg, value, changed, unigdb.chain.examine(value)))
+        self.flags = None
+        flags_table = unigdb.arch.CURRENT_ARCH.flags_table
+        if flags and flags_table:
+            value = unigdb.regs.get_register(unigdb.arch.CURRENT_ARCH.flag_register) or 0
+            self.flags = {name: bool(value & (1 << bit)) for bit, name in flags_table.items()}
+
+    def as_dict(self):
+        return {
+            'type': self.type,
+            'registers': [{'name': name, 'value': value, 'changed': changed, 'chain': chain_as_list(chain)}
+                          for name, value, changed, chain in self.registers],
+            'flags': self.flags,
+        }
+
+    def render(self):
+        if self.registers:
+            widest = max(len(name) for name, _, _, _ in self.registers)
+        for name, value, changed, chain in self.registers:
+            color = "theme.registers_value_changed" if changed else "theme.registers_register_name"
+            yield "{}: {}".format(Color.themify(name.ljust(widest, " "), color), unigdb.chain.format(chain))
+        if self.flags is not None:
+            yield "Flags: {:s}".format(unigdb.arch.CURRENT_ARCH.flag_register_to_human())
+
+
+class Hexdump(Result):
+    """Bytes of memory."""
+
+    type = 'hexdump'
+
+    def __init__(self, address, data, width=16):
+        self.address = address
+        self.data = bytes(data)
+        self.width = width
+
+    def as_dict(self):
+        return {'type': self.type, 'address': self.address, 'data': self.data.hex()}
+
+    def render(self):
+        return unigdb.hexdump.hexdump(self.data, address=self.address, width=self.width)
+
+
+class Telescope(Result):
+    """Pointer-sized slots of memory, dereferenced."""
+
+    type = 'telescope'
+
+    def __init__(self, address, count, limit=None):
+        self.address = address
+        self.chains = unigdb.telescope.telescope(address, count, limit)
+
+    def as_dict(self):
+        return {'type': self.type, 'address': self.address, 'slots': [chain_as_list(chain) for chain in self.chains]}
+
+    def render(self):
+        ptrsize = unigdb.arch.ptrsize
+        for i, chain in enumerate(self.chains):
+            yield '+{:#06x}: {:s}'.format(i * ptrsize, unigdb.chain.format(chain))
+
+
+class Code(Result):
+    """Instructions around $pc, with the branch taken and the first instructions of its target."""
+
+    type = 'code'
+
+    def __init__(self, pc, instructions, branch=None, target=()):
+        """
+        Arguments:
+            instructions(list): :class:`unigdb.disassemble.Instruction` objects
+            branch(tuple): ``(taken, reason)`` of the conditional branch at $pc
+            target(list): instructions at the target of the branch, call or return at $pc
+        """
+        self.pc = pc
+        self.instructions = list(instructions)
+        self.branch = branch
+        self.target = list(target)
+
+    @staticmethod
+    def instruction_as_dict(insn):
+        return {'address': insn.address, 'mnemonic': insn.mnemonic, 'operands': insn.operands, 'text': str(insn)}
+
+    def as_dict(self):
+        return {
+            'type': self.type,
+            'pc': self.pc,
+            'instructions': [self.instruction_as_dict(insn) for insn in self.instructions],
+            'branch': {'taken': bool(self.branch[0]), 'reason': self.branch[1]} if self.branch else None,
+            'target': [self.instruction_as_dict(insn) for insn in self.target],
+        }
+
+    def render(self):
+        cur_insn_color = unigdb.config.get("theme.disassemble_current_instruction")
+        arrow_right = unigdb.config.get("theme.chain_arrow_right")
+        for insn in self.instructions:
+            text = str(insn)
+            if insn.address < self.pc:
+                yield Color.grayify("   {}".format(text))
+            elif insn.address == self.pc:
+                line = Color.colorify("{:s}{:s}".format(arrow_right.rjust(3), text), cur_insn_color)
+                if self.branch:
+                    is_taken, reason = self.branch
+                    if is_taken:
+                        reason = "[Reason: {:s}]".format(reason) if reason else ""
+                        line += Color.colorify("\tTAKEN {:s}".format(reason), "bold green")
+                    else:
+                        reason = "[Reason: !({:s})]".format(reason) if reason else ""
+                        line += Color.colorify("\tNOT taken {:s}".format(reason), "bold red")
+                yield line
+            else:
+                yield "   {}".format(text)
+        for i, insn in enumerate(self.target):
+            yield "   {}  {}".format(unigdb.config.DOWN_ARROW if i == 0 else " ", str(insn))
+
+
+class Breakpoints(Result):
+    """Breakpoints set, a dict of address to temporary flag."""
+
+    type = 'breakpoints'
+
+    def __init__(self, breakpoints):
+        self.breakpoints = dict(breakpoints)
+
+    def as_dict(self):
+        return {'type': self.type,
+                'breakpoints': [{'address': address, 'temporary': temporary}
+                                for address, temporary in self.breakpoints.items()]}
+
+    def render(self):
+        yield generateColorFunction(unigdb.config.get('color.message_hint_color'))('Current breakpoints:')
+        yield 'Address\tTemporary'
+        for address, temporary in self.breakpoints.items():
+            yield '%#x\t%s' % (address, temporary)
+
+
+class Breakpoint(Result):
+    """A breakpoint just set."""
+
+    type = 'breakpoint'
+
+    def __init__(self, address, temporary=False):
+        self.address = address
+        self.temporary = temporary
+
+    def as_dict(self):
+        return {'type': self.type, 'address': self.address, 'temporary': self.temporary}
+
+    def render(self):
+        yield generateColorFunction(unigdb.config.get('color.message_success_color'))(
+            'Set breakpoint to %#08x' % self.address)
+
+
+def title(m, columns):
+    """Line of ``columns`` characters, with the title ``m`` on the right."""
+    line_color = "theme.context_title_line"
+    if not m:
+        return Color.themify(unigdb.config.HORIZONTAL_LINE * columns, line_color)
+
+    trail_len = len(m) + 6
+    return ''.join([
+        Color.themify("{:{padd}<{width}} ".format("", width=max(columns - trail_len, 0),
+                                                  padd=unigdb.config.HORIZONTAL_LINE), line_color),
+        Color.themify(m, "theme.context_title_message"),
+        Color.themify(" {:{padd}<4}".format("", padd=unigdb.config.HORIZONTAL_LINE), line_color),
+    ])
+
+
+class Context(Result):
+    """Sections of the context, a list of ``(name, title, result)`` tuples."""
+
+    type = 'context'
+
+    def __init__(self, sections, columns=None):
+        self.sections = list(sections)
+        self.columns = columns or unigdb.ui.get_window_size()[1]
+
+    def as_dict(self):
+        return {'type': self.type,
+                'sections': [dict(result.as_dict(), section=name) for name, _, result in self.sections]}
+
+    def render(self):
+        for _, section_title, result in self.sections:
+            if section_title is not None:
+                yield title(section_title, self.columns)
+            yield from result.render()
+        yield title("", self.columns)
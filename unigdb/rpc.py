@@ -0,0 +1,240 @@
+"""
+JSON-RPC server hosting many independent emulation sessions.
+
+Every session is a :class:`unigdb.api.Emulator`, with its own Unicorn engine,
+so analysts and pipelines can drive many targets from one long-lived process.
+The protocol is JSON-RPC 2.0, one object per line, over a local TCP or UNIX
+socket:
+
+    --> {"jsonrpc": "2.0", "id": 1, "method": "create", "params": {"arch": "armel"}}
+    <-- {"jsonrpc": "2.0", "id": 1, "result": {"session": 1}}
+
+The engine calls, the blocking ``emu_start`` above all, run on a thread of
+their session so the event loop never stalls, and a long ``run`` never delays
+the calls on the other sessions; the calls on one session are serialized.
+"""
+import os
+import json
+import asyncio
+import binascii
+import functools
+import concurrent.futures
+
+from unicorn import UcError, UC_ERR_READ_UNMAPPED
+
+import unigdb.api
+import unigdb.memory
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+EMULATION_ERROR = -32000
+
+ADDRESS = range(1 << 64)
+# bytes of a read, its reply is twice as long
+MAX_READ = 1 << 24
+
+# Parameters of the methods, checked before calling into the engine: name -> type,
+# (type, None) when the parameter is optional with None as default
+PARAMS = {
+    'create': {'arch': str},
+    'close': {},
+    'sessions': {},
+    'map': {'address': ADDRESS, 'size': ADDRESS, 'perms': str, 'objfile': str},
+    'load': {'address': ADDRESS, 'path': (str, None), 'data': str},
+    'read': {'address': ADDRESS, 'size': range(MAX_READ + 1)},
+    'write': {'address': ADDRESS, 'data': str},
+    'registers': {'names': ([str], None), 'values': ({str: int}, None)},
+    'run': {'begin': (ADDRESS, None), 'until': (ADDRESS, None), 'count': ADDRESS, 'timeout': ADDRESS,
+            'breakpoints': [ADDRESS]},
+    'step': {'count': range(1, 1 << 64)},
+    'interrupt': {},
+}
+
+
+class RpcError(Exception):
+    def __init__(self, code, message):
+        super(RpcError, self).__init__(message)
+        self.code = code
+
+
+def check_type(value, expected):
+    """Whether ``value`` is of the ``expected`` type of :data:`PARAMS`."""
+    if isinstance(expected, tuple):
+        return any(check_type(value, e) for e in expected)
+    if expected is None:
+        return value is None
+    if isinstance(expected, range):
+        return isinstance(value, int) and not isinstance(value, bool) and value in expected
+    if isinstance(expected, list):
+        return isinstance(value, list) and all(check_type(v, expected[0]) for v in value)
+    if isinstance(expected, dict):
+        (key, item), = expected.items()
+        return isinstance(value, dict) and all(check_type(k, key) and check_type(v, item) for k, v in value.items())
+    return isinstance(value, expected)
+
+
+def check_params(method, params):
+    expected = PARAMS[method]
+    for name, value in params.items():
+        if name not in expected:
+            raise RpcError(INVALID_PARAMS, 'Unexpected parameter %s' % name)
+        if not check_type(value, expected[name]):
+            raise RpcError(INVALID_PARAMS, 'Invalid parameter %s: %r' % (name, value))
+
+
+class Session(unigdb.api.Emulator):
+    """An emulator whose bytes travel as hex strings."""
+
+    def __init__(self, arch):
+        super(Session, self).__init__(arch)
+        self.lock = asyncio.Lock()
+
+    def load(self, address, path=None, data=''):
+        return super(Session, self).load(address, path, binascii.unhexlify(data))
+
+    @unigdb.api.in_session
+    def read(self, address, size):
+        # the engine allocates the whole buffer before checking the memory
+        if not unigdb.memory.is_fully_mapped(address, size):
+            raise UcError(UC_ERR_READ_UNMAPPED)
+        return binascii.hexlify(super(Session, self).read(address, size)).decode()
+
+    def write(self, address, data):
+        if isinstance(data, str):
+            data = binascii.unhexlify(data)
+        return super(Session, self).write(address, data)
+
+
+class Server(object):
+    """Dispatches the requests of the clients to the sessions."""
+
+    methods = list(PARAMS)
+
+    def __init__(self, jobs=None):
+        """
+        Arguments:
+            jobs(int): Threads shared by the engine calls of all the sessions, by default
+                every session has its own
+        """
+        self.sessions = {}
+        self.next_id = 1
+        self.executor = concurrent.futures.ThreadPoolExecutor(jobs) if jobs else None
+
+    def session(self, params):
+        try:
+            return self.sessions[params.pop('session')]
+        except (KeyError, TypeError):
+            raise RpcError(INVALID_PARAMS, 'Missing or unknown session')
+
+    async def call(self, method, params):
+        if method not in self.methods:
+            raise RpcError(METHOD_NOT_FOUND, 'Method not found: %s' % method)
+        if not isinstance(params, dict):
+            raise RpcError(INVALID_PARAMS, 'params must be an object')
+        loop = asyncio.get_running_loop()
+
+        if method == 'create':
+            check_params(method, params)
+            session = await loop.run_in_executor(self.executor, functools.partial(Session, **params))
+            session.executor = self.executor or concurrent.futures.ThreadPoolExecutor(1)
+            session_id, self.next_id = self.next_id, self.next_id + 1
+            self.sessions[session_id] = session
+            return {'session': session_id}
+        if method == 'sessions':
+            return {'sessions': [{'session': i, 'arch': s.arch} for i, s in self.sessions.items()]}
+        session = self.session(params)
+        check_params(method, params)
+        if method == 'interrupt':
+            # does not wait for the running call to end
+            return session.interrupt()
+        if method == 'close':
+            session.interrupt()
+            async with session.lock:
+                self.sessions = {i: s for i, s in self.sessions.items() if s is not session}
+            if session.executor is not self.executor:
+                session.executor.shutdown(wait=False)
+            return True
+        async with session.lock:
+            return await loop.run_in_executor(session.executor, functools.partial(getattr(session, method), **params))
+
+    async def handle_request(self, request):
+        """Response to the ``request`` object, None for a notification."""
+        request_id = None
+        try:
+            if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+                raise RpcError(INVALID_REQUEST, 'Invalid request')
+            request_id = request.get('id')
+            result = await self.call(request['method'], request.get('params', {}))
+            response = {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+        except RpcError as e:
+            response = {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': e.code, 'message': str(e)}}
+        except (TypeError, ValueError) as e:
+            response = {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': INVALID_PARAMS, 'message': str(e)}}
+        except (UcError, OSError) as e:
+            response = {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': EMULATION_ERROR, 'message': str(e)}}
+        except Exception as e:
+            # a bug must not leave the client waiting for the reply
+            response = {'jsonrpc': '2.0', 'id': request_id,
+                        'error': {'code': INTERNAL_ERROR, 'message': 'Internal error: %s' % e}}
+        if isinstance(request, dict) and 'id' not in request:
+            return None
+        return response
+
+    async def handle_client(self, reader, writer):
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def send(response):
+            async with write_lock:
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+
+        async def respond(request):
+            response = await self.handle_request(request)
+            if response is not None:
+                await send(response)
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    await send({'jsonrpc': '2.0', 'id': None, 'error': {'code': PARSE_ERROR, 'message': 'Parse error'}})
+                    continue
+                # requests are answered as they complete, e.g. `interrupt` during a `run`
+                task = asyncio.ensure_future(respond(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            if tasks:
+                await asyncio.wait(tasks)
+            writer.close()
+
+    async def serve(self, address):
+        """Serve forever on ``[HOST]:PORT`` (localhost by default) or on a UNIX socket path."""
+        if ':' in address:
+            host, port = address.rsplit(':', 1)
+            server = await asyncio.start_server(self.handle_client, host or '127.0.0.1', int(port))
+        else:
+            if os.path.exists(address):
+                os.unlink(address)
+            server = await asyncio.start_unix_server(self.handle_client, address)
+        async with server:
+            await server.serve_forever()
+
+
+def serve(address, jobs=None):
+    """Run the server on ``address`` until interrupted."""
+    try:
+        asyncio.run(Server(jobs).serve(address))
+    except KeyboardInterrupt:
+        pass
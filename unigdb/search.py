@@ -0,0 +1,94 @@
+"""
+Search of byte patterns and regular expressions in the mapped memory.
+
+Adjacent regions are merged into ranges, which are read in large chunks
+overlapping each other so that matches across two chunks are not lost.
+Chunks can be searched by a thread pool, Unicorn releasing the GIL while
+it copies guest memory.
+"""
+import concurrent.futures
+
+import unigdb.arch
+import unigdb.memory
+
+
+def ranges():
+    """Yield the ``[start, end]`` of the runs of adjacent mapped regions."""
+    current = None
+    for page in unigdb.memory.get():
+        if current and current[1] == page.start:
+            current[1] = page.end
+            continue
+        if current:
+            yield current
+        current = [page.start, page.end]
+    if current:
+        yield current
+
+
+def chunks(start, end, size, overlap):
+    """Yield the ``(address, length, own)`` of the chunks covering [start, end): every chunk
+    owns ``own`` bytes and reads ``overlap`` more bytes of the next one."""
+    address = start
+    while address < end:
+        own = min(size, end - address)
+        yield address, min(own + overlap, end - address), own
+        address += own
+
+
+def search_chunk(chunk, needle, uc):
+    """Return the ``(address, match)`` of ``needle`` (bytes or compiled regex) starting in the owned part of ``chunk``,
+    read from the engine ``uc``."""
+    address, length, own = chunk
+    data = uc.mem_read(address, length)
+    results = []
+    if isinstance(needle, bytes):
+        i = data.find(needle)
+        while i != -1 and i < own:
+            results.append((address + i, needle))
+            i = data.find(needle, i + 1)
+    else:
+        for match in needle.finditer(data):
+            if match.start() >= own:
+                break
+            results.append((address + match.start(), match.group()))
+    return results
+
+
+def search(needle, start=0, end=None, chunk_size=0x1000000, overlap=None, jobs=1):
+    """
+    Search ``needle`` in the mapped memory between ``start`` and ``end``.
+
+    Arguments:
+        needle(bytes|re.Pattern): byte pattern or compiled bytes regex
+        chunk_size(int): number of bytes read at once
+        overlap(int): bytes shared by two chunks, the length of the longest regex match
+            which cannot be missed (``len(needle) - 1`` for a byte pattern)
+        jobs(int): number of threads
+
+    Yields:
+        ``(address, match)`` tuples, in increasing address order
+    """
+    if end is None:
+        end = unigdb.arch.ptrmask + 1
+    if overlap is None:
+        overlap = len(needle) - 1 if isinstance(needle, bytes) else 0x100
+    # the workers do not run in the session of the caller, they get its engine
+    uc = unigdb.arch.UC
+    tasks = []
+    for low, high in ranges():
+        low, high = max(low, start), min(high, end)
+        if low < high:
+            tasks.extend(chunks(low, high, chunk_size, overlap))
+
+    if jobs > 1 and len(tasks) > 1:
+        pool = concurrent.futures.ThreadPoolExecutor(jobs)
+        try:
+            for results in pool.map(search_chunk, tasks, [needle] * len(tasks), [uc] * len(tasks)):
+                yield from results
+        finally:
+            # the caller may stop early, drop the pending chunks
+            pool.shutdown(wait=False, cancel_futures=True)
+    else:
+        for task in tasks:
+            yield from search_chunk(task, needle, uc)
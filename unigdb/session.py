@@ -0,0 +1,118 @@
+"""
+Emulation sessions.
+
+A session is one emulated target: the Unicorn engine, its architecture, the
+breakpoints, the caches of the modules and the configuration values it
+overrides. The current session is held in a context variable, so threads and
+asyncio tasks can each drive their own target:
+
+    >>> s = unigdb.session.Session('mips', 'big')
+    >>> with unigdb.session.use(s):
+    ...     unigdb.memory.map_region(0x1000, 0x1000)
+
+Outside of :func:`use` the default session, the one of the shell, is current.
+The historical module globals (``unigdb.arch.UC``, ``unigdb.proc.alive``...)
+read and write the attributes of the current session, see :func:`bind`.
+"""
+import sys
+import types
+import contextlib
+import contextvars
+
+__default__ = None
+__current__ = contextvars.ContextVar('unigdb_session', default=None)
+
+
+class Session(object):
+    """State of an emulated target."""
+
+    def __init__(self, arch=None, endian='little'):
+        self.current = 'i386'
+        self.endian = endian
+        self.ptrsize = 4
+        self.ptrmask = 0xfffffffff
+        self.fmt = '=I'
+        self.qemu = None
+        self.CURRENT_ARCH = None
+        self.UC = None
+        self.init = False  # : the engine is created
+        self.alive = False  # : the engine ran
+        self.breakpoints = {}  # : address -> temporary, see unigdb.breakpoints
+        self.caches = {}  # : module name -> state of the module for this target
+        self.config = {}  # : setting name -> value overriding unigdb.config
+        if arch:
+            self.set_arch(arch, endian)
+
+    def __repr__(self):
+        return '<Session %s %s %s>' % (self.current, self.endian, 'init' if self.init else 'uninitialized')
+
+    def set_arch(self, arch, endian):
+        """Create a new engine for ``arch``; the caches of the previous one are dropped."""
+        import unigdb.arch
+        import unigdb.typeinfo
+        self.CURRENT_ARCH, self.UC = unigdb.arch.create(arch, endian)
+        self.current = arch
+        self.endian = endian
+        self.ptrsize = unigdb.typeinfo.ptrsize
+        self.ptrmask = (1 << 8 * self.ptrsize) - 1
+        self.fmt = {
+            (4, 'little'): '<I',
+            (4, 'big'): '>I',
+            (8, 'little'): '<Q',
+            (8, 'big'): '>Q',
+        }.get((self.ptrsize, self.endian))
+        # Attempt to detect the qemu-user binary name
+        if arch == 'arm' and endian == 'big':
+            self.qemu = 'armeb'
+        elif arch == 'mips' and endian == 'little':
+            self.qemu = 'mipsel'
+        else:
+            self.qemu = arch
+        self.init = True
+        self.caches.clear()
+        return self.CURRENT_ARCH
+
+    def cache(self, name):
+        """Dict of the state kept by the module ``name`` for this target."""
+        return self.caches.setdefault(name, {})
+
+
+def default():
+    """The session of the shell, current when no other one is."""
+    global __default__
+    if __default__ is None:
+        __default__ = Session()
+    return __default__
+
+
+def current():
+    """The current session."""
+    return __current__.get() or default()
+
+
+@contextlib.contextmanager
+def use(session):
+    """Make ``session`` the current one in the block, for this thread or task only."""
+    token = __current__.set(session)
+    try:
+        yield session
+    finally:
+        __current__.reset(token)
+
+
+def bind(name, attributes):
+    """
+    Turn the globals of the module ``name`` into views of the current session.
+    ``attributes`` maps a global name to the attribute of the session.
+    """
+    module = sys.modules[name]
+
+    def view(attribute):
+        return property(lambda self: getattr(current(), attribute),
+                        lambda self, value: setattr(current(), attribute, value))
+
+    namespace = {}
+    for global_name, attribute in attributes.items():
+        module.__dict__.pop(global_name, None)
+        namespace[global_name] = view(attribute)
+    module.__class__ = type('SessionModule', (types.ModuleType,), namespace)
@@ -0,0 +1,56 @@
+"""
+Copy-on-write snapshots of the emulator state.
+
+A snapshot keeps the register file and, lazily, the original content of
+every page written after it was taken. Restoring it only rewrites the
+pages which were dirtied since the previous restore.
+"""
+from unicorn import UC_HOOK_MEM_WRITE
+
+import unigdb.arch
+import unigdb.memory
+import unigdb.regs
+
+
+class Snapshot(object):
+    """Register and memory state captured at the current $pc."""
+
+    def __init__(self):
+        self.registers = {}
+        self.pages = {}  # : page address -> original page content
+        self.dirty = set()  # : pages written since the last restore
+        for reg in unigdb.arch.CURRENT_ARCH.all_registers:
+            self.registers[reg] = unigdb.regs.get_register(reg)
+        self.hook = unigdb.arch.UC.hook_add(UC_HOOK_MEM_WRITE, self.hook_mem_write)
+
+    def hook_mem_write(self, uc, access, address, size, value, user_data):
+        # Unicorn calls the hook before the store, so the page is still pristine
+        self.touch(address, size)
+
+    def touch(self, address, size):
+        """Mark ``size`` bytes at ``address`` as dirty, saving the original pages first.
+        Must be called before writing guest memory from the host side."""
+        page = unigdb.memory.page_align(address)
+        last = unigdb.memory.page_align(address + max(size, 1) - 1)
+        while page <= last:
+            if page not in self.dirty:
+                self.dirty.add(page)
+                if page not in self.pages:
+                    self.pages[page] = bytes(unigdb.memory.read(page, unigdb.memory.PAGE_SIZE))
+            page += unigdb.memory.PAGE_SIZE
+
+    def restore(self):
+        """Bring registers and dirty pages back to the snapshot state."""
+        for page in self.dirty:
+            data = self.pages[page]
+            if data:
+                unigdb.arch.UC.mem_write(page, data)
+        self.dirty.clear()
+        for reg, value in self.registers.items():
+            unigdb.regs.set_register(reg, value)
+
+    def close(self):
+        """Stop tracking memory writes."""
+        if self.hook is not None:
+            unigdb.arch.UC.hook_del(self.hook)
+            self.hook = None
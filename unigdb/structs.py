@@ -0,0 +1,242 @@
+"""
+C-like structure definitions.
+
+Structures are declared in header files (``*.h``) with a small subset of C:
+
+    struct node {
+        uint32_t value;
+        char name[16];      /* arrays of char are shown as strings */
+        struct node *next;
+    };
+
+Each file is compiled once per architecture into a :class:`Layout`, that is a
+precompiled ``struct.Struct`` plus the offset of every field, so that a whole
+structure, or a whole array of them, is decoded from a single memory read.
+"""
+import os
+import re
+import struct
+
+import unigdb.arch
+
+# C type -> struct format, 'P' stands for a pointer-sized integer
+SCALARS = {
+    'char': 'b', 'signed char': 'b', 'unsigned char': 'B', 'int8_t': 'b', 'uint8_t': 'B',
+    'bool': '?', '_Bool': '?',
+    'short': 'h', 'signed short': 'h', 'unsigned short': 'H', 'int16_t': 'h', 'uint16_t': 'H',
+    'int': 'i', 'signed': 'i', 'signed int': 'i', 'unsigned': 'I', 'unsigned int': 'I', 'int32_t': 'i', 'uint32_t': 'I',
+    'long long': 'q', 'signed long long': 'q', 'unsigned long long': 'Q', 'int64_t': 'q', 'uint64_t': 'Q',
+    'float': 'f', 'double': 'd',
+    'long': 'p', 'signed long': 'p', 'unsigned long': 'P', 'size_t': 'P', 'ssize_t': 'p', 'uintptr_t': 'P',
+    'intptr_t': 'p',
+}
+TOKENS = re.compile(r'[A-Za-z_]\w*|0[xX][0-9a-fA-F]+|\d+|[{}\[\];*,]')
+COMMENTS = re.compile(r'//[^\n]*|/\*.*?\*/', re.S)
+
+__cache__ = {}  # : (path, mtime, ptrsize, endian) -> {name: Layout}
+
+
+class Field(object):
+    """One member of a :class:`Layout`."""
+
+    def __init__(self, name, ctype, offset, size, count, kind, layout=None):
+        self.name = name
+        self.ctype = ctype
+        self.offset = offset
+        self.size = size  # : size of one element
+        self.count = count  # : number of elements, None when not an array
+        self.kind = kind  # : 'int', 'float', 'ptr', 'string' or 'struct'
+        self.layout = layout  # : Layout of a nested structure
+        self.index = 0  # : position of the first value in the unpacked tuple
+        self.nvalues = 0
+
+    @property
+    def type_name(self):
+        return self.ctype + ('[%d]' % self.count if self.count is not None else '')
+
+
+class Layout(object):
+    """Compiled structure: fields with their offsets and one ``struct.Struct`` for all of them."""
+
+    def __init__(self, name, fields, size, align, fmt, nvalues):
+        self.name = name
+        self.fields = fields
+        self.size = size
+        self.align = align
+        self.fmt = fmt  # : format without the byte order prefix, reused by nesting structures
+        self.nvalues = nvalues
+        self.struct = struct.Struct(('<' if unigdb.arch.endian == 'little' else '>') + fmt)
+
+    def unpack(self, data, offset=0):
+        """Decode the structure at ``offset`` of ``data`` into a list of ``(field, value)``."""
+        return self.decode(self.struct.unpack_from(data, offset))
+
+    def iter_unpack(self, data):
+        """Decode consecutive structures of ``data``, like an array of them."""
+        for values in self.struct.iter_unpack(data[:len(data) - len(data) % self.size]):
+            yield self.decode(values)
+
+    def decode(self, values):
+        result = []
+        for field in self.fields:
+            chunk = values[field.index:field.index + field.nvalues]
+            if field.kind == 'string':
+                value = chunk[0].split(b'\x00', 1)[0]
+            elif field.kind == 'struct':
+                n = field.layout.nvalues
+                value = [field.layout.decode(chunk[i:i + n]) for i in range(0, len(chunk), n)]
+                value = value if field.count is not None else value[0]
+            else:
+                value = list(chunk) if field.count is not None else chunk[0]
+            result.append((field, value))
+        return result
+
+    def field(self, name):
+        for field in self.fields:
+            if field.name == name:
+                return field
+        raise KeyError(name)
+
+
+def parse(source, layouts=None):
+    """
+    Compile the structures declared in ``source`` for the current architecture.
+
+    Arguments:
+        source(str): C declarations
+        layouts(dict): already known structures, which may be referenced by name
+
+    Returns:
+        A dict of the :class:`Layout` declared in ``source``, by name
+    """
+    known = dict(layouts or {})
+    declared = {}
+    tokens = TOKENS.findall(COMMENTS.sub(' ', source))
+    pos = 0
+
+    def expect(value):
+        nonlocal pos
+        if pos >= len(tokens) or tokens[pos] != value:
+            raise ValueError("expected '%s' near '%s'" % (value, ' '.join(tokens[max(pos - 3, 0):pos + 3])))
+        pos += 1
+
+    while pos < len(tokens):
+        typedef = tokens[pos] == 'typedef'
+        pos += typedef
+        expect('struct')
+        name = tokens[pos] if tokens[pos] != '{' else None
+        pos += name is not None
+        members = []
+        expect('{')
+        while tokens[pos] != '}':
+            start = pos
+            while tokens[pos] not in ('*', ';', ',') and not (pos > start and tokens[pos + 1] in (';', ',', '[')):
+                pos += 1
+            ctype = ' '.join(tokens[start:pos])
+            while True:
+                pointer = 0
+                while tokens[pos] == '*':
+                    pointer += 1
+                    pos += 1
+                member = tokens[pos]
+                pos += 1
+                count = None
+                if tokens[pos] == '[':
+                    count = int(tokens[pos + 1], 0)
+                    pos += 2
+                    expect(']')
+                members.append((ctype, pointer, member, count))
+                if tokens[pos] != ',':
+                    break
+                pos += 1
+            expect(';')
+        expect('}')
+        if typedef:
+            alias = tokens[pos]
+            pos += 1
+        expect(';')
+        layout = compile_layout(alias if typedef else name, members, known, name)
+        for key in {name, alias if typedef else None} - {None}:
+            known[key] = declared[key] = layout
+    return declared
+
+
+def compile_layout(name, members, known, tag=None):
+    """Lay the ``(ctype, pointer depth, name, count)`` members out with the C alignment rules."""
+    ptr = 'I' if unigdb.arch.ptrsize == 4 else 'Q'
+    fields = []
+    fmt = ''
+    offset = 0
+    align = 1
+    nvalues = 0
+    for ctype, pointer, member, count in members:
+        nested = None
+        if pointer:
+            code, kind = ptr, 'ptr'
+            ctype += ' ' + '*' * pointer
+        elif ctype.startswith('struct '):
+            nested = known.get(ctype[len('struct '):])
+            if nested is None:
+                raise ValueError('%s: unknown or incomplete %s' % (name, ctype))
+            code, kind = nested.fmt, 'struct'
+        elif ctype in known:
+            nested = known[ctype]
+            code, kind = nested.fmt, 'struct'
+        elif ctype in SCALARS:
+            code = SCALARS[ctype].replace('p', ptr.lower()).replace('P', ptr)
+            kind = 'float' if code in 'fd' else 'int'
+        else:
+            raise ValueError('%s: unknown type %s' % (name, ctype))
+
+        size = nested.size if nested else struct.calcsize('<' + code)
+        field_align = nested.align if nested else size
+        padding = -offset % field_align
+        fmt += '%dx' % padding if padding else ''
+        offset += padding
+        align = max(align, field_align)
+
+        if kind == 'int' and code in 'bB' and count is not None and ctype.endswith('char'):
+            kind, fmt, values = 'string', fmt + '%ds' % count, 1
+        elif nested:
+            fmt += nested.fmt * (count or 1)
+            values = nested.nvalues * (count or 1)
+        else:
+            fmt += '%d%s' % (count, code) if count is not None else code
+            values = count or 1
+
+        field = Field(member, ctype, offset, size, count, kind, nested)
+        field.index, field.nvalues = nvalues, values
+        fields.append(field)
+        nvalues += values
+        offset += size * (count or 1)
+
+    padding = -offset % align
+    fmt += '%dx' % padding if padding else ''
+    return Layout(name or tag, fields, offset + padding, align, fmt, nvalues)
+
+
+def load(directory):
+    """
+    Compile every ``*.h`` file of ``directory``, files are only parsed again when they change.
+
+    Returns:
+        A dict of ``name -> (Layout, path)``
+    """
+    result = {}
+    if not os.path.isdir(directory):
+        return result
+    layouts = {}
+    for fname in sorted(os.listdir(directory)):
+        path = os.path.join(directory, fname)
+        if not fname.endswith('.h') or not os.path.isfile(path):
+            continue
+        key = (path, os.path.getmtime(path), unigdb.arch.ptrsize, unigdb.arch.endian)
+        if key not in __cache__:
+            with open(path) as f:
+                try:
+                    __cache__[key] = parse(f.read(), layouts)
+                except (ValueError, IndexError) as e:
+                    raise ValueError('%s: %s' % (path, e or 'unexpected end of file'))
+        layouts.update(__cache__[key])
+        result.update((name, (layout, path)) for name, layout in __cache__[key].items())
+    return result
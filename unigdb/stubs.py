@@ -0,0 +1,166 @@
+"""
+Native summaries of guest functions.
+
+A stub maps a guest address to a Python implementation. When the guest
+calls it, the implementation does the work with bulk memory accesses,
+the result goes to the return register and the emulation resumes at the
+return address, skipping the emulated byte loops.
+"""
+from unicorn import UcError, UC_HOOK_CODE, UC_ERR_WRITE_UNMAPPED
+
+import unigdb.arch
+import unigdb.memory
+import unigdb.regs
+import unigdb.session
+from unigdb.chain import lazy_dereference
+
+__implementations__ = {}
+
+# bytes written at once by fill
+FILL_CHUNK = 1 << 20
+
+
+def implementation(name):
+    """Decorator registering the Python implementation of the guest function `name`."""
+    def decorator(func):
+        __implementations__[name] = func
+        return func
+    return decorator
+
+
+def stubs():
+    """Return the stubs of the current session, address -> [name, hook handle]."""
+    return unigdb.session.current().cache('stubs')
+
+
+def add(address, name):
+    """Redirect calls to `address` to the implementation `name`."""
+    if name not in __implementations__:
+        raise KeyError(name)
+    remove(address)
+    address &= ~1
+    handle = unigdb.arch.hook_add(unigdb.arch.UC, UC_HOOK_CODE, hook_stub, name, address, address)
+    stubs()[address] = [name, handle]
+
+
+def remove(address):
+    address &= ~1
+    stub = stubs().pop(address, None)
+    if stub is not None:
+        unigdb.arch.UC.hook_del(stub[1])
+    return stub is not None
+
+
+def get_parameter(i):
+    """Argument ``i`` of the stubbed function, on its first instruction."""
+    arch = unigdb.arch.CURRENT_ARCH
+    if arch.function_parameters == ['$esp']:
+        # on the stack, above the return address pushed by the call
+        return lazy_dereference(unigdb.regs.get_register('$sp') + (i + 1) * unigdb.arch.ptrsize)
+    return arch.get_ith_parameter(i)[1]
+
+
+def return_to_caller(value):
+    """Set the return register and resume at the return address."""
+    arch = unigdb.arch.CURRENT_ARCH
+    if value is not None:
+        unigdb.regs.set_register(arch.return_register, value & unigdb.arch.ptrmask)
+    if arch.link_register:
+        ra = unigdb.regs.get_register(arch.link_register)
+    else:
+        sp = unigdb.regs.get_register('$sp')
+        ra = lazy_dereference(sp)
+        unigdb.regs.set_register('$sp', sp + unigdb.arch.ptrsize)
+    # writing $pc from a hook makes Unicorn resume there
+    unigdb.regs.set_register('$pc', ra)
+
+
+def hook_stub(uc, address, size, name):
+    return_to_caller(__implementations__[name]())
+
+
+def read_string(address, chunk=64, limit=None):
+    """Read a NUL-terminated string with a few bulk reads, up to the end of the mapped memory or ``limit`` bytes."""
+    data = bytearray()
+    while limit is None or len(data) < limit:
+        size = chunk if limit is None else min(chunk, limit - len(data))
+        block = unigdb.memory.read_mapped(address + len(data), size)
+        if not block:
+            break
+        end = block.find(b'\x00')
+        if end != -1:
+            return bytes(data + block[:end])
+        data += block
+        if len(block) < size:
+            # the mapped memory ends
+            break
+        chunk = min(chunk * 2, unigdb.memory.PAGE_SIZE)
+    return bytes(data)
+
+
+def fill(address, value, n):
+    """
+    Write ``n`` bytes ``value`` at ``address`` a chunk at a time, the guest chooses ``n``.
+    Like the guest, fault at the first unmapped byte, after writing the bytes before it.
+    """
+    mapped = unigdb.memory.mapped_size(address, n)
+    chunk = bytes([value]) * min(mapped, FILL_CHUNK)
+    for offset in range(0, mapped, FILL_CHUNK):
+        unigdb.memory.write(address + offset, chunk[:mapped - offset])
+    if mapped < n:
+        raise UcError(UC_ERR_WRITE_UNMAPPED)
+
+
+def compare(a, b):
+    for x, y in zip(a, b):
+        if x != y:
+            return x - y
+    return 0
+
+
+@implementation('memcpy')
+@implementation('memmove')
+def stub_memcpy():
+    dst, src, n = get_parameter(0), get_parameter(1), get_parameter(2)
+    if n:
+        unigdb.memory.write(dst, bytes(unigdb.memory.read_mapped(src, n)))
+    return dst
+
+
+@implementation('memset')
+def stub_memset():
+    dst, c, n = get_parameter(0), get_parameter(1), get_parameter(2)
+    fill(dst, c & 0xff, n)
+    return dst
+
+
+@implementation('memcmp')
+def stub_memcmp():
+    a, b, n = get_parameter(0), get_parameter(1), get_parameter(2)
+    return compare(unigdb.memory.read_mapped(a, n), unigdb.memory.read_mapped(b, n))
+
+
+@implementation('strlen')
+def stub_strlen():
+    return len(read_string(get_parameter(0)))
+
+
+@implementation('strcpy')
+def stub_strcpy():
+    dst, src = get_parameter(0), get_parameter(1)
+    unigdb.memory.write(dst, read_string(src) + b'\x00')
+    return dst
+
+
+@implementation('strncpy')
+def stub_strncpy():
+    dst, src, n = get_parameter(0), get_parameter(1), get_parameter(2)
+    data = read_string(src, limit=n)
+    unigdb.memory.write(dst, data)
+    fill(dst + len(data), 0, n - len(data))
+    return dst
+
+
+@implementation('strcmp')
+def stub_strcmp():
+    return compare(read_string(get_parameter(0)) + b'\x00', read_string(get_parameter(1)) + b'\x00')
@@ -0,0 +1,285 @@
+"""
+Linux user-mode system call emulation.
+
+A trapped system call is looked up by (arch, number), its arguments are
+decoded from the syscall registers following the table signature, and it
+is served by a host-side implementation registered with :func:`syscall`.
+"""
+import os
+import sys
+import errno
+from unicorn import UcError
+
+import unigdb.arch
+import unigdb.config
+import unigdb.memory
+import unigdb.regs
+import unigdb.session
+
+unigdb.config.set('syscalls.trace', False, 'print every emulated system call (strace like)')
+unigdb.config.set('syscalls.enable', True, 'emulate Linux system calls instead of stopping on them')
+unigdb.config.set('syscalls.mmap_base', 0xb0000000, 'lowest address returned by mmap without hint')
+
+# Interrupt number raised by the syscall instruction of each architecture
+INTERRUPTS = {
+    'arm': 2,
+    'aarch64': 2,
+    'mips': 17,
+    'i386': 0x80,
+}
+
+# (arch, number) -> name
+TABLES = {
+    'arm': {1: 'exit', 3: 'read', 4: 'write', 20: 'getpid', 45: 'brk', 91: 'munmap', 192: 'mmap2', 248: 'exit_group'},
+    'aarch64': {63: 'read', 64: 'write', 93: 'exit', 94: 'exit_group', 172: 'getpid', 214: 'brk', 215: 'munmap', 222: 'mmap'},
+    'mips': {4001: 'exit', 4003: 'read', 4004: 'write', 4020: 'getpid', 4045: 'brk', 4090: 'mmap', 4091: 'munmap',
+             4210: 'mmap2', 4246: 'exit_group'},
+    'i386': {1: 'exit', 3: 'read', 4: 'write', 20: 'getpid', 45: 'brk', 91: 'munmap', 192: 'mmap2', 252: 'exit_group'},
+    'x86-64': {0: 'read', 1: 'write', 9: 'mmap', 11: 'munmap', 12: 'brk', 39: 'getpid', 60: 'exit', 231: 'exit_group'},
+}
+
+# name -> ((argument, type), ...), types drive the decoding of the registers
+SIGNATURES = {
+    'exit': (('status', 'int'),),
+    'exit_group': (('status', 'int'),),
+    'read': (('fd', 'int'), ('buf', 'ptr'), ('count', 'size')),
+    'write': (('fd', 'int'), ('buf', 'ptr'), ('count', 'size')),
+    'getpid': (),
+    'brk': (('addr', 'ptr'),),
+    'munmap': (('addr', 'ptr'), ('length', 'size')),
+    'mmap': (('addr', 'ptr'), ('length', 'size'), ('prot', 'hex'), ('flags', 'hex'), ('fd', 'int'), ('offset', 'size')),
+    'mmap2': (('addr', 'ptr'), ('length', 'size'), ('prot', 'hex'), ('flags', 'hex'), ('fd', 'int'), ('pgoffset', 'size')),
+}
+
+MAP_FIXED = 0x10
+MAP_ANONYMOUS = {'mips': 0x800}
+
+__handlers__ = {}
+
+
+class Exited(Exception):
+    """Raised by a handler to end the emulation."""
+
+    def __init__(self, status):
+        super(Exited, self).__init__(status)
+        self.status = status
+
+
+def syscall(name):
+    """Decorator registering the host implementation of the system call `name`."""
+    def decorator(func):
+        __handlers__[name] = func
+        return func
+    return decorator
+
+
+def kernel():
+    """Return the emulated process state (program break, file descriptors) of the current session."""
+    state = unigdb.session.current().cache('syscalls')
+    if not state:
+        state.update({'brk': None, 'fds': {0: 0, 1: 1, 2: 2}})
+    return state
+
+
+def to_signed(value):
+    bits = unigdb.arch.ptrsize * 8
+    value &= (1 << bits) - 1
+    return value - (1 << bits) if value >> (bits - 1) else value
+
+
+def get_parameter(i):
+    regs = unigdb.arch.CURRENT_ARCH.syscall_parameters
+    if i < len(regs):
+        return unigdb.regs.get_register(regs[i])
+    # o32 ABI: arguments 5 and above follow the 16 bytes reserved on the stack
+    sp = unigdb.regs.get_register('$sp')
+    return unigdb.memory.u(sp + 16 + (i - len(regs)) * unigdb.arch.ptrsize)
+
+
+def set_result(value):
+    if unigdb.arch.current == 'mips':
+        # the error flag goes in $a3 and $v0 holds the positive errno
+        unigdb.regs.set_register('$a3', 1 if value < 0 else 0)
+        value = -value if value < 0 else value
+    unigdb.regs.set_register(unigdb.arch.CURRENT_ARCH.return_register, value & unigdb.arch.ptrmask)
+
+
+def format_call(name, args):
+    params = []
+    for (arg, argtype), value in zip(SIGNATURES[name], args):
+        params.append(('%s=%#x' if argtype in ('ptr', 'hex') else '%s=%d') % (arg, value))
+    return '%s(%s)' % (name, ', '.join(params))
+
+
+def dispatch(intno):
+    """Serve the system call trapped by interrupt `intno`.
+
+    Returns:
+        None when the emulation can go on, otherwise the reason to stop it.
+    """
+    arch = unigdb.arch.current
+    if not unigdb.config.get('syscalls.enable') or INTERRUPTS.get(arch) != intno:
+        return 'interrupt %d' % intno
+    return dispatch_syscall()
+
+
+def dispatch_syscall():
+    nr = unigdb.regs.get_register(unigdb.arch.CURRENT_ARCH.syscall_register)
+    name = TABLES.get(unigdb.arch.current, {}).get(nr)
+    if name is None or name not in __handlers__:
+        return 'unsupported syscall %d' % nr
+    args = []
+    for i, (_, argtype) in enumerate(SIGNATURES[name]):
+        value = get_parameter(i)
+        args.append(to_signed(value) if argtype == 'int' else value)
+    try:
+        result = __handlers__[name](*args)
+    except Exited as e:
+        if unigdb.config.get('syscalls.trace'):
+            print('%s = ?' % format_call(name, args))
+        return 'exited with code %d' % e.status
+    if unigdb.config.get('syscalls.trace'):
+        print('%s = %s' % (format_call(name, args), hex(result) if result > 0xffff else result))
+    set_result(result)
+    return None
+
+
+def find_free(size, hint):
+    """Lowest page aligned address above `hint` where `size` bytes are not mapped."""
+    address = unigdb.memory.page_size_align(hint)
+    for page in unigdb.memory.get():
+        if page.start < address + size and address < page.end:
+            address = unigdb.memory.page_size_align(page.end)
+    if address + size - 1 > unigdb.arch.ptrmask:
+        return None
+    return address
+
+
+def map_missing(address, size, perms):
+    """Map the pages of [address, address + size) which are not mapped yet, a region per gap."""
+    start = unigdb.memory.page_align(address)
+    end = unigdb.memory.page_size_align(address + size)
+    gaps = []
+    for page in unigdb.memory.get():
+        if page.end <= start:
+            continue
+        if page.start >= end:
+            break
+        if start < page.start:
+            gaps.append((start, page.start))
+        start = page.end
+    if start < end:
+        gaps.append((start, end))
+    for low, high in gaps:
+        unigdb.memory.map_region(low, high - low, perms)
+
+
+def unmap_present(address, size):
+    """Unmap the mapped pages of [address, address + size), skipping the holes."""
+    start = unigdb.memory.page_align(address)
+    end = unigdb.memory.page_size_align(address + size)
+    for page in list(unigdb.memory.get()):
+        low, high = max(start, page.start), min(end, page.end)
+        if low < high:
+            unigdb.memory.unmap_region(low, high - low)
+
+
+@syscall('exit')
+@syscall('exit_group')
+def sys_exit(status):
+    raise Exited(status)
+
+
+@syscall('getpid')
+def sys_getpid():
+    return os.getpid()
+
+
+@syscall('read')
+def sys_read(fd, buf, count):
+    hostfd = kernel()['fds'].get(fd)
+    if hostfd is None:
+        return -errno.EBADF
+    try:
+        data = os.read(hostfd, count)
+    except OSError as e:
+        return -e.errno
+    unigdb.memory.write(buf, data)
+    return len(data)
+
+
+@syscall('write')
+def sys_write(fd, buf, count):
+    hostfd = kernel()['fds'].get(fd)
+    if hostfd is None:
+        return -errno.EBADF
+    data = unigdb.memory.read(buf, count)
+    if len(data) != count:
+        return -errno.EFAULT
+    sys.stdout.flush()
+    try:
+        return os.write(hostfd, data)
+    except OSError as e:
+        return -e.errno
+
+
+@syscall('brk')
+def sys_brk(addr):
+    state = kernel()
+    if state['brk'] is None:
+        # the heap follows the highest mapping below the mmap area
+        base = unigdb.config.get('syscalls.mmap_base')
+        ends = [page.end for page in unigdb.memory.get() if page.end <= base]
+        state['brk'] = state['brk_start'] = find_free(unigdb.memory.PAGE_SIZE, max(ends + [unigdb.memory.MMAP_MIN_ADDR]))
+    if addr < state['brk_start']:
+        return state['brk']
+    start = unigdb.memory.page_size_align(state['brk'])
+    end = unigdb.memory.page_size_align(addr)
+    if end > start:
+        if unigdb.memory.is_mapped(start, end - start):
+            return state['brk']
+        unigdb.memory.map_region(start, end - start, objfile='[heap]')
+    elif end < start:
+        # like the kernel, a shrink frees the pages above the new break
+        unmap_present(end, start - end)
+    state['brk'] = addr
+    return addr
+
+
+@syscall('mmap')
+def sys_mmap(addr, length, prot, flags, fd, offset):
+    if not length:
+        return -errno.EINVAL
+    size = unigdb.memory.page_size_align(length)
+    if flags & MAP_FIXED:
+        address = unigdb.memory.page_align(addr)
+    else:
+        address = find_free(size, addr or unigdb.config.get('syscalls.mmap_base'))
+        if address is None:
+            return -errno.ENOMEM
+    try:
+        map_missing(address, size, prot & 7)
+        # fresh pages are zeroed, reused ones must be too
+        unigdb.arch.UC.mem_write(address, b'\x00' * size)
+    except UcError:
+        return -errno.ENOMEM
+    if not flags & MAP_ANONYMOUS.get(unigdb.arch.current, 0x20):
+        hostfd = kernel()['fds'].get(fd)
+        if hostfd is None:
+            return -errno.EBADF
+        unigdb.arch.UC.mem_write(address, os.pread(hostfd, length, offset))
+    return address
+
+
+@syscall('mmap2')
+def sys_mmap2(addr, length, prot, flags, fd, pgoffset):
+    return sys_mmap(addr, length, prot, flags, fd, pgoffset * 4096)
+
+
+@syscall('munmap')
+def sys_munmap(addr, length):
+    try:
+        unigdb.memory.unmap_region(addr, unigdb.memory.page_size_align(length))
+    except UcError:
+        return -errno.EINVAL
+    return 0
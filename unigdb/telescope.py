@@ -0,0 +1,54 @@
+"""
+Batched dereference of consecutive pointer-sized slots, e.g. the stack.
+"""
+import unigdb.arch
+import unigdb.chain
+import unigdb.memory
+import unigdb.typeinfo
+
+
+def telescope(address, count, limit=None):
+    """
+    Dereference ``count`` pointer-sized slots from ``address``. The slots are read at once
+    and every page they point to is read once, whatever the number of slots pointing in it.
+
+    Returns:
+        A list of chains, as returned by :func:`unigdb.chain.examine` for each slot address
+    """
+    limit = int(unigdb.chain.LIMIT if limit is None else limit)
+    ptrsize = unigdb.arch.ptrsize
+    values = unigdb.memory.read_array(address, unigdb.typeinfo.uintptr, count)
+
+    # second level dereferences, grouped by page
+    targets = [unigdb.memory.find(value) for value in values]
+    cache = unigdb.memory.PageCache()
+
+    chains = []
+    slot_kind = unigdb.chain.region_kind(address)
+    for i, (value, region) in enumerate(zip(values, targets)):
+        chain = [(address + i * ptrsize, slot_kind)]
+        if limit < 1:
+            chains.append(chain)
+            continue
+        chain.append((value, region.kind if region else None))
+        if region is None or limit < 2:
+            chains.append(chain)
+            continue
+        # the string probe needs string_limit + 1 bytes at most
+        data = cache.read(value, unigdb.chain.string_limit + 1)
+        deref = unigdb.chain.interpret(data) if len(data) > unigdb.chain.string_limit else None
+        if deref is None:
+            # too close to the end of the region, fall back to a plain dereference
+            chains.append(chain[:1] + unigdb.chain.examine(value, limit - 1))
+        elif isinstance(deref, str):
+            chains.append(chain + [(deref, None)])
+        else:
+            chains.append(chain + unigdb.chain.examine(deref & unigdb.arch.ptrmask, limit - 2))
+    return chains
+
+
+def telescope_lines(address, count, limit=None):
+    """Formatted lines of :func:`telescope`, prefixed with the offset of the slot."""
+    ptrsize = unigdb.arch.ptrsize
+    return ['+{:#06x}: {:s}'.format(i * ptrsize, unigdb.chain.format(chain))
+            for i, chain in enumerate(telescope(address, count, limit))]
@@ -13,7 +13,7 @@ def update(event):
     module.char = {'size': 1, 'fmt': 'c'}
     module.ulong = {'size': 4, 'fmt': 'L'}
     module.long = {'size': 4, 'fmt': 'l'}
-    module.uchar = {'size': 1, 'fmt': 's'}
+    module.uchar = {'size': 1, 'fmt': 'B'}
     module.ushort = {'size': 2, 'fmt': 'H'}
     module.uint = {'size': 4, 'fmt': 'I'}
     # module.void = lookup_types('void', '()')
@@ -22,14 +22,15 @@ def update(event):
     module.uint32 = module.uint
     module.uint64 = {'size': 8, 'fmt': 'Q'}
 
-    module.int8 = module.char
+    module.int8 = {'size': 1, 'fmt': 'b'}
     module.int16 = {'size': 2, 'fmt': 'h'}
     module.int32 = {'size': 4, 'fmt': 'i'}
-    module.int64 = {'size': 4, 'fmt': 'l'}
+    module.int64 = {'size': 8, 'fmt': 'q'}
 
     module.ssize_t = module.long
     module.size_t = module.ulong
     module.ptrsize = 4
+    module.uintptr = module.uint32
 
 
 # Call it once so we load all of the types
@@ -3,14 +3,19 @@ A few helpers for making things print pretty-like.
 """
 import fcntl
 import os
+import signal
 import struct
 import sys
 import termios
+import threading
 
+__window_size__ = None  # : (rows, columns), refreshed on SIGWINCH
 
-def get_window_size():
+
+def query_window_size():
+    """Ask the terminal for its size (one ioctl), ``$LINES`` and ``$COLUMNS`` when stdin is not a tty."""
     fallback = (int(os.environ.get('LINES', 20)), int(os.environ.get('COLUMNS', 80)))
-    if not sys.stdin.isatty:
+    if not sys.stdin.isatty():
         return fallback
     try:
         # get terminal size and force ret buffer len of 4 bytes for safe unpacking by passing equally long arg
@@ -20,6 +25,28 @@ def get_window_size():
     return rows, cols
 
 
+def get_window_size():
+    """Cached terminal size, as ``(rows, columns)``."""
+    global __window_size__
+    if __window_size__ is None:
+        __window_size__ = query_window_size()
+    return __window_size__
+
+
+def refresh_window_size(signum=None, frame=None):
+    """SIGWINCH handler: query the terminal size again on the next :func:`get_window_size`."""
+    global __window_size__
+    __window_size__ = None
+
+
+def handle_resize():
+    """Install :func:`refresh_window_size` as SIGWINCH handler, where possible."""
+    if not hasattr(signal, 'SIGWINCH') or threading.current_thread() is not threading.main_thread():
+        return False
+    signal.signal(signal.SIGWINCH, refresh_window_size)
+    return True
+
+
 def enable_redirect_output(to_file="/dev/null"):
     """Redirect all GDB output to `to_file` parameter. By default, `to_file` redirects to `/dev/null`."""
     gdb.execute("set logging overwrite")